@@ -0,0 +1,94 @@
+"""Run micro and transport benchmarks.
+
+Results may be saved as JSON together with commit they were
+measured on, and compared with previously saved ones:
+
+    python -m benchmarks --json before.json
+    git checkout other-branch
+    python -m benchmarks --compare before.json
+"""
+from typing import Dict, Any
+from datetime import datetime, timezone
+import argparse
+import json
+import platform
+import subprocess
+
+from . import micro, transport
+
+
+def commit() -> str:
+    try:
+        out = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            check=True, capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return out.stdout.strip()
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]):
+    """Print relative change of every metric present in both results,
+    + marks improvement, - marks regression
+    """
+    print(f'\nCompared with {old["commit"]} (now {new["commit"]})')
+    rows = [
+        (f'micro {name}', 'us', value, old['micro'].get(name))
+        for name, value in new['micro'].items()
+    ]
+    for name, result in new['transport'].items():
+        previous = old['transport'].get(name, {})
+        rows.extend(
+            (name, metric, value, previous.get(metric))
+            for metric, value in result.items() if metric != 'requests'
+        )
+    for name, metric, value, previous in rows:
+        if not previous:
+            continue
+        change = (value - previous) / previous * 100
+        better = change > 0 if metric in transport.higher_is_better \
+            else change < 0
+        mark = '+' if better else '-'
+        print(f'{name:<32}{metric:<13}{previous:>12.2f}{value:>12.2f}'
+              f'{change:>+9.1f}% {mark if abs(change) >= 1 else ""}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('scenarios', nargs='*',
+                        help='transport scenarios to run, all by default')
+    parser.add_argument('--quick', action='store_true',
+                        help='ten times fewer requests')
+    parser.add_argument('--no-transport', action='store_true',
+                        help='run microbenchmarks only')
+    parser.add_argument('--json', metavar='PATH',
+                        help='save results to file')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='compare with results saved before')
+    args = parser.parse_args()
+
+    results = {
+        'commit': commit(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': args.quick,
+        'micro': micro.run(2000 if args.quick else 20000),
+        'transport': dict(),
+    }
+    micro.report(results['micro'])
+    if not args.no_transport:
+        results['transport'] = transport.run(args.scenarios, args.quick)
+        print()
+        transport.report(results['transport'])
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Microbenchmark of Headers parsing and serialization.
+
+Compares genki.http.Headers with the previous OrderedDict
+based implementation, kept here as a baseline.
+
+    python -m benchmarks.headers
+"""
+from collections import OrderedDict
+from itertools import cycle
+from timeit import repeat
+import tracemalloc
+
+from genki.http import Headers
+
+
+RAW = (
+    b'HTTP/1.1 200 OK\r\n'
+    b'Date: Sun, 18 Oct 2026 10:00:00 GMT\r\n'
+    b'Server: gevent/26.9 Python/3.11\r\n'
+    b'Content-Type: text/html; charset=utf-8\r\n'
+    b'Content-Length: 15432\r\n'
+    b'Connection: keep-alive\r\n'
+    b'Cache-Control: max-age=3600, public\r\n'
+    b'ETag: "5f8b3c1a-3c48"\r\n'
+    b'Last-Modified: Sat, 17 Oct 2026 08:00:00 GMT\r\n'
+    b'Vary: Accept-Encoding\r\n'
+    b'Set-Cookie: session=abc123; Path=/; HttpOnly\r\n'
+    b'Set-Cookie: theme=dark; Path=/\r\n'
+    b'X-Frame-Options: DENY\r\n'
+    b'\r\n'
+)
+
+
+HOSTS = ('example.com', 'www.example.com')
+
+
+class LegacyHeaders(OrderedDict):
+    @classmethod
+    def from_bytes(cls, b: bytes):
+        if b'\r\n\r\n' in b:
+            b = b[:b.find(b'\r\n\r\n')]
+
+        headers = LegacyHeaders()
+        for line in b.split(b'\r\n'):
+            if b':' in line:
+                header, *value = line.split(b':', maxsplit=1)
+                if not value:
+                    continue
+
+                header_str, value_str = \
+                    header.decode().strip(), value[0].decode().strip()
+
+                if header_str in headers.keys():
+                    headers[header_str] = \
+                        str(headers[header_str]) + ',' + value_str
+                elif value_str.isdigit():
+                    headers[header_str] = int(value_str)
+                else:
+                    headers[header_str] = value_str
+        return headers
+
+    def to_str(self):
+        s = '\r\n'.join(
+            [
+                f'{key}: {value}'
+                for key, value in self.items()
+            ]
+        )
+        s += '\r\n\r\n'
+        return s
+
+    def to_bytes(self):
+        return self.to_str().encode()
+
+
+def best(stmt, number: int, **namespace) -> float:
+    """Best time of single call in microseconds
+    """
+    times = repeat(stmt, globals=namespace, number=number, repeat=5)
+    return min(times) / number * 1e6
+
+
+def memory(parse, raw: bytes, count: int = 1000) -> int:
+    """Memory taken by one parsed instance
+    """
+    tracemalloc.start()
+    instances = [parse(raw) for _ in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del instances
+    return size // count
+
+
+def drop_cache(headers: Headers):
+    """Forget serialized headers and their encoded lines,
+    so that to_bytes() does all the work
+    """
+    headers._bytes = None
+    headers._lines = None
+
+
+def run(number: int = 20000):
+    legacy = LegacyHeaders.from_bytes(RAW)
+    headers = Headers.from_bytes(RAW)
+    cases = [
+        ('from_bytes', 'cls.from_bytes(raw)'),
+        ('lookup', "h.get('Content-Type')"),
+        ('to_bytes', 'reset(h); h.to_bytes()'),
+        ('to_bytes, cached', 'h.to_bytes()'),
+        # Value changes every time, so cache is always invalidated
+        ('set + to_bytes', "h['Host'] = next(hosts); h.to_bytes()"),
+        # Headers shared between requests, each sets its own Host
+        ('copy, set, to_bytes',
+         "c = cls(h); c['Host'] = next(hosts); c.to_bytes()"),
+    ]
+    print(f'{"":<20}{"legacy, us":>12}{"Headers, us":>13}{"speedup":>9}')
+    for name, stmt in cases:
+        old = best(stmt, number, cls=LegacyHeaders, raw=RAW, h=legacy,
+                   reset=lambda h: None, hosts=cycle(HOSTS))
+        new = best(stmt, number, cls=Headers, raw=RAW, h=headers,
+                   reset=drop_cache, hosts=cycle(HOSTS))
+        print(f'{name:<20}{old:>12.2f}{new:>13.2f}{old / new:>8.1f}x')
+
+    old_size = memory(LegacyHeaders.from_bytes, RAW)
+    new_size = memory(Headers.from_bytes, RAW)
+    print(f'{"memory, bytes":<20}{old_size:>12}{new_size:>13}')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,152 @@
+"""Local HTTP/1.1 server for benchmarks.
+
+Response is described by path segments of request target,
+e.g. /size=65536/chunked=1/delay=10:
+size - body size in bytes, chunked=1 - send body with chunked
+transfer encoding, delay - milliseconds to wait before answering.
+Connections are kept alive, request bodies are discarded.
+
+    python -m benchmarks.server --port 8080 [--tls]
+"""
+from typing import Optional, Tuple
+from multiprocessing import get_context
+from tempfile import mkdtemp
+import argparse
+import os
+import subprocess
+
+from gevent import sleep, socket, ssl
+from gevent.server import StreamServer
+
+
+PIECE = b'x' * (1024 * 1024)
+
+
+def _send_body(sock, size: int, chunked: bool):
+    view = memoryview(PIECE)
+    while size > 0:
+        piece = view[:min(size, len(PIECE))]
+        if chunked:
+            sock.sendall(b'%x\r\n' % len(piece))
+        sock.sendall(piece)
+        if chunked:
+            sock.sendall(b'\r\n')
+        size -= len(piece)
+    if chunked:
+        sock.sendall(b'0\r\n\r\n')
+
+
+def handle(sock, _):
+    # Head and body are written separately, do not let Nagle's
+    # algorithm hold body back until client acknowledges head
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    rfile = sock.makefile('rb')
+    try:
+        while True:
+            line = rfile.readline()
+            if not line:
+                return
+            target = line.split(b' ')[1].decode()
+            length = 0
+            while True:
+                header = rfile.readline()
+                if header in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = header.partition(b':')
+                if name.strip().lower() == b'content-length':
+                    length = int(value)
+            if length:
+                rfile.read(length)
+
+            options = dict(
+                segment.partition('=')[::2]
+                for segment in target.split('/') if segment
+            )
+            size = int(options.get('size', 1024))
+            chunked = options.get('chunked') == '1'
+            delay = float(options.get('delay', 0))
+            if delay:
+                sleep(delay / 1000)
+
+            framing = b'Transfer-Encoding: chunked' if chunked \
+                else b'Content-Length: %d' % size
+            sock.sendall(
+                b'HTTP/1.1 200 OK\r\nContent-Type: application/octet-stream'
+                b'\r\n%s\r\n\r\n' % framing)
+            _send_body(sock, size, chunked)
+    except OSError:
+        # Client went away
+        pass
+    finally:
+        rfile.close()
+
+
+def create_certificate(directory: Optional[str] = None) -> Tuple[str, str]:
+    """Self-signed certificate for 127.0.0.1, made with openssl,
+    returns paths of certificate and key
+    """
+    directory = directory or mkdtemp(prefix='genki-bench-')
+    certfile = os.path.join(directory, 'cert.pem')
+    keyfile = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-days', '1', '-subj', '/CN=127.0.0.1',
+         '-addext', 'subjectAltName=IP:127.0.0.1',
+         '-keyout', keyfile, '-out', certfile],
+        check=True,
+        capture_output=True
+    )
+    return certfile, keyfile
+
+
+def serve(port: int = 0,
+          certfile: Optional[str] = None,
+          keyfile: Optional[str] = None) -> StreamServer:
+    """Start server in current process, TLS if certificate is given.
+
+    All connections share one SSLContext, so that clients
+    can resume TLS sessions
+    """
+    kwargs = {}
+    if certfile is not None:
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(certfile, keyfile)
+        kwargs = dict(ssl_context=ctx)
+    server = StreamServer(('127.0.0.1', port), handle, **kwargs)
+    server.start()
+    return server
+
+
+def _run(pipe, certfile: Optional[str], keyfile: Optional[str]):
+    server = serve(0, certfile, keyfile)
+    pipe.send(server.server_port)
+    server.serve_forever()
+
+
+def start_process(certfile: Optional[str] = None,
+                  keyfile: Optional[str] = None):
+    """Run server in separate process, so that its work
+    does not count towards CPU time of client being measured.
+
+    Returns process and port it listens on
+    """
+    ctx = get_context('spawn')
+    parent, child = ctx.Pipe()
+    process = ctx.Process(
+        target=_run,
+        args=(child, certfile, keyfile),
+        daemon=True
+    )
+    process.start()
+    return process, parent.recv()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--tls', action='store_true',
+                        help='serve HTTPS with self-signed certificate')
+    args = parser.parse_args()
+    cert = create_certificate() if args.tls else (None, None)
+    print(f'Listening on 127.0.0.1:{args.port}')
+    serve(args.port, *cert).serve_forever()
@@ -0,0 +1,203 @@
+"""Transport benchmarks against local server.
+
+Every scenario runs in its own process, so that CPU time
+and peak RSS are its own, server runs in yet another one.
+
+    python -m benchmarks.transport [--quick] [scenario ...]
+"""
+from typing import Dict, List, Optional, Iterable
+from collections import namedtuple
+from time import perf_counter, process_time
+import argparse
+import json
+import subprocess
+import sys
+import resource
+
+from gevent import spawn, joinall
+
+
+scenario = namedtuple(
+    'Scenario',
+    ['mode', 'count', 'concurrency', 'path', 'tls']
+    )
+
+SCENARIOS = {
+    # New connection for every request
+    'get': scenario('get', 500, 1, '/size=1024', False),
+    'client': scenario('client', 5000, 50, '/size=1024', False),
+    'client-chunked': scenario('client', 5000, 50,
+                               '/size=1024/chunked=1', False),
+    'client-64k': scenario('client', 2000, 50, '/size=65536', False),
+    'client-latency': scenario('client', 2000, 100,
+                               '/size=1024/delay=10', False),
+    'client-tls': scenario('client', 2000, 50, '/size=1024', True),
+    'download': scenario('client', 5, 1, '/size=104857600', False),
+    'download-chunked': scenario('client', 5, 1,
+                                 '/size=104857600/chunked=1', False),
+}
+
+# Metrics where higher value is better
+higher_is_better = frozenset(('rps', 'mb_s', 'tls_reused'))
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss / (2 ** 20 if sys.platform == 'darwin' else 1024)
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[round(p * (len(values) - 1))]
+
+
+def measure(name: str, addr: str, cafile: Optional[str] = None,
+            quick: bool = False) -> Dict[str, float]:
+    """Run scenario in current process
+    """
+    from genki import Client, get
+    from genki.http.request import ConnectionPool, create_ssl_context
+
+    mode, count, concurrency, path, tls = SCENARIOS[name]
+    if quick:
+        count = max(concurrency, count // 10)
+    url = f'{"https" if tls else "http"}://{addr}{path}'
+    latencies: List[float] = []
+    received = 0
+
+    if mode == 'get':
+        def fetch():
+            return get(url, timeout=30).result(exc_raise=True)
+        client = None
+    else:
+        client = Client(
+            timeout=30,
+            pool=ConnectionPool(maxsize=concurrency),
+            ssl_context=create_ssl_context(cafile) if tls else None
+        )
+
+        def fetch():
+            return client.get(url).result(exc_raise=True)
+
+    def worker(number: int):
+        nonlocal received
+        for _ in range(number):
+            start = perf_counter()
+            res = fetch()
+            latencies.append(perf_counter() - start)
+            received += len(res.raw_body)
+
+    # Connections are established before measurement, the first
+    # one alone, so that the others can resume its TLS session
+    worker(1)
+    joinall([spawn(worker, 1) for _ in range(concurrency - 1)],
+            raise_error=True)
+    latencies.clear()
+    received = 0
+
+    cpu = process_time()
+    start = perf_counter()
+    share, extra = divmod(count, concurrency)
+    joinall(
+        [spawn(worker, share + (i < extra)) for i in range(concurrency)],
+        raise_error=True
+    )
+    elapsed = perf_counter() - start
+    cpu = process_time() - cpu
+
+    result = {
+        'requests': count,
+        'rps': count / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'cpu_us': cpu / count * 1e6,
+        'mb_s': received / elapsed / 2 ** 20,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if client is not None:
+        if tls:
+            # Handshakes that resumed TLS session
+            result['tls_reused'] = client.tls_sessions.reused
+        client.close()
+    return result
+
+
+def run(names: Optional[Iterable[str]] = None,
+        quick: bool = False) -> Dict[str, Dict[str, float]]:
+    """Run scenarios, each in its own process,
+    against server running in another one
+    """
+    from .server import start_process, create_certificate
+
+    names = list(names or SCENARIOS)
+    servers = []
+    process, port = start_process()
+    servers.append(process)
+    addrs = {False: f'127.0.0.1:{port}'}
+    certfile = None
+    if any(SCENARIOS[i].tls for i in names):
+        try:
+            certfile, keyfile = create_certificate()
+        except (OSError, subprocess.CalledProcessError) as err:
+            print(f'Skipping TLS scenarios, no certificate: {err}',
+                  file=sys.stderr)
+            names = [i for i in names if not SCENARIOS[i].tls]
+        else:
+            process, port = start_process(certfile, keyfile)
+            servers.append(process)
+            addrs[True] = f'127.0.0.1:{port}'
+
+    results = dict()
+    try:
+        for name in names:
+            command = [
+                sys.executable, '-m', 'benchmarks.transport',
+                '--child', name,
+                '--addr', addrs[SCENARIOS[name].tls],
+            ]
+            if certfile is not None:
+                command += ['--cafile', certfile]
+            if quick:
+                command.append('--quick')
+            out = subprocess.run(
+                command, check=True, capture_output=True, text=True)
+            results[name] = json.loads(out.stdout)
+    finally:
+        for process in servers:
+            process.terminate()
+    return results
+
+
+def report(results: Dict[str, Dict[str, float]]):
+    columns = ('rps', 'p50_ms', 'p99_ms', 'cpu_us', 'mb_s', 'peak_rss_mb')
+    print(f'{"":<18}' + ''.join(f'{i:>13}' for i in columns))
+    for name, result in results.items():
+        print(f'{name:<18}' + ''.join(
+            f'{result[i]:>13.2f}' for i in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('scenarios', nargs='*',
+                        help=f'scenarios to run, all by default: '
+                             f'{", ".join(SCENARIOS)}')
+    parser.add_argument('--quick', action='store_true',
+                        help='ten times fewer requests')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--addr', help=argparse.SUPPRESS)
+    parser.add_argument('--cafile', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(
+            measure(args.child, args.addr, args.cafile, args.quick)))
+        return
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+    report(run(args.scenarios, args.quick))
+
+
+if __name__ == '__main__':
+    main()
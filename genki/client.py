@@ -1,11 +1,20 @@
 from logging import getLogger
-from typing import Optional, Union, Mapping
+from typing import Optional, Union, Mapping, Iterable, Iterator, Deque, \
+    Set, Callable, Any
+from collections import deque
+from time import monotonic
 
-from gevent import joinall
+from gevent import joinall, ssl
+from gevent.queue import Queue
 
-from .http import Headers
+from .http import Headers, Method, ConnectionPool, Resolver, Response
+from .http.request import (
+    TLSSessionCache, Pipeline, HTTP2Transport, RedirectCache,
+    ResponseCache, Retry, Timeout, Hooks, create_ssl_context
+)
 from .async_request import AsyncRequest
-from .http_requests import (get, post, put, patch, delete)
+from .http_requests import request
+from .limiter import ConcurrencyLimiter, RateLimiter, RateLimit
 
 logger = getLogger('genki')
 
@@ -32,150 +41,416 @@ class Client:
     Optionally timeout option can be passed into constructor
     to be applied to all requests of this client. Timeout
     can still be passed for individual requests and will take
-    priority over Client's timeout.
+    priority over Client's timeout. Timeout object sets separate
+    limits for connecting, TLS handshake, each read and whole request.
+
+    Connections are kept alive and reused between requests
+    of the same client. Custom ConnectionPool can be passed
+    to tune its size and idle timeout, or to share it between clients.
+    When client exits context, idle connections are closed.
+
+    Number of simultaneous requests can be limited with max_concurrency
+    and max_per_host, requests over the limit wait in queue.
+    Client.in_flight and Client.queued show how many requests
+    are running and waiting.
+
+    Rate of requests can be limited with token buckets, so that
+    servers do not reject them for coming too fast. rate_limits maps
+    hosts or glob patterns of hosts to (requests per second, burst),
+    rate_limit applies to every other host. Requests over the limit
+    wait in the hub, Client.rate_limiter.stats tells how many are
+    waiting and how long they waited.
+
+    Client.map() and Client.imap_unordered() perform requests
+    for every item of (possibly lazy) iterable, keeping no more
+    than window of them in flight.
+
+    Hostname lookups are cached by client's Resolver,
+    same resolver can be passed to several clients to share the cache.
+
+    HTTPS connections use client's ssl_context, by default one
+    verifying certificates against system CA store. TLS sessions
+    are remembered per server, so new connections resume them.
+
+    With pipelining enabled idempotent requests to the same server
+    are sent up to pipeline_depth at a time on one connection,
+    without waiting for each response before sending the next request.
+
+    With http2 enabled (requires h2 package) HTTPS servers that offer h2
+    via ALPN get all concurrent requests multiplexed over one connection,
+    other servers are spoken to over HTTP/1.1. http2_cleartext makes
+    client speak HTTP/2 to http:// servers without negotiation.
+
+    Responses are requested compressed and decompressed as they arrive,
+    unless decode_content is False. Decompressed body larger than
+    max_decompressed_size bytes fails the request with ContentTooLarge.
+
+    Permanent redirects (301 and 308) are remembered by client's
+    RedirectCache, so later requests to old URL go straight
+    to its new location.
+
+    Responses can be cached by passing ResponseCache as cache.
+    Fresh responses are then served without going to the network
+    and stale ones are revalidated with conditional requests.
+
+    With retry policy requests that fail with network errors
+    or retryable statuses (429, 502, 503, 504) are repeated
+    after randomized exponential backoff or as long as Retry-After
+    says, only idempotent ones by default.
+
+    Responses and exceptions carry Timings of DNS lookup, connecting,
+    TLS handshake, waiting for response and receiving body.
+    on_request_start(request), on_connect(request, timings),
+    on_headers(request, status_code, headers) and
+    on_complete(request, result) are called as requests progress,
+    e.g. to feed metrics.
     """
     __slots__ = (
         'timeout',
+        'pool',
+        'limiter',
+        'rate_limiter',
+        'hooks',
+        'resolver',
+        'ssl_context',
+        'tls_sessions',
+        'pipeline',
+        'http2',
+        'decode_content',
+        'max_decompressed_size',
+        'redirects',
+        'cache',
+        'retry',
         '_requests'
     )
 
-    def __init__(self, timeout=None):
+    def __init__(self,
+                 timeout=None,
+                 pool: Optional[ConnectionPool] = None,
+                 max_concurrency: Optional[int] = None,
+                 max_per_host: Optional[int] = None,
+                 rate_limits: Optional[Mapping[str, RateLimit]] = None,
+                 rate_limit: Optional[RateLimit] = None,
+                 resolver: Optional[Resolver] = None,
+                 ssl_context: Optional[ssl.SSLContext] = None,
+                 pipelining: bool = False,
+                 pipeline_depth: int = 8,
+                 http2: bool = False,
+                 http2_cleartext: bool = False,
+                 decode_content: bool = True,
+                 max_decompressed_size: Optional[int] = 100 * 1024 * 1024,
+                 redirects: Optional[RedirectCache] = None,
+                 cache: Optional[ResponseCache] = None,
+                 retry: Optional[Retry] = None,
+                 on_request_start: Optional[Callable[..., Any]] = None,
+                 on_connect: Optional[Callable[..., Any]] = None,
+                 on_headers: Optional[Callable[..., Any]] = None,
+                 on_complete: Optional[Callable[..., Any]] = None):
         self.timeout = timeout
-        self._requests = []
+        self.pool = ConnectionPool() if pool is None else pool
+        self.limiter = ConcurrencyLimiter(max_concurrency, max_per_host)
+        self.rate_limiter: Optional[RateLimiter] = None
+        if rate_limits or rate_limit is not None:
+            self.rate_limiter = RateLimiter(rate_limits, rate_limit)
+        self.resolver = Resolver() if resolver is None else resolver
+        self.ssl_context = create_ssl_context() \
+            if ssl_context is None else ssl_context
+        self.tls_sessions = TLSSessionCache()
+        self.pipeline = Pipeline(pipeline_depth) if pipelining else None
+        self.http2: Optional[HTTP2Transport] = None
+        if http2 or http2_cleartext:
+            self.http2 = HTTP2Transport(cleartext=http2_cleartext)
+            self.ssl_context.set_alpn_protocols(['h2', 'http/1.1'])
+        self.decode_content = decode_content
+        self.max_decompressed_size = max_decompressed_size
+        self.redirects = RedirectCache() if redirects is None else redirects
+        self.cache = cache
+        self.retry = retry
+        self.hooks = Hooks.of(
+            on_request_start=on_request_start,
+            on_connect=on_connect,
+            on_headers=on_headers,
+            on_complete=on_complete
+            )
+        self._requests: Set[AsyncRequest] = set()
 
     def __enter__(self):
         return self
 
     def __exit__(self, *args, **kwargs):
         self.collect()
+        self.close()
 
-    def collect(self, timeout=None):
-        """Wait till all previously defined requests are finished
+    @property
+    def in_flight(self) -> int:
+        """Number of requests currently running
         """
-        if not self._requests:
-            return
-        joinall([
-            i.async_result
-            for i in self._requests
-            if not i.is_done
-        ])
-        self._requests.clear()
+        return self.limiter.in_flight
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for their turn
+        """
+        return self.limiter.queued
+
+    def close(self):
+        """Close all idle connections of this client
+        """
+        self.pool.clear()
+        if self.http2 is not None:
+            self.http2.close()
+
+    def collect(self, timeout: Optional[float] = None) -> bool:
+        """Wait till all requests in flight are finished,
+        but no longer than timeout seconds.
+
+        Returns False if some requests are still running
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        # Requests may be spawned while waiting, e.g. by callbacks
+        while True:
+            pending = [
+                i.async_result
+                for i in self._requests
+                if not i.is_done
+            ]
+            if not pending:
+                return True
+            left = None
+            if deadline is not None:
+                left = deadline - monotonic()
+                if left <= 0:
+                    return False
+            joinall(pending, timeout=left)
+
+    def _request(self,
+                 method: Method,
+                 url,
+                 data=None,
+                 params: dict = None,
+                 headers: Union[Headers, Mapping] = Headers(),
+                 timeout: Union[float, Timeout, None] = None,
+                 follow_redirects: bool = True,
+                 redirects_limit: int = 5,
+                 stream: bool = False,
+                 track: bool = True
+                 ) -> AsyncRequest:
+        """Perform request with client's settings
+        and keep track of it, unless track is False
+        """
+        timeout = timeout or self.timeout
+        req = request(
+            method,
+            url=url,
+            data=data,
+            params=params,
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=follow_redirects,
+            redirects_limit=redirects_limit,
+            stream=stream,
+            pool=self.pool,
+            limiter=self.limiter,
+            rate_limiter=self.rate_limiter,
+            hooks=self.hooks,
+            resolver=self.resolver,
+            ssl_context=self.ssl_context,
+            tls_sessions=self.tls_sessions,
+            pipeline=self.pipeline,
+            http2=self.http2,
+            redirects=self.redirects,
+            cache=self.cache,
+            retry=self.retry,
+            decode_content=self.decode_content,
+            max_decompressed_size=self.max_decompressed_size)
+        if track:
+            # Finished requests are forgotten by client, so that
+            # their responses live only as long as caller keeps them
+            self._requests.add(req)
+            req.async_result.rawlink(
+                lambda _: self._requests.discard(req))
+        return req
+
+    def _request_args(self, item, kwargs: dict) -> dict:
+        """Arguments of request for item of Client.map() iterable
+        """
+        if isinstance(item, Mapping):
+            return {**kwargs, **item}
+        return {**kwargs, 'url': item}
+
+    def imap_unordered(self,
+                       method: Union[Method, str],
+                       iterable: Iterable,
+                       window: int = 100,
+                       **kwargs
+                       ) -> Iterator[Union[Response, Exception]]:
+        """Perform request for every item of iterable,
+        yielding results as they complete.
+
+        Item is either URL or dict of request arguments,
+        kwargs are arguments shared by all requests.
+        Iterable is consumed lazily and no more than window requests
+        are in flight at a time, so memory use does not depend on
+        number of items. If iteration is stopped early,
+        requests that are already in flight still finish.
+        """
+        if window < 1:
+            raise ValueError('window must be at least 1')
+        method = Method(method)
+        items = iter(iterable)
+        done = Queue()
+        in_flight = 0
+        exhausted = False
+        while True:
+            while not exhausted and in_flight < window:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                req = self._request(
+                    method, track=False, **self._request_args(item, kwargs))
+                req.async_result.rawlink(
+                    lambda _, req=req: done.put(req))
+                in_flight += 1
+            if not in_flight:
+                return
+            req = done.get()
+            in_flight -= 1
+            yield req.result()
+
+    def map(self,
+            method: Union[Method, str],
+            iterable: Iterable,
+            window: int = 100,
+            **kwargs
+            ) -> Iterator[Union[Response, Exception]]:
+        """Same as Client.imap_unordered(),
+        but results are yielded in order of items
+        """
+        if window < 1:
+            raise ValueError('window must be at least 1')
+        method = Method(method)
+        pending: Deque[AsyncRequest] = deque()
+        for item in iterable:
+            if len(pending) >= window:
+                yield pending.popleft().result()
+            pending.append(self._request(
+                method, track=False, **self._request_args(item, kwargs)))
+        while pending:
+            yield pending.popleft().result()
 
     def get(self,
             url,
             data=None,
             params: dict = None,
             headers: Union[Headers, Mapping] = Headers(),
-            timeout: Optional[float] = None,
+            timeout: Union[float, Timeout, None] = None,
             follow_redirects: bool = True,
-            redirects_limit: int = 5
+            redirects_limit: int = 5,
+            stream: bool = False
             ) -> AsyncRequest:
         """Perform GET request
         """
-        timeout = timeout or self.timeout
-        req = get(
+        return self._request(
+            Method.GET,
             url=url,
             data=data,
             params=params,
             headers=headers,
             timeout=timeout,
             follow_redirects=follow_redirects,
-            redirects_limit=redirects_limit)
-        self._requests.append(req)
-        return req
+            redirects_limit=redirects_limit,
+            stream=stream)
 
     def post(self,
              url,
              data=None,
              params: dict = None,
              headers: Union[Headers, Mapping] = Headers(),
-             timeout: Optional[float] = None,
+             timeout: Union[float, Timeout, None] = None,
              follow_redirects: bool = True,
-             redirects_limit: int = 5
+             redirects_limit: int = 5,
+             stream: bool = False
              ) -> AsyncRequest:
         """Perform POST request
         """
-        timeout = timeout or self.timeout
-
-        req = post(
+        return self._request(
+            Method.POST,
             url=url,
             data=data,
             params=params,
             headers=headers,
             timeout=timeout,
             follow_redirects=follow_redirects,
-            redirects_limit=redirects_limit)
-        self._requests.append(req)
-        return req
+            redirects_limit=redirects_limit,
+            stream=stream)
 
     def patch(self,
               url,
               data=None,
               params: dict = None,
               headers: Union[Headers, Mapping] = Headers(),
-              timeout: Optional[float] = None,
+              timeout: Union[float, Timeout, None] = None,
               follow_redirects: bool = True,
-              redirects_limit: int = 5
+              redirects_limit: int = 5,
+              stream: bool = False
               ) -> AsyncRequest:
         """Perform PATCH request
         """
-        timeout = timeout or self.timeout
-
-        req = patch(
+        return self._request(
+            Method.PATCH,
             url=url,
             data=data,
             params=params,
             headers=headers,
             timeout=timeout,
             follow_redirects=follow_redirects,
-            redirects_limit=redirects_limit)
-        self._requests.append(req)
-        return req
+            redirects_limit=redirects_limit,
+            stream=stream)
 
     def put(self,
             url,
             data=None,
             params: dict = None,
             headers: Union[Headers, Mapping] = Headers(),
-            timeout: Optional[float] = None,
+            timeout: Union[float, Timeout, None] = None,
             follow_redirects: bool = True,
-            redirects_limit: int = 5
+            redirects_limit: int = 5,
+            stream: bool = False
             ) -> AsyncRequest:
         """Perform PUT request
         """
-        timeout = timeout or self.timeout
-
-        req = put(
+        return self._request(
+            Method.PUT,
             url=url,
             data=data,
             params=params,
             headers=headers,
             timeout=timeout,
             follow_redirects=follow_redirects,
-            redirects_limit=redirects_limit)
-        self._requests.append(req)
-        return req
+            redirects_limit=redirects_limit,
+            stream=stream)
 
     def delete(self,
                url,
                data=None,
                params: dict = None,
                headers: Union[Headers, Mapping] = Headers(),
-               timeout: Optional[float] = None,
+               timeout: Union[float, Timeout, None] = None,
                follow_redirects: bool = True,
-               redirects_limit: int = 5
+               redirects_limit: int = 5,
+               stream: bool = False
                ) -> AsyncRequest:
         """Perform DELETE request
         """
-        timeout = timeout or self.timeout
-
-        req = delete(
+        return self._request(
+            Method.DELETE,
             url=url,
             data=data,
             params=params,
             headers=headers,
             timeout=timeout,
             follow_redirects=follow_redirects,
-            redirects_limit=redirects_limit)
-        self._requests.append(req)
-        return req
+            redirects_limit=redirects_limit,
+            stream=stream)
@@ -5,5 +5,8 @@ from .response import Response  # NOQA
 from .url.exceptions import InvalidURL  # NOQA
 from .constants import StatusCode, Scheme, Method  # NOQA
 from .headers import Headers  # NOQA
+from .exceptions import ContentTooLarge  # NOQA
 
-from .request import RequestBuilder, HTTPSession  # NOQA
+from .request import (  # NOQA
+    RequestBuilder, HTTPSession, ConnectionPool, Resolver
+)
@@ -0,0 +1,101 @@
+from typing import Optional, Callable, Union
+from codecs import lookup, BOM_UTF8, BOM_UTF16_LE, BOM_UTF16_BE, \
+    BOM_UTF32_LE, BOM_UTF32_BE
+import re
+
+from chardet import detect
+
+try:
+    # C implementation, much faster than chardet
+    import cchardet
+except ImportError:
+    cchardet = None
+
+
+Detector = Callable[[bytes], Optional[str]]
+
+# Longer ones first, UTF-32 LE BOM starts with UTF-16 LE one
+boms = (
+    (BOM_UTF32_LE, 'utf-32'),
+    (BOM_UTF32_BE, 'utf-32'),
+    (BOM_UTF8, 'utf-8-sig'),
+    (BOM_UTF16_LE, 'utf-16'),
+    (BOM_UTF16_BE, 'utf-16'),
+)
+
+meta_charset = re.compile(
+    rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)',
+    re.IGNORECASE
+    )
+
+# How many bytes of body are given to statistical detector
+sample_size = 64 * 1024
+# Browsers look for <meta charset> in the first 1024 bytes
+meta_sample_size = 1024
+
+
+def chardet_detector(sample: bytes) -> Optional[str]:
+    """Detect encoding with chardet or cchardet, if it is installed
+    """
+    backend = detect if cchardet is None else cchardet.detect
+    result = backend(sample)
+    if result['encoding'] and round(result['confidence'] or 0):
+        return result['encoding']
+    return None
+
+
+detector: Detector = chardet_detector
+
+
+def set_detector(func: Detector):
+    """Replace statistical detector used when encoding
+    can not be found out otherwise.
+
+    func - callable that takes bytes and returns
+    encoding name or None
+    """
+    global detector
+    detector = func
+
+
+def normalize(encoding: Optional[str]) -> Optional[str]:
+    """Name of python codec for encoding, None if there is none
+    """
+    if not encoding:
+        return None
+    try:
+        return lookup(encoding).name
+    except LookupError:
+        return None
+
+
+def sniff_bom(data: Union[bytes, memoryview]) -> Optional[str]:
+    """Encoding specified by byte order mark
+    """
+    start = bytes(data[:4])
+    for bom, encoding in boms:
+        if start.startswith(bom):
+            return encoding
+    return None
+
+
+def sniff_meta(data: Union[bytes, memoryview]) -> Optional[str]:
+    """Encoding declared by <meta charset> of html document
+    """
+    match = meta_charset.search(bytes(data[:meta_sample_size]))
+    if match is None:
+        return None
+    return normalize(match.group(1).decode('ascii'))
+
+
+def detect_charset(data: Union[bytes, memoryview],
+                   is_html: bool = False) -> Optional[str]:
+    """Find out encoding of text: byte order mark, <meta charset>
+    for html, then statistical detection on a sample of text
+    """
+    encoding = sniff_bom(data)
+    if encoding is None and is_html:
+        encoding = sniff_meta(data)
+    if encoding is None:
+        encoding = normalize(detector(bytes(data[:sample_size])))
+    return encoding
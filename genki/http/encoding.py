@@ -0,0 +1,254 @@
+from typing import Optional, List
+from abc import ABC, abstractmethod
+import zlib
+
+from .exceptions import ContentTooLarge, DecodingError
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class ContentDecoder(ABC):
+    """Incrementally decompresses body of given Content-Encoding
+
+    max_size - maximum size of decompressed body,
+    ContentTooLarge is raised when it is exceeded
+    """
+
+    __slots__ = ('max_size', 'size')
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size
+        self.size = 0
+
+    def _limit(self) -> int:
+        """How many bytes can be produced by next call,
+        one more than allowed to detect the overflow
+        """
+        if self.max_size is None:
+            return 0
+        return self.max_size - self.size + 1
+
+    def _count(self, data: bytes) -> bytes:
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise ContentTooLarge(
+                f'Decompressed body exceeds {self.max_size} bytes'
+                )
+        return data
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        """Decompress next piece of body
+        """
+
+    def flush(self) -> bytes:
+        return b''
+
+
+class ZlibDecoder(ContentDecoder):
+    """Decoder for gzip and deflate encodings
+    """
+
+    __slots__ = ('_obj', '_wbits', '_started')
+
+    def __init__(self, wbits: int, max_size: Optional[int] = None):
+        super().__init__(max_size)
+        self._wbits = wbits
+        self._obj = zlib.decompressobj(wbits)
+        self._started = False
+
+    def decompress(self, data: bytes) -> bytes:
+        if not data:
+            return b''
+        try:
+            if not self._started and self._wbits == zlib.MAX_WBITS:
+                self._started = True
+                try:
+                    return self._decompress(data)
+                except zlib.error:
+                    # Some servers send raw deflate stream without zlib
+                    # header, even though RFC says they should not
+                    self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decompress(data)
+        except zlib.error as err:
+            raise DecodingError(str(err)) from None
+
+    def _decompress(self, data: bytes) -> bytes:
+        output = []
+        while data:
+            chunk = self._count(self._obj.decompress(data, self._limit()))
+            output.append(chunk)
+            data = self._obj.unconsumed_tail
+            if self._obj.eof and self._obj.unused_data \
+                    and self._wbits > zlib.MAX_WBITS:
+                # Concatenated gzip members
+                data = self._obj.unused_data
+                self._obj = zlib.decompressobj(self._wbits)
+        return b''.join(output)
+
+    def flush(self) -> bytes:
+        return self._count(self._obj.flush())
+
+
+class BrotliDecoder(ContentDecoder):
+    """Decoder for br encoding. Output of every call is bounded
+    with output_buffer_limit of brotli 1.2, older versions are
+    fed with small slices of input instead
+    """
+
+    __slots__ = ('_obj',)
+
+    # Bytes of input fed at once to brotli without output limit,
+    # each of them may still expand to several megabytes
+    slice_size = 16
+
+    def __init__(self, max_size: Optional[int] = None):
+        super().__init__(max_size)
+        self._obj = brotli.Decompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        if not data:
+            return b''
+        try:
+            if self.max_size is None:
+                return self._count(self._obj.process(bytes(data)))
+            if hasattr(self._obj, 'can_accept_more_data'):
+                return self._process_limited(bytes(data))
+            view = memoryview(data)
+            return b''.join(
+                self._count(self._obj.process(bytes(
+                    view[i:i + self.slice_size])))
+                for i in range(0, len(view), self.slice_size)
+            )
+        except brotli.error as err:
+            raise DecodingError(str(err)) from None
+
+    def _process_limited(self, data: bytes) -> bytes:
+        obj = self._obj
+        output = [self._count(
+            obj.process(data, output_buffer_limit=self._limit()))]
+        while not obj.is_finished() and not obj.can_accept_more_data():
+            output.append(self._count(
+                obj.process(b'', output_buffer_limit=self._limit())))
+        return b''.join(output)
+
+
+class ZstdDecoder(ContentDecoder):
+    """Decoder for zstd encoding. Decompressed data is written
+    to decoder in pieces of write_size bytes, so that the limit
+    is checked before the whole input is expanded
+    """
+
+    __slots__ = ('_obj', '_output')
+
+    write_size = 65536
+
+    def __init__(self, max_size: Optional[int] = None):
+        super().__init__(max_size)
+        self._output: List[bytes] = []
+        self._obj = zstandard.ZstdDecompressor().stream_writer(
+            self, write_size=self.write_size)
+
+    def write(self, data: bytes) -> int:
+        self._output.append(self._count(bytes(data)))
+        return len(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        if not data:
+            return b''
+        try:
+            self._obj.write(data)
+        except zstandard.ZstdError as err:
+            raise DecodingError(str(err)) from None
+        output, self._output = self._output, []
+        return b''.join(output)
+
+
+class MultiDecoder(ContentDecoder):
+    """Decoder for several encodings applied one after another,
+    every one of them is limited to max_size as well, so that
+    intermediate data of stacked encodings is not expanded past it
+    """
+
+    __slots__ = ('_decoders',)
+
+    def __init__(self,
+                 decoders: List[ContentDecoder],
+                 max_size: Optional[int] = None):
+        super().__init__(max_size)
+        # Encodings are listed in order they were applied
+        self._decoders = list(reversed(decoders))
+        for decoder in self._decoders:
+            decoder.max_size = max_size
+
+    def decompress(self, data: bytes) -> bytes:
+        for decoder in self._decoders:
+            data = decoder.decompress(data)
+        return self._count(data)
+
+    def flush(self) -> bytes:
+        data = b''
+        for decoder in self._decoders:
+            data = decoder.decompress(data) + decoder.flush()
+        return self._count(data)
+
+
+def supported_encodings() -> List[str]:
+    """Content codings that can be decoded
+    with installed packages
+    """
+    encodings = ['gzip', 'deflate']
+    if brotli is not None:
+        encodings.append('br')
+    if zstandard is not None:
+        encodings.append('zstd')
+    return encodings
+
+
+accept_encoding = ', '.join(supported_encodings())
+
+
+def _single_decoder(encoding: str,
+                    max_size: Optional[int]) -> Optional[ContentDecoder]:
+    if encoding in ('gzip', 'x-gzip'):
+        return ZlibDecoder(16 + zlib.MAX_WBITS, max_size)
+    if encoding == 'deflate':
+        return ZlibDecoder(zlib.MAX_WBITS, max_size)
+    if encoding == 'br' and brotli is not None:
+        return BrotliDecoder(max_size)
+    if encoding == 'zstd' and zstandard is not None:
+        return ZstdDecoder(max_size)
+    return None
+
+
+def get_decoder(content_encoding: str,
+                max_size: Optional[int] = None) -> Optional[ContentDecoder]:
+    """Decoder for Content-Encoding header value,
+    None if body is not encoded or encoding is not supported
+    """
+    encodings = [
+        i.strip().lower()
+        for i in content_encoding.split(',')
+        if i.strip() and i.strip().lower() != 'identity'
+    ]
+    if not encodings:
+        return None
+
+    decoders = []
+    for encoding in encodings:
+        decoder = _single_decoder(encoding, max_size)
+        if decoder is None:
+            return None
+        decoders.append(decoder)
+
+    if len(decoders) == 1:
+        return decoders[0]
+    return MultiDecoder(decoders, max_size)
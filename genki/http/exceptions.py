@@ -1,5 +1,30 @@
 from gevent import socket
 
+
+class InvalidResponse(Exception):
+    """Server response does not conform to HTTP/1.x
+    """
+    pass
+
+
+class IncompleteResponse(InvalidResponse, ConnectionError):
+    """Connection was closed before response was complete
+    """
+    pass
+
+
+class ContentTooLarge(InvalidResponse):
+    """Decompressed response body exceeds allowed size
+    """
+    pass
+
+
+class DecodingError(InvalidResponse):
+    """Response body can not be decoded according to its Content-Encoding
+    """
+    pass
+
+
 network_exceptions = (
     socket.timeout,
     socket.gaierror,
@@ -7,4 +32,4 @@ network_exceptions = (
     ConnectionError,
     ConnectionAbortedError,
     ConnectionResetError
-)
\ No newline at end of file
+)
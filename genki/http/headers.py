@@ -1,54 +1,199 @@
-from collections import OrderedDict
-from typing import Union, Mapping, Dict
+from collections.abc import MutableMapping
+from sys import intern
+from typing import Union, Mapping, Dict, List, Tuple, Iterator, Optional
 
 
-class Headers(OrderedDict):
+HeaderValue = Union[str, int]
+
+
+class Headers(MutableMapping):
+    """Case insensitive collection of HTTP headers.
+
+    Header may have several values, Headers['Name'] returns
+    them joined with comma, Headers.get_all('Name') as a list.
+    Names keep the case they were first set with.
+    """
+
+    __slots__ = ('_fields', '_lines', '_bytes')
+
+    def __init__(self,
+                 headers: Optional[Union[Mapping, 'Headers']] = None):
+        # lowercase name -> (name, value, ...)
+        self._fields: Dict[str, Tuple[str, ...]] = dict()
+        # lowercase name -> encoded header lines, see _encoded_lines()
+        self._lines: Optional[Dict[str, bytes]] = None
+        # Cached result of to_bytes()
+        self._bytes: Optional[bytes] = None
+        if headers is None:
+            return
+        if isinstance(headers, Headers):
+            # Fields are immutable, so they can be shared
+            self._fields = headers._fields.copy()
+            self._lines = headers._encoded_lines().copy()
+            self._bytes = headers._bytes
+        else:
+            for key, value in headers.items():
+                self[key] = value
+
     @classmethod
-    def from_bytes(cls, b: bytes):
-        if b'\r\n\r\n' in b:
-            b = b[:b.find(b'\r\n\r\n')]
-
-        headers: Dict[str, Union[str, int]] = Headers()
-        for line in b.split(b'\r\n'):
-            if b':' in line:
-                header, *value = line.split(b':', maxsplit=1)
-                if not value:
-                    continue
-
-                header_str, value_str = \
-                    header.decode().strip(), value[0].decode().strip()
-
-                if header_str in headers.keys():
-                    # Multiple message-header fields
-                    # Accoring to RFC 2616
-                    headers[header_str] = \
-                        str(headers[header_str]) + ',' + value_str
-                elif value_str.isdigit():
-                    value_int = int(value_str)
-                    headers[header_str] = value_int
-                else:
-                    headers[header_str] = value_str
+    def from_bytes(cls, b: bytes) -> 'Headers':
+        """Parse header lines, status line if present is skipped
+        """
+        end = b.find(b'\r\n\r\n')
+        if end != -1:
+            b = b[:end]
+
+        headers = cls()
+        fields = headers._fields
+        for line in b.decode('utf-8', 'surrogateescape').split('\r\n'):
+            name, sep, value = line.partition(':')
+            if not sep:
+                continue
+            # Header names repeat across messages,
+            # interned they are stored once for all instances
+            name = intern(name.strip())
+            key = intern(name.lower())
+            field = fields.get(key)
+            if field is None:
+                fields[key] = (name, value.strip())
+            else:
+                # Multiple message-header fields
+                # Accoring to RFC 2616
+                fields[key] = field + (value.strip(),)
         return headers
 
-    def to_str(self):
-        s = '\r\n'.join(
-            [
-                f'{key}: {value}'
-                for key, value in self.items()
-            ]
-        )
-        s += '\r\n\r\n'
-        return s
+    def _encoded_lines(self) -> Dict[str, bytes]:
+        """Encoded header lines by lowercase name.
+
+        Made for headers that are copied or changed after
+        they were serialized, e.g. shared by requests that set
+        their own Host, and then kept up to date as fields change,
+        so that only changed lines are encoded again
+        """
+        if self._lines is None:
+            self._lines = {
+                key: _encode_field(field)
+                for key, field in self._fields.items()
+            }
+        return self._lines
+
+    def _set_field(self, key: str, field: Tuple[str, ...]):
+        if self._bytes is not None:
+            self._encoded_lines()
+        self._fields[key] = field
+        if self._lines is not None:
+            self._lines[key] = _encode_field(field)
+        self._bytes = None
+
+    def __getitem__(self, name: str) -> str:
+        field = self._fields[name.lower()]
+        return field[1] if len(field) == 2 else ', '.join(field[1:])
+
+    def get(self, name: str, default=None):
+        field = self._fields.get(name.lower())
+        if field is None:
+            return default
+        return field[1] if len(field) == 2 else ', '.join(field[1:])
+
+    def __setitem__(self, name: str, value: HeaderValue):
+        key = name.lower()
+        value = str(value)
+        field = self._fields.get(key)
+        if field is None:
+            self._set_field(key, (name, value))
+        elif len(field) != 2 or field[1] != value:
+            self._set_field(key, (field[0], value))
+
+    def __delitem__(self, name: str):
+        key = name.lower()
+        del self._fields[key]
+        if self._lines is not None:
+            del self._lines[key]
+        self._bytes = None
 
-    def to_bytes(self):
-        return self.to_str().encode()
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and name.lower() in self._fields
 
-    def __bool__(self):
-        return bool(self.headers)
+    def __iter__(self) -> Iterator[str]:
+        return (field[0] for field in self._fields.values())
+
+    def __len__(self) -> int:
+        return len(self._fields)
 
     def __repr__(self):
-        return f'{self.__class__.__name__}({self.headers})'
+        return f'{self.__class__.__name__}({dict(self.items())})'
+
+    def add(self, name: str, value: HeaderValue):
+        """Add value to header, keeping the ones it already has
+        """
+        key = name.lower()
+        field = self._fields.get(key)
+        if field is None:
+            self._set_field(key, (name, str(value)))
+        else:
+            self._set_field(key, field + (str(value),))
+
+    def get_all(self, name: str) -> List[str]:
+        """All values of header, e.g. every Set-Cookie
+        """
+        field = self._fields.get(name.lower())
+        return [] if field is None else list(field[1:])
+
+    def multi_items(self) -> Iterator[Tuple[str, str]]:
+        """(name, value) pair for each value of each header
+        """
+        for name, *values in self._fields.values():
+            for value in values:
+                yield name, value
+
+    def remove_header(self, name: str):
+        """Remove header if it is present
+        """
+        if name in self:
+            del self[name]
+
+    def copy(self) -> 'Headers':
+        return self.__class__(self)
+
+    def to_str(self) -> str:
+        lines = []
+        for field in self._fields.values():
+            if len(field) == 2:
+                # Most headers have single value
+                lines.append(f'{field[0]}: {field[1]}\r\n')
+            else:
+                lines.append(_field_str(field))
+        lines.append('\r\n')
+        return ''.join(lines)
+
+    def to_bytes(self) -> bytes:
+        if self._bytes is None:
+            if self._lines is not None:
+                self._bytes = b''.join(self._lines.values()) + b'\r\n'
+            else:
+                # Encoding all lines at once is twice as fast
+                self._bytes = _encode(self.to_str())
+        return self._bytes
+
+
+def _field_str(field: Tuple[str, ...]) -> str:
+    """Header lines of field, one for each value
+    """
+    if len(field) == 2:
+        # Most headers have single value
+        return f'{field[0]}: {field[1]}\r\n'
+    name = field[0]
+    return f'{name}: ' + f'\r\n{name}: '.join(field[1:]) + '\r\n'
+
+
+def _encode(text: str) -> bytes:
+    try:
+        # Error handler argument makes encoding noticeably slower
+        return text.encode()
+    except UnicodeEncodeError:
+        # Undecodable bytes of parsed headers
+        return text.encode('utf-8', 'surrogateescape')
+
 
-    def __init__(self, headers: Mapping = dict()):
-        for key, value in headers.items():
-            self[key] = value
+def _encode_field(field: Tuple[str, ...]) -> bytes:
+    return _encode(_field_str(field))
@@ -0,0 +1,303 @@
+from typing import List, Optional, Dict
+from enum import IntEnum
+
+from .headers import Headers
+from .exceptions import InvalidResponse, IncompleteResponse
+
+
+class ParserState(IntEnum):
+    HEAD = 0
+    BODY_FIXED = 1
+    CHUNK_SIZE = 2
+    CHUNK_DATA = 3
+    CHUNK_END = 4
+    TRAILERS = 5
+    BODY_UNTIL_CLOSE = 6
+    DONE = 7
+
+
+# Headers parser needs to know to read response,
+# the rest are only parsed when ResponseParser.headers is accessed
+framing_headers = frozenset((
+    b'connection',
+    b'content-length',
+    b'transfer-encoding',
+    b'content-encoding'
+))
+
+
+# States in which parser waits for a complete line
+line_states = (
+    ParserState.CHUNK_SIZE,
+    ParserState.CHUNK_END,
+    ParserState.TRAILERS
+)
+
+# int() also accepts sign, underscores and 0x prefix,
+# which are not allowed in chunk size
+hex_digits = b'0123456789abcdefABCDEF'
+
+
+class ResponseParser:
+    """Incremental HTTP/1.x response parser.
+
+    Data received from server is fed to parser in pieces of any size,
+    parser returns pieces of body found in them. Once response is
+    complete parser stops consuming data, everything that was fed
+    after the end of response is available in ResponseParser.unused.
+
+    is_head - response is for HEAD request, so it has no body.\n
+    max_head_size - maximum size of status line and headers in bytes
+    """
+
+    __slots__ = (
+        'state',
+        'is_head',
+        'max_head_size',
+        'http_version',
+        'status_code',
+        'reason',
+        'head',
+        'trailers',
+        'remaining',
+        'bytes_received',
+        'unused',
+        '_buffer',
+        '_fields',
+        '_headers'
+    )
+
+    def __init__(self, is_head: bool = False, max_head_size: int = 65536):
+        self.state = ParserState.HEAD
+        self.is_head = is_head
+        self.max_head_size = max_head_size
+
+        self.http_version: Optional[str] = None
+        self.status_code: Optional[int] = None
+        self.reason = ''
+        self.head = b''
+        self.trailers = Headers()
+
+        # Bytes left in current fixed body or chunk
+        self.remaining = 0
+        self.bytes_received = 0
+        self.unused = b''
+        self._buffer = b''
+        self._fields: Optional[Dict[bytes, bytes]] = None
+        self._headers: Optional[Headers] = None
+
+    @property
+    def headers(self) -> Optional[Headers]:
+        """All response headers, parsed on first access
+        """
+        if self._headers is None and self._fields is not None:
+            self._headers = Headers.from_bytes(
+                self.head[self.head.find(b'\r\n') + 2:])
+        return self._headers
+
+    @property
+    def is_done(self) -> bool:
+        return self.state == ParserState.DONE
+
+    @property
+    def has_head(self) -> bool:
+        """True when status line and headers are parsed
+        """
+        return self.state != ParserState.HEAD
+
+    @property
+    def keep_alive(self) -> bool:
+        """True if connection can be reused after this response
+        """
+        if self._fields is None:
+            return False
+        if self.state == ParserState.BODY_UNTIL_CLOSE:
+            return False
+        if self.header('transfer-encoding') \
+                and self.header('content-length'):
+            # Someone on the way may have framed response
+            # by the other header, what follows can not be trusted
+            return False
+        connection = self.header('connection').lower()
+        if self.http_version == '1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def header(self, name: str) -> str:
+        """Value of header needed to read response,
+        name must be lowercase
+        """
+        if self._fields is None:
+            return ''
+        return self._fields.get(name.encode(), b'').decode('latin-1')
+
+    def _scan_fields(self, head: bytes, start: int):
+        """Collect values of framing headers
+        without parsing the rest of them
+        """
+        fields: Dict[bytes, bytes] = dict()
+        for line in head[start:].split(b'\r\n'):
+            name, sep, value = line.partition(b':')
+            if not sep:
+                continue
+            name = name.strip().lower()
+            if name in framing_headers:
+                value = value.strip()
+                if name in fields:
+                    value = fields[name] + b',' + value
+                fields[name] = value
+        self._fields = fields
+
+    def feed(self, data: bytes) -> List[memoryview]:
+        """Consume data received from server,
+        returns list of body pieces found in it
+        """
+        self.bytes_received += len(data)
+        if self.state == ParserState.DONE:
+            self.unused += data
+            return []
+
+        if self._buffer:
+            data = self._buffer + data
+            self._buffer = b''
+
+        view = memoryview(data)
+        size = len(data)
+        pos = 0
+        body: List[memoryview] = []
+
+        while pos < size:
+            state = self.state
+            if state == ParserState.HEAD:
+                end = data.find(b'\r\n\r\n', pos)
+                if end == -1:
+                    self._buffer = data[pos:]
+                    if len(self._buffer) > self.max_head_size:
+                        raise InvalidResponse('Response headers are too large')
+                    break
+                self._parse_head(data[pos:end + 4])
+                pos = end + 4
+
+            elif state in line_states:
+                end = data.find(b'\r\n', pos)
+                if end == -1:
+                    self._buffer = data[pos:]
+                    if len(self._buffer) > self.max_head_size:
+                        raise InvalidResponse('Chunk line is too long')
+                    break
+                self._parse_line(data[pos:end])
+                pos = end + 2
+
+            elif state == ParserState.BODY_UNTIL_CLOSE:
+                body.append(view[pos:])
+                pos = size
+
+            elif state == ParserState.DONE:
+                break
+
+            else:
+                # Fixed length body or chunk data
+                end = min(size, pos + self.remaining)
+                body.append(view[pos:end])
+                self.remaining -= end - pos
+                pos = end
+                if not self.remaining:
+                    self.state = ParserState.DONE \
+                        if state == ParserState.BODY_FIXED \
+                        else ParserState.CHUNK_END
+
+        if pos < size and self.state == ParserState.DONE:
+            self.unused = data[pos:]
+        return body
+
+    def skip_body(self, size: int):
+        """Account for size bytes of fixed length body
+        that were received without being fed to parser
+        """
+        if self.state != ParserState.BODY_FIXED or size > self.remaining:
+            raise ValueError('Not in the middle of fixed length body')
+        self.bytes_received += size
+        self.remaining -= size
+        if not self.remaining:
+            self.state = ParserState.DONE
+
+    def feed_eof(self):
+        """Tell parser that server closed connection
+        """
+        if self.state == ParserState.BODY_UNTIL_CLOSE:
+            self.state = ParserState.DONE
+        elif self.state != ParserState.DONE:
+            raise IncompleteResponse(
+                'Connection closed before response was complete'
+                )
+
+    def _parse_head(self, head: bytes):
+        status_end = head.find(b'\r\n')
+        try:
+            version, status, *reason = \
+                head[:status_end].split(b' ', maxsplit=2)
+            if not version.startswith(b'HTTP/'):
+                raise ValueError(version)
+            status_code = int(status)
+        except ValueError:
+            raise InvalidResponse(
+                f'Invalid status line: {head[:status_end]!r}'
+                ) from None
+
+        if 100 <= status_code < 200 and status_code != 101:
+            # Interim response, final one follows
+            return
+
+        self.head = head
+        self.http_version = version[len(b'HTTP/'):].decode('ascii')
+        self.status_code = status_code
+        self.reason = reason[0].decode('latin-1') if reason else ''
+        self._scan_fields(head, status_end + 2)
+
+        if self.is_head or status_code in (101, 204, 304):
+            self.state = ParserState.DONE
+            return
+
+        transfer_encoding = self.header('transfer-encoding').lower()
+        if transfer_encoding.rsplit(',', 1)[-1].strip() == 'chunked':
+            self.state = ParserState.CHUNK_SIZE
+            return
+
+        content_length = self.header('content-length')
+        if content_length:
+            # Repeated header is allowed only with the same value
+            values = {i.strip() for i in content_length.split(',')}
+            if not all(i.isascii() and i.isdigit() for i in values) \
+                    or len({int(i) for i in values}) != 1:
+                raise InvalidResponse(
+                    f'Invalid Content-Length: {content_length}'
+                    )
+            self.remaining = int(values.pop())
+            self.state = ParserState.BODY_FIXED \
+                if self.remaining else ParserState.DONE
+            return
+
+        self.state = ParserState.BODY_UNTIL_CLOSE
+
+    def _parse_line(self, line: bytes):
+        state = self.state
+        if state == ParserState.CHUNK_SIZE:
+            # Chunk extensions are separated by semicolon and ignored
+            size = line.split(b';', 1)[0].strip()
+            if not size or size.lstrip(hex_digits):
+                raise InvalidResponse(f'Invalid chunk size: {line!r}')
+            self.remaining = int(size, 16)
+            self.state = ParserState.CHUNK_DATA \
+                if self.remaining else ParserState.TRAILERS
+
+        elif state == ParserState.CHUNK_END:
+            if line:
+                raise InvalidResponse('Chunk data is not followed by CRLF')
+            self.state = ParserState.CHUNK_SIZE
+
+        elif state == ParserState.TRAILERS:
+            if not line:
+                self.state = ParserState.DONE
+                return
+            for key, value in Headers.from_bytes(line).multi_items():
+                self.trailers.add(key, value)
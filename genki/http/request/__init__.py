@@ -1,2 +1,14 @@
 from .request_builder import RequestBuilder  # NOQA
+from .body import RequestBody  # NOQA
 from .http_session import HTTPSession  # NOQA
+from .connection import Connection  # NOQA
+from .connection_pool import ConnectionPool  # NOQA
+from .redirects import RedirectCache  # NOQA
+from .cache import ResponseCache  # NOQA
+from .retry import Retry  # NOQA
+from .timeout import Timeout  # NOQA
+from .timings import Timings, Hooks  # NOQA
+from .resolver import Resolver  # NOQA
+from .tls import TLSSessionCache, create_ssl_context  # NOQA
+from .pipeline import Pipeline  # NOQA
+from .http2 import HTTP2Transport  # NOQA
@@ -0,0 +1,179 @@
+from typing import Union, Optional, Iterable, Iterator, BinaryIO
+from io import UnsupportedOperation
+import os
+import stat
+
+
+BodySource = Union[str, bytes, bytearray, memoryview, BinaryIO,
+                   Iterable[Union[bytes, str]], None]
+
+
+class RequestBody:
+    """Body of request, either kept in memory or read from
+    a file object or iterable while it is being sent.
+
+    source - str, bytes-like object, binary file object
+    or iterable of bytes/str pieces.\n
+    length - size of streamed body in bytes, if it can not be
+    found out from source. If it is unknown, body is sent
+    with chunked transfer encoding.\n
+    encoding - encoding of str pieces
+    """
+
+    __slots__ = (
+        'source',
+        'length',
+        'encoding',
+        '_data',
+        '_start',
+        '_consumed'
+    )
+
+    def __init__(self,
+                 source: BodySource = None,
+                 length: Optional[int] = None,
+                 encoding: str = 'utf-8'):
+        self.source = source
+        self.encoding = encoding
+        self._data: Optional[Union[bytes, bytearray, memoryview]] = None
+        self._start: Optional[int] = None
+        self._consumed = False
+
+        if not source:
+            self._data = b''
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            self._data = source
+        elif isinstance(source, str):
+            self._data = source.encode(encoding)
+        elif hasattr(source, 'read'):
+            self._start = _tell(source)
+            if length is None:
+                length = _file_size(source, self._start)
+        elif not hasattr(source, '__iter__'):
+            raise TypeError(f'Unsuitable type for body: {type(source)}')
+
+        if self._data is not None:
+            length = len(self._data)
+        self.length = length
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({type(self.source).__name__}, ' \
+            f'length={self.length})'
+
+    def __bool__(self):
+        return self.is_stream or bool(self._data)
+
+    @property
+    def is_stream(self) -> bool:
+        """True if body is not in memory and is read as it is sent
+        """
+        return self._data is None
+
+    @property
+    def data(self) -> Union[bytes, bytearray, memoryview]:
+        """Body kept in memory
+        """
+        if self._data is None:
+            raise TypeError('Streamed body is not kept in memory')
+        return self._data
+
+    @property
+    def is_chunked(self) -> bool:
+        """True if body is to be sent with chunked transfer encoding
+        """
+        return self.length is None
+
+    def append(self, data: bytes):
+        """Append data to in-memory body without copying it every time
+        """
+        if self._data is None:
+            raise TypeError('Can not append to streamed body')
+        if not isinstance(self._data, bytearray):
+            self._data = bytearray(self._data)
+        self._data += data
+        self.length = len(self._data)
+
+    def fileno(self) -> Optional[int]:
+        """Descriptor of regular file body is read from,
+        None if it is not one
+        """
+        fileno = getattr(self.source, 'fileno', None)
+        if self._start is None or fileno is None:
+            return None
+        try:
+            fd = fileno()
+            if stat.S_ISREG(os.fstat(fd).st_mode):
+                return fd
+        except (OSError, UnsupportedOperation):
+            pass
+        return None
+
+    def rewind(self) -> bool:
+        """Prepare body to be sent again,
+        returns False if it can not be read once more
+        """
+        if not self._consumed or self._data is not None:
+            return True
+        if self._start is None:
+            return False
+        try:
+            self.source.seek(self._start)
+        except (OSError, UnsupportedOperation):
+            return False
+        self._consumed = False
+        return True
+
+    def iter_chunks(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        """Yield non-empty pieces of body
+        """
+        if self._data is not None:
+            if self._data:
+                yield self._data
+            return
+
+        if self._consumed:
+            raise RuntimeError('Streamed body was already sent')
+        self._consumed = True
+
+        if hasattr(self.source, 'read'):
+            while True:
+                chunk = self.source.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        else:
+            for chunk in self.source:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode(self.encoding)
+                if chunk:
+                    yield chunk
+
+    def mark_consumed(self):
+        """Body was read by other means than iter_chunks()
+        """
+        if self._data is None:
+            self._consumed = True
+
+
+def _tell(file: BinaryIO) -> Optional[int]:
+    try:
+        return file.tell()
+    except (AttributeError, OSError, UnsupportedOperation):
+        return None
+
+
+def _file_size(file: BinaryIO, start: Optional[int]) -> Optional[int]:
+    """Bytes left to read in file, None if it is not known
+    """
+    if start is None:
+        return None
+    try:
+        return os.fstat(file.fileno()).st_size - start
+    except (AttributeError, OSError, UnsupportedOperation):
+        pass
+    try:
+        end = file.seek(0, os.SEEK_END)
+        file.seek(start)
+        return end - start
+    except (AttributeError, OSError, UnsupportedOperation):
+        return None
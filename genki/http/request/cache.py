@@ -0,0 +1,559 @@
+from typing import Optional, Dict, Union
+from collections import OrderedDict, namedtuple
+from email.utils import parsedate_to_datetime
+from contextlib import suppress
+from hashlib import sha256
+from time import time
+import json
+import os
+import re
+
+from .request_builder import RequestBuilder
+from ..constants import Method, StatusCode
+from ..headers import Headers
+from ..response import Response
+
+
+cache_stats = namedtuple(
+    'CacheStats',
+    ['hits', 'misses', 'revalidated', 'stored', 'size']
+    )
+
+# Statuses that may be stored without explicit freshness,
+# RFC 7231 section 6.1 and RFC 7538 for 308
+cacheable_statuses = frozenset((
+    200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501
+))
+
+# Headers of 304 response that must not replace stored ones
+unmergeable_headers = frozenset((
+    'connection',
+    'keep-alive',
+    'content-length',
+    'transfer-encoding'
+))
+
+conditional_headers = ('If-None-Match', 'If-Modified-Since')
+
+# Names of DiskStorage files, sha256 of key and
+# temporary files they are written to first
+entry_file = re.compile(r'[0-9a-f]{64}')
+temporary_file = re.compile(r'[0-9a-f]{64}\.\d+\.tmp')
+
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    """Directives of Cache-Control header,
+    directive names are lowercase
+    """
+    directives = dict()
+    for item in value.split(','):
+        name, sep, arg = item.partition('=')
+        name = name.strip().lower()
+        if name:
+            directives[name] = arg.strip().strip('"') if sep else None
+    return directives
+
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+    """Timestamp of HTTP date, None if it is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _seconds(value: Optional[str]) -> Optional[int]:
+    if value is None or not value.isdigit():
+        return None
+    return int(value)
+
+
+class CacheEntry:
+    """Stored response along with values of request headers
+    it varies on.
+
+    raw - response head and body.\n
+    body_start - offset of body in raw.\n
+    vary - lowercase names of headers listed in Vary
+    with their values in request.\n
+    response_time - timestamp of when response was received
+    """
+
+    __slots__ = (
+        'raw',
+        'body_start',
+        'vary',
+        'response_time',
+        'headers',
+        'cache_control',
+        'lifetime',
+        'initial_age'
+    )
+
+    def __init__(self,
+                 raw: Union[bytes, bytearray],
+                 body_start: int,
+                 vary: Dict[str, str],
+                 response_time: float):
+        self.raw = bytes(raw)
+        self.body_start = body_start
+        self.vary = vary
+        self.response_time = response_time
+        self.headers = Headers.from_bytes(self.raw[:body_start])
+        self.cache_control = parse_cache_control(
+            self.headers.get('Cache-Control', '')
+            )
+
+        headers = self.headers
+        date = parse_http_date(headers.get('Date')) or response_time
+        # RFC 7234 section 4.2.3
+        apparent_age = max(0.0, response_time - date)
+        self.initial_age = max(
+            apparent_age,
+            _seconds(headers.get('Age', '').strip()) or 0
+            )
+        self.lifetime = self._freshness_lifetime(date)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.status_code}, ' \
+            f'size={len(self.raw)})'
+
+    def _freshness_lifetime(self, date: float) -> float:
+        """Seconds response stays fresh, RFC 7234 section 4.2.1
+        """
+        max_age = _seconds(self.cache_control.get('max-age'))
+        if max_age is not None:
+            return max_age
+        if 'Expires' in self.headers:
+            # Invalid Expires means already expired
+            expires = parse_http_date(self.headers['Expires'])
+            return expires - date if expires is not None else 0
+        last_modified = parse_http_date(self.headers.get('Last-Modified'))
+        if last_modified is not None \
+                and self.status_code in cacheable_statuses:
+            # Heuristic freshness of 10% of time since modification
+            return max(0.0, (date - last_modified) / 10)
+        return 0
+
+    @property
+    def status_code(self) -> int:
+        return int(self.raw.split(b' ', 2)[1])
+
+    @property
+    def has_validators(self) -> bool:
+        return 'ETag' in self.headers or 'Last-Modified' in self.headers
+
+    def age(self, now: Optional[float] = None) -> float:
+        """Current age of response in seconds
+        """
+        if now is None:
+            now = time()
+        return self.initial_age + max(0.0, now - self.response_time)
+
+    def matches(self, request: RequestBuilder) -> bool:
+        """True if request has same values
+        of headers response varies on
+        """
+        return all(
+            str(request.headers.get(name, '')) == value
+            for name, value in self.vary.items()
+        )
+
+    def is_fresh(self, request: RequestBuilder) -> bool:
+        """True if entry may be used without asking server
+        """
+        if 'no-cache' in self.cache_control:
+            return False
+        request_cc = parse_cache_control(
+            str(request.headers.get('Cache-Control', ''))
+            )
+        if 'no-cache' in request_cc:
+            return False
+        lifetime = self.lifetime
+        age = self.age()
+        max_age = _seconds(request_cc.get('max-age'))
+        if max_age is not None:
+            lifetime = min(lifetime, max_age)
+        min_fresh = _seconds(request_cc.get('min-fresh'))
+        if min_fresh is not None:
+            age += min_fresh
+        return lifetime > age
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers to revalidate entry with
+        """
+        validators = dict()
+        if 'ETag' in self.headers:
+            validators['If-None-Match'] = self.headers['ETag']
+        if 'Last-Modified' in self.headers:
+            validators['If-Modified-Since'] = self.headers['Last-Modified']
+        return validators
+
+    def updated(self, headers: Headers,
+                response_time: float) -> 'CacheEntry':
+        """Entry with headers of 304 response merged
+        into stored ones, RFC 7234 section 4.3.4
+        """
+        merged = self.headers.copy()
+        for name in {name.lower() for name, _ in headers.multi_items()}:
+            if name not in unmergeable_headers:
+                merged.remove_header(name)
+        for name, value in headers.multi_items():
+            if name.lower() not in unmergeable_headers:
+                merged.add(name, value)
+        status_line = self.raw[:self.raw.find(b'\r\n') + 2]
+        head = status_line + merged.to_bytes()
+        return self.__class__(
+            head + self.raw[self.body_start:],
+            len(head),
+            self.vary,
+            response_time
+        )
+
+    def to_bytes(self) -> bytes:
+        meta = json.dumps({
+            'body_start': self.body_start,
+            'vary': self.vary,
+            'response_time': self.response_time
+        })
+        return meta.encode() + b'\n' + self.raw
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'CacheEntry':
+        meta, _, raw = data.partition(b'\n')
+        meta = json.loads(meta)
+        return cls(
+            raw,
+            meta['body_start'],
+            meta['vary'],
+            meta['response_time']
+        )
+
+
+class MemoryStorage:
+    """Keeps entries in memory, least recently used ones
+    are dropped once their total size exceeds maxsize bytes
+    """
+
+    __slots__ = (
+        'maxsize',
+        'size',
+        '_entries'
+    )
+
+    def __init__(self, maxsize: int = 64 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.size = 0
+        self._entries: Dict[str, CacheEntry] = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        self.delete(key)
+        if len(entry.raw) > self.maxsize:
+            return
+        self._entries[key] = entry
+        self.size += len(entry.raw)
+        while self.size > self.maxsize:
+            _, dropped = self._entries.popitem(last=False)
+            self.size -= len(dropped.raw)
+
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.raw)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+class DiskStorage:
+    """Keeps entries in files of a directory,
+    so that they outlive the process. Least recently used files
+    are removed once their total size exceeds maxsize bytes,
+    files written by other processes are only counted
+    when storage is created.
+
+    Files are read and written with blocking calls,
+    which pause event loop for time they take.
+    Other files in directory are left alone.
+
+    path - directory to keep files in, created if it does not exist.\n
+    maxsize - bytes files may take on disk
+    """
+
+    __slots__ = (
+        'path',
+        'maxsize',
+        'size',
+        '_files'
+    )
+
+    def __init__(self, path: str, maxsize: int = 256 * 1024 * 1024):
+        self.path = path
+        self.maxsize = maxsize
+        self.size = 0
+        # File names with their sizes, least recently used first
+        self._files: Dict[str, int] = OrderedDict()
+        os.makedirs(path, exist_ok=True)
+
+        files = []
+        for entry in os.scandir(path):
+            if entry.is_file() and entry_file.fullmatch(entry.name):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._files[name] = size
+            self.size += size
+        self._evict()
+
+    def __len__(self):
+        return len(self._files)
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return sha256(key.encode('utf-8', 'surrogateescape')).hexdigest()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        name = self._name(key)
+        try:
+            with open(os.path.join(self.path, name), 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            self._forget(name)
+            return None
+        if name in self._files:
+            self._files.move_to_end(name)
+        try:
+            return CacheEntry.from_bytes(data)
+        except (ValueError, KeyError):
+            # Damaged file
+            self.delete(key)
+            return None
+
+    def set(self, key: str, entry: CacheEntry):
+        data = entry.to_bytes()
+        name = self._name(key)
+        self._forget(name)
+        if len(data) > self.maxsize:
+            self._remove(name)
+            return
+        filename = os.path.join(self.path, name)
+        tmp = f'{filename}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as file:
+            file.write(data)
+        # Readers never see partially written file
+        os.replace(tmp, filename)
+        self._files[name] = len(data)
+        self.size += len(data)
+        self._evict()
+
+    def delete(self, key: str):
+        name = self._name(key)
+        self._forget(name)
+        self._remove(name)
+
+    def clear(self):
+        for name in os.listdir(self.path):
+            if entry_file.fullmatch(name) or temporary_file.fullmatch(name):
+                self._remove(name)
+        self._files.clear()
+        self.size = 0
+
+    def _forget(self, name: str):
+        self.size -= self._files.pop(name, 0)
+
+    def _remove(self, name: str):
+        with suppress(FileNotFoundError):
+            os.remove(os.path.join(self.path, name))
+
+    def _evict(self):
+        while self.size > self.maxsize:
+            name, size = self._files.popitem(last=False)
+            self.size -= size
+            self._remove(name)
+
+
+class ResponseCache:
+    """Private HTTP cache of GET responses following RFC 7234.
+
+    Fresh responses are served without asking server,
+    stale ones are revalidated with If-None-Match/If-Modified-Since
+    and 304 answer is turned into stored response.
+    Streamed responses are not stored.
+
+    maxsize - bytes stored responses may take in memory,
+    least recently used ones are dropped first.\n
+    max_entry_size - largest response to store in bytes.\n
+    path - directory to also keep responses in,
+    so that they are available to other processes and later runs.\n
+    disk_maxsize - bytes stored responses may take in path
+    """
+
+    __slots__ = (
+        'memory',
+        'disk',
+        'max_entry_size',
+        'hits',
+        'misses',
+        'revalidated',
+        'stored'
+    )
+
+    def __init__(self,
+                 maxsize: int = 64 * 1024 * 1024,
+                 max_entry_size: int = 8 * 1024 * 1024,
+                 path: Optional[str] = None,
+                 disk_maxsize: int = 256 * 1024 * 1024):
+        self.memory = MemoryStorage(maxsize)
+        self.disk = None
+        if path is not None:
+            self.disk = DiskStorage(path, disk_maxsize)
+        self.max_entry_size = max_entry_size
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stored = 0
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.stats})'
+
+    def __len__(self):
+        return len(self.memory)
+
+    @property
+    def stats(self) -> cache_stats:
+        """Cache usage counters, size is bytes taken in memory
+        """
+        return cache_stats(
+            self.hits,
+            self.misses,
+            self.revalidated,
+            self.stored,
+            self.memory.size
+        )
+
+    @staticmethod
+    def key(request: RequestBuilder) -> str:
+        return request.url.string.partition('#')[0]
+
+    def accepts(self, request: RequestBuilder) -> bool:
+        """True if request may be answered from cache
+        """
+        if request.method != Method.GET or 'Range' in request.headers:
+            return False
+        if any(i in request.headers for i in conditional_headers):
+            # Caller revalidates on its own
+            return False
+        request_cc = parse_cache_control(
+            str(request.headers.get('Cache-Control', ''))
+            )
+        return 'no-store' not in request_cc
+
+    def lookup(self, request: RequestBuilder) -> Optional[CacheEntry]:
+        """Stored response for request, fresh or not
+        """
+        key = self.key(request)
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.memory.set(key, entry)
+        if entry is None or not entry.matches(request):
+            return None
+        return entry
+
+    @staticmethod
+    def _no_store(request: RequestBuilder, responce: Response) -> bool:
+        return any(
+            'no-store' in parse_cache_control(str(value))
+            for value in (
+                request.headers.get('Cache-Control', ''),
+                responce.headers.get('Cache-Control', '')
+            )
+        )
+
+    @staticmethod
+    def _is_storable(responce: Response) -> bool:
+        """RFC 7234 section 3, apart from no-store
+        """
+        headers = responce.headers
+        directives = parse_cache_control(headers.get('Cache-Control', ''))
+        if headers.get('Vary', '').strip() == '*':
+            return False
+        if responce.status_code in cacheable_statuses:
+            return True
+        return responce.status_code not in (
+            StatusCode.PARTIAL_CONTENT,
+            StatusCode.NOT_MODIFIED
+            ) and ('max-age' in directives or 'Expires' in headers)
+
+    def store(self,
+              request: RequestBuilder,
+              responce: Response) -> Optional[CacheEntry]:
+        """Store response to request if it is allowed,
+        returns stored entry. Response with no-store
+        also drops the one stored before
+        """
+        key = self.key(request)
+        if self._no_store(request, responce):
+            self.invalidate(key)
+            return None
+        if responce.is_streaming or not self._is_storable(responce):
+            return None
+
+        raw, body = responce.raw_bytes, responce.raw_body
+        if len(body) > self.max_entry_size:
+            return None
+        vary = {
+            name.strip().lower(): str(request.headers.get(name.strip(), ''))
+            for name in responce.headers.get('Vary', '').split(',')
+            if name.strip()
+        }
+        entry = CacheEntry(raw, len(raw) - len(body), vary, time())
+        if not entry.has_validators and entry.lifetime <= entry.age():
+            # Would never be used
+            return None
+        self._set(key, entry)
+        self.stored += 1
+        return entry
+
+    def revalidate(self,
+                   request: RequestBuilder,
+                   entry: CacheEntry,
+                   responce: Response) -> CacheEntry:
+        """Update entry with headers of 304 response
+        """
+        entry = entry.updated(responce.headers, time())
+        self._set(self.key(request), entry)
+        self.revalidated += 1
+        return entry
+
+    def _set(self, key: str, entry: CacheEntry):
+        self.memory.set(key, entry)
+        if self.disk is not None:
+            self.disk.set(key, entry)
+
+    def invalidate(self, key: str):
+        """Forget stored response to URL
+        """
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
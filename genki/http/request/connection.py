@@ -0,0 +1,224 @@
+from typing import Optional, Tuple, Sequence, Union
+from collections import deque
+from itertools import islice
+import selectors
+from time import monotonic
+import os
+
+from gevent import socket, ssl
+from gevent.socket import wait_write
+
+from .timeout import remaining
+from ..constants import Scheme
+
+
+# poll() is not limited to descriptors below FD_SETSIZE as select() is
+try:
+    from select import poll, POLLIN
+except ImportError:
+    poll = None
+
+ConnectionKey = Tuple[Scheme, str, int]
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Most buffers single sendmsg() call accepts
+try:
+    iov_max = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    iov_max = 16
+# Buffers up to this size are joined before being sent over TLS
+coalesce_size = 16 * 1024
+
+
+def _readable(sock) -> bool:
+    """Whether socket has data or EOF to read, without blocking
+    """
+    if poll is not None:
+        poller = poll()
+        poller.register(sock, POLLIN)
+        return bool(poller.poll(0))
+    with selectors.DefaultSelector() as selector:
+        selector.register(sock, selectors.EVENT_READ)
+        return bool(selector.select(0))
+
+
+class Connection:
+    """Socket connected to a server identified by (scheme, host, port)
+
+    Keeps track of when it was last used and whether
+    it can be reused for another request. Socket operations
+    time out after timeout seconds or once deadline has passed.
+    """
+
+    __slots__ = (
+        'sock',
+        'key',
+        'last_used',
+        'requests_sent',
+        'reusable',
+        'timeout',
+        'deadline',
+        '_unread'
+    )
+
+    def __init__(self, sock: socket.socket, key: ConnectionKey):
+        self.sock: Optional[socket.socket] = sock
+        self.key = key
+        self.last_used = monotonic()
+        self.requests_sent = 0
+        self.reusable = True
+        self.timeout: Optional[float] = sock.gettimeout()
+        self.deadline: Optional[float] = None
+        self._unread = b''
+
+    def __repr__(self):
+        scheme, host, port = self.key
+        return f'{self.__class__.__name__}({scheme.value}://{host}:{port})'
+
+    @property
+    def is_closed(self) -> bool:
+        return self.sock is None
+
+    def is_stale(self) -> bool:
+        """True if connection can no longer be used for requests.
+
+        Idle keep-alive connection must not have anything to read,
+        if it does - server has either closed it or sent
+        some garbage, either way it is unusable.
+        """
+        if self.sock is None or self._unread:
+            return True
+        pending = getattr(self.sock, 'pending', None)
+        if pending is not None and pending():
+            return True
+        try:
+            return _readable(self.sock)
+        except (OSError, ValueError):
+            return True
+
+    def set_timeout(self,
+                    timeout: Optional[float],
+                    deadline: Optional[float] = None):
+        """Limit every socket operation to timeout seconds
+        and all of them to deadline in time.monotonic() terms
+        """
+        self.timeout = timeout
+        self.deadline = deadline
+        self.sock.settimeout(remaining(timeout, deadline))
+
+    def _arm(self):
+        """Shorten socket timeout to time left till deadline
+        """
+        if self.deadline is not None:
+            self.sock.settimeout(remaining(self.timeout, self.deadline))
+
+    def sendall(self, data: bytes):
+        self.requests_sent += 1
+        self._arm()
+        self.sock.sendall(data)
+
+    def send_buffers(self,
+                     buffers: Sequence[Buffer],
+                     new_request: bool = True):
+        """Send buffers one after another without joining them.
+
+        Plain sockets write them with sendmsg() in as few system
+        calls as possible, TLS sockets do not support it,
+        so buffers are sent one by one, except for small ones
+        which are cheaper to join than to send separately.
+
+        new_request - buffers start a new request,
+        False if they continue body of previous one
+        """
+        if new_request:
+            self.requests_sent += 1
+        if isinstance(self.sock, ssl.SSLSocket) \
+                or not hasattr(self.sock, 'sendmsg'):
+            self._send_sequential(buffers)
+            return
+
+        views = deque(memoryview(i).cast('B') for i in buffers if len(i))
+        while views:
+            self._arm()
+            sent = self.sock.sendmsg(list(islice(views, iov_max)))
+            while sent:
+                if sent < len(views[0]):
+                    views[0] = views[0][sent:]
+                    break
+                sent -= len(views.popleft())
+
+    @property
+    def can_sendfile(self) -> bool:
+        """True if file can be sent with os.sendfile(),
+        data sent over TLS has to pass through user space
+        """
+        return hasattr(os, 'sendfile') and self.sock is not None \
+            and not isinstance(self.sock, ssl.SSLSocket)
+
+    def sendfile(self, fd: int, offset: int, count: int):
+        """Send count bytes of file starting at offset,
+        without reading them into memory
+        """
+        out = self.sock.fileno()
+        end = offset + count
+        while offset < end:
+            try:
+                sent = os.sendfile(out, fd, offset, min(end - offset, 2 ** 30))
+            except BlockingIOError:
+                wait_write(
+                    out,
+                    timeout=remaining(self.timeout, self.deadline),
+                    timeout_exc=socket.timeout('timed out')
+                    )
+                continue
+            if not sent:
+                raise ValueError('File is shorter than body length')
+            offset += sent
+
+    def _send_sequential(self, buffers: Sequence[Buffer]):
+        small = []
+        for buffer in buffers:
+            if len(buffer) <= coalesce_size:
+                small.append(buffer)
+                continue
+            if small:
+                self._arm()
+                self.sock.sendall(b''.join(small))
+                small.clear()
+            self._arm()
+            self.sock.sendall(buffer)
+        if small:
+            self._arm()
+            self.sock.sendall(b''.join(small))
+
+    def recv(self, size: int) -> bytes:
+        """Receive up to size bytes, data put back
+        with Connection.unread() is returned first
+        """
+        if self._unread:
+            data, self._unread = self._unread, b''
+            return data
+        self._arm()
+        return self.sock.recv(size)
+
+    def recv_into(self, buffer: memoryview) -> int:
+        """Receive data directly into buffer, returns number of bytes read
+        """
+        if self._unread:
+            size = min(len(buffer), len(self._unread))
+            buffer[:size] = self._unread[:size]
+            self._unread = self._unread[size:]
+            return size
+        self._arm()
+        return self.sock.recv_into(buffer)
+
+    def unread(self, data: bytes):
+        """Put back data that was received but not consumed
+        """
+        self._unread = data + self._unread
+
+    def close(self):
+        self.reusable = False
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
@@ -0,0 +1,160 @@
+from typing import Optional, Dict, Deque
+from collections import OrderedDict, deque, namedtuple
+from time import monotonic
+
+from .connection import Connection, ConnectionKey
+
+
+pool_stats = namedtuple(
+    'PoolStats',
+    ['hits', 'misses', 'expired', 'stale', 'discarded', 'idle']
+    )
+
+
+class ConnectionPool:
+    """Keeps idle keep-alive connections for reuse
+
+    maxsize - how many idle connections to keep per (scheme, host, port).\n
+    idle_timeout - seconds idle connection is kept before it is closed.\n
+    max_idle - how many idle connections to keep to all servers together,
+    the least recently used ones are closed first
+    """
+
+    __slots__ = (
+        'maxsize',
+        'idle_timeout',
+        'max_idle',
+        '_idle',
+        '_lru',
+        'hits',
+        'misses',
+        'expired',
+        'stale',
+        'discarded'
+    )
+
+    def __init__(self,
+                 maxsize: int = 10,
+                 idle_timeout: float = 60.0,
+                 max_idle: int = 100):
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+        self._idle: Dict[ConnectionKey, Deque[Connection]] = dict()
+        # All idle connections in order they were released,
+        # so oldest ones of any server are always first
+        self._lru: 'OrderedDict[Connection, None]' = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stale = 0
+        self.discarded = 0
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.stats})'
+
+    def __len__(self):
+        return len(self._lru)
+
+    def _take(self, conn: Connection):
+        """Remove idle connection from the pool,
+        forgetting servers no connection is left to
+        """
+        del self._lru[conn]
+        idle = self._idle[conn.key]
+        idle.remove(conn)
+        if not idle:
+            del self._idle[conn.key]
+
+    def _evict_expired(self, now: float):
+        """Close connections to any server that were idle for too long
+        """
+        lru = self._lru
+        while lru:
+            conn = next(iter(lru))
+            if now - conn.last_used <= self.idle_timeout:
+                break
+            self._take(conn)
+            conn.close()
+            self.expired += 1
+
+    def acquire(self, key: ConnectionKey) -> Optional[Connection]:
+        """Return idle connection to given (scheme, host, port)
+        or None if there is none that can be reused
+        """
+        self._evict_expired(monotonic())
+        idle = self._idle.get(key)
+        while idle:
+            # Most recently used connection is the least
+            # likely to be closed by server
+            conn = idle[-1]
+            self._take(conn)
+            if conn.is_stale():
+                conn.close()
+                self.stale += 1
+                continue
+            self.hits += 1
+            return conn
+        self.misses += 1
+        return None
+
+    def release(self, conn: Connection):
+        """Return connection to the pool,
+        closes it if it can not be reused
+        """
+        if not conn.reusable or conn.is_closed:
+            conn.close()
+            return
+
+        now = monotonic()
+        conn.last_used = now
+        self._evict_expired(now)
+        idle = self._idle.get(conn.key)
+        if idle is not None and len(idle) >= self.maxsize \
+                or self.maxsize <= 0:
+            conn.close()
+            self.discarded += 1
+            return
+        if idle is None:
+            idle = self._idle[conn.key] = deque()
+        idle.append(conn)
+        self._lru[conn] = None
+        if len(self._lru) > self.max_idle:
+            oldest = next(iter(self._lru))
+            self._take(oldest)
+            oldest.close()
+            self.discarded += 1
+
+    def prune(self):
+        """Close all connections that exceeded idle timeout
+        """
+        self._evict_expired(monotonic())
+
+    def clear(self):
+        """Close all idle connections
+        """
+        for conn in self._lru:
+            conn.close()
+        self._lru.clear()
+        self._idle.clear()
+
+    @property
+    def stats(self) -> pool_stats:
+        """Pool usage counters
+        """
+        return pool_stats(
+            self.hits,
+            self.misses,
+            self.expired,
+            self.stale,
+            self.discarded,
+            len(self)
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of acquisitions that reused a connection
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
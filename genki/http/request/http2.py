@@ -0,0 +1,488 @@
+from typing import Optional, Dict, Set, List, Iterator, Iterable, \
+    Callable, TYPE_CHECKING
+
+from gevent import socket, spawn, Timeout
+from gevent.event import AsyncResult
+from gevent.lock import RLock
+from gevent.queue import Queue, Empty
+
+from .connection import Connection, ConnectionKey
+from .timeout import remaining
+from ..constants import Scheme
+from ..response import Response
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.errors
+    import h2.exceptions
+except ImportError:
+    h2 = None
+
+if TYPE_CHECKING:
+    from .http_session import HTTPSession  # NOQA
+
+
+# Headers that are not allowed in HTTP/2 requests
+connection_headers = frozenset((
+    'connection',
+    'keep-alive',
+    'proxy-connection',
+    'transfer-encoding',
+    'upgrade',
+    'host'
+))
+
+
+class HTTP2Stream:
+    """Single request/response exchange on HTTP/2 connection
+    """
+
+    __slots__ = (
+        'stream_id',
+        'headers',
+        'data',
+        'ended'
+    )
+
+    def __init__(self, stream_id: int):
+        self.stream_id = stream_id
+        self.headers = AsyncResult()
+        # (data, flow controlled length), None on end or Exception
+        self.data = Queue()
+        self.ended = False
+
+    def fail(self, err: Exception):
+        if not self.headers.ready():
+            self.headers.set_exception(err)
+        self.data.put(err)
+
+
+class HTTP2Connection:
+    """HTTP/2 connection that multiplexes requests
+    of many greenlets as streams.
+
+    Reader greenlet receives frames and dispatches them to streams,
+    flow control windows are updated as response data is consumed.
+    """
+
+    __slots__ = (
+        'conn',
+        'h2',
+        'closed',
+        'on_close',
+        '_streams',
+        '_send_lock',
+        '_waiters',
+        '_reader'
+    )
+
+    def __init__(self,
+                 conn: Connection,
+                 on_close: Optional[Callable[['HTTP2Connection'], None]]
+                 = None):
+        if h2 is None:
+            raise ImportError('HTTP/2 support requires h2 package')
+        self.conn = conn
+        self.h2 = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(
+                client_side=True,
+                header_encoding=None
+                )
+            )
+        self.closed = False
+        self.on_close = on_close
+        self._streams: Dict[int, HTTP2Stream] = dict()
+        self._send_lock = RLock()
+        self._waiters: List[AsyncResult] = []
+
+        # Reader waits for frames as long as connection lives,
+        # timeouts are applied to individual requests and writes instead
+        conn.sock.settimeout(None)
+        self.h2.initiate_connection()
+        self._flush()
+        self._reader = spawn(self._read_loop)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.conn!r})'
+
+    @property
+    def is_usable(self) -> bool:
+        """True if new streams can be opened on this connection
+        """
+        return not self.closed and self.h2.highest_outbound_stream_id \
+            < 2 ** 31 - 2
+
+    def _flush(self, timeout: Optional[float] = ...):
+        """Send pending frames within timeout seconds,
+        read timeout of connection by default.
+
+        Frame that was sent partially leaves connection unusable,
+        so it is closed once writing times out
+        """
+        if timeout is ...:
+            timeout = self.conn.timeout
+        with self._send_lock:
+            data = self.h2.data_to_send()
+            if not data:
+                return
+            try:
+                with Timeout(timeout, socket.timeout(
+                        'HTTP/2 connection timed out')):
+                    self.conn.sock.sendall(data)
+            except socket.timeout as err:
+                self.close(err)
+                raise
+
+    def _wait_for_change(self, timeout: Optional[float]):
+        """Wait till stream closes, window is updated
+        or connection is closed
+        """
+        waiter = AsyncResult()
+        self._waiters.append(waiter)
+        try:
+            waiter.get(timeout=timeout)
+        except Timeout:
+            raise socket.timeout('HTTP/2 connection timed out') from None
+
+    def _notify(self):
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            waiter.set()
+
+    def _check_open(self):
+        if self.closed:
+            raise ConnectionResetError('HTTP/2 connection is closed')
+
+    def _read_loop(self):
+        try:
+            while True:
+                data = self.conn.sock.recv(65536)
+                if not data:
+                    raise ConnectionResetError(
+                        'Server closed HTTP/2 connection')
+                for event in self.h2.receive_data(data):
+                    self._handle(event)
+                self._flush()
+        except Exception as err:
+            self.close(err)
+
+    def _handle(self, event):
+        stream = self._streams.get(getattr(event, 'stream_id', None))
+        if isinstance(event, h2.events.ResponseReceived):
+            if stream is not None:
+                stream.headers.set(event.headers)
+        elif isinstance(event, h2.events.DataReceived):
+            if stream is not None:
+                stream.data.put((event.data, event.flow_controlled_length))
+            else:
+                # Data for cancelled stream still counts towards
+                # connection window
+                self.h2.acknowledge_received_data(
+                    event.flow_controlled_length, event.stream_id)
+        elif isinstance(event, h2.events.StreamEnded):
+            if stream is not None:
+                stream.ended = True
+                stream.data.put(None)
+            self._notify()
+        elif isinstance(event, h2.events.StreamReset):
+            if stream is not None:
+                stream.ended = True
+                stream.fail(ConnectionResetError(
+                    f'Stream reset by server: {event.error_code!r}'))
+            self._notify()
+        elif isinstance(event, h2.events.ConnectionTerminated):
+            self.closed = True
+            # Streams above last_stream_id were not processed
+            for stream_id, stream in list(self._streams.items()):
+                if stream_id > (event.last_stream_id or 0):
+                    stream.fail(ConnectionResetError(
+                        'Server is shutting down HTTP/2 connection'))
+            self._notify()
+        elif isinstance(event, (h2.events.WindowUpdated,
+                                h2.events.RemoteSettingsChanged)):
+            self._notify()
+
+    def close(self, err: Optional[Exception] = None):
+        """Close connection failing all unfinished streams
+        """
+        if self.conn.is_closed:
+            return
+        self.closed = True
+        err = err or ConnectionAbortedError('HTTP/2 connection closed')
+        for stream in self._streams.values():
+            if not stream.ended:
+                stream.fail(err)
+        self._notify()
+        if self.on_close is not None:
+            self.on_close(self)
+        self.conn.close()
+
+    def _open_stream(self,
+                     headers: List[tuple],
+                     end_stream: bool,
+                     timeout: Callable[[], Optional[float]]) -> HTTP2Stream:
+        while True:
+            self._check_open()
+            limit = self.h2.remote_settings.max_concurrent_streams
+            if self.h2.open_outbound_streams < limit:
+                break
+            self._wait_for_change(timeout())
+
+        with self._send_lock:
+            stream_id = self.h2.get_next_available_stream_id()
+            stream = self._streams[stream_id] = HTTP2Stream(stream_id)
+            self.h2.send_headers(stream_id, headers, end_stream=end_stream)
+            self._flush(timeout())
+        return stream
+
+    def _send_body(self,
+                   stream: HTTP2Stream,
+                   chunks: Iterable[bytes],
+                   timeout: Callable[[], Optional[float]]):
+        for chunk in chunks:
+            view = memoryview(chunk).cast('B')
+            pos = 0
+            while pos < len(view):
+                self._check_open()
+                size = min(
+                    self.h2.local_flow_control_window(stream.stream_id),
+                    self.h2.max_outbound_frame_size,
+                    len(view) - pos
+                    )
+                if size <= 0:
+                    self._wait_for_change(timeout())
+                    continue
+                with self._send_lock:
+                    self.h2.send_data(
+                        stream.stream_id,
+                        bytes(view[pos:pos + size])
+                        )
+                    self._flush(timeout())
+                pos += size
+        with self._send_lock:
+            self.h2.end_stream(stream.stream_id)
+            self._flush(timeout())
+
+    def _iter_data(self,
+                   stream: HTTP2Stream,
+                   timeout: Callable[[], Optional[float]]
+                   ) -> Iterator[bytes]:
+        """Yield response data, acknowledging it
+        so server can send more
+        """
+        try:
+            while True:
+                try:
+                    item = stream.data.get(timeout=timeout())
+                except Empty:
+                    raise socket.timeout(
+                        'HTTP/2 response timed out') from None
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                data, flow_length = item
+                if flow_length and not self.closed:
+                    with self._send_lock:
+                        try:
+                            self.h2.acknowledge_received_data(
+                                flow_length, stream.stream_id)
+                        except h2.exceptions.StreamClosedError:
+                            pass
+                        self._flush(timeout())
+                if data:
+                    yield data
+        finally:
+            self._close_stream(stream)
+
+    def _close_stream(self, stream: HTTP2Stream):
+        """Forget stream, cancelling it if response is not complete
+        """
+        if self._streams.pop(stream.stream_id, None) is None:
+            return
+        if not stream.ended and not self.closed:
+            stream.ended = True
+            with self._send_lock:
+                self.h2.reset_stream(
+                    stream.stream_id, h2.errors.ErrorCodes.CANCEL)
+                self._flush()
+        self._notify()
+
+    def request(self, session: 'HTTPSession') -> Response:
+        """Perform request of the session as a new stream
+        """
+        request = session.request
+        url = request.url
+        authority = url.host
+        if url.port != (443 if url.scheme == Scheme.HTTPS else 80):
+            authority += f':{url.port}'
+        headers = [
+            (b':method', request.method.value.encode()),
+            (b':scheme', url.scheme.value.encode()),
+            (b':authority', authority.encode()),
+            (b':path', url.path.encode()),
+        ]
+        for key, value in request.headers.multi_items():
+            key = key.lower()
+            if key not in connection_headers:
+                headers.append((key.encode(), value.encode()))
+
+        body = request.payload
+        stream = self._open_stream(headers, not body, session._io_timeout)
+        data = self._iter_data(stream, session._io_timeout)
+        try:
+            if body:
+                self._send_body(
+                    stream,
+                    body.iter_chunks(session.chunk_size or 65536),
+                    session._io_timeout
+                    )
+            session.timings.mark('sent')
+            try:
+                response_headers = stream.headers.get(
+                    timeout=session._io_timeout())
+            except Timeout:
+                raise socket.timeout('HTTP/2 response timed out') from None
+            session.timings.mark('headers')
+        except BaseException:
+            self._close_stream(stream)
+            raise
+
+        head = [b'HTTP/2 ']
+        for key, value in response_headers:
+            if key == b':status':
+                head[0] += value + b'\r\n'
+            elif not key.startswith(b':'):
+                head.append(key + b': ' + value + b'\r\n')
+        head.append(b'\r\n')
+        head = b''.join(head)
+        decoder = session._get_decoder(', '.join(
+            value.decode('latin-1')
+            for key, value in response_headers
+            if key == b'content-encoding'
+            ))
+
+        if session.stream:
+            return Response(
+                request,
+                head,
+                stream=data,
+                body_start=len(head),
+                on_close=lambda: self._close_stream(stream),
+                decoder=decoder
+                )
+
+        buffer = bytearray(head)
+        content = [] if decoder is not None else None
+        for piece in data:
+            buffer += piece
+            if decoder is not None:
+                content.append(decoder.decompress(piece))
+        if decoder is not None:
+            content.append(decoder.flush())
+            content = b''.join(content)
+        return Response(
+            request,
+            buffer,
+            body_start=len(head),
+            content=content
+            )
+
+
+class HTTP2Transport:
+    """Keeps one HTTP/2 connection per server and sends
+    requests over it, if server supports HTTP/2.
+
+    Support is negotiated with ALPN, so ssl_context used
+    for connections must offer h2 protocol.
+    For servers that do not support HTTP/2, requests
+    fall back to HTTP/1.1.
+
+    cleartext - speak HTTP/2 to http:// servers
+    without negotiation (h2c with prior knowledge)
+    """
+
+    __slots__ = (
+        'cleartext',
+        '_connections',
+        '_connecting',
+        '_http1'
+    )
+
+    def __init__(self, cleartext: bool = False):
+        if h2 is None:
+            raise ImportError('HTTP/2 support requires h2 package')
+        self.cleartext = cleartext
+        self._connections: Dict[ConnectionKey, HTTP2Connection] = dict()
+        self._connecting: Dict[ConnectionKey, AsyncResult] = dict()
+        # Servers that do not support HTTP/2
+        self._http1: Set[ConnectionKey] = set()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({list(self._connections)})'
+
+    def _discard(self, key: ConnectionKey, conn: HTTP2Connection):
+        if self._connections.get(key) is conn:
+            del self._connections[key]
+
+    def _connect(self,
+                 session: 'HTTPSession',
+                 key: ConnectionKey) -> Optional[HTTP2Connection]:
+        pending = self._connecting.get(key)
+        if pending is not None:
+            try:
+                return pending.get(timeout=remaining(None, session.deadline))
+            except Timeout:
+                raise socket.timeout('Request deadline exceeded') from None
+
+        pending = self._connecting[key] = AsyncResult()
+        try:
+            conn = session._connect()
+            if key[0] == Scheme.HTTPS and \
+                    conn.sock.selected_alpn_protocol() != 'h2':
+                self._http1.add(key)
+                # Connection is already established,
+                # let session use it for HTTP/1.1
+                session.conn = conn
+                h2_conn = None
+            else:
+                h2_conn = HTTP2Connection(
+                    conn,
+                    on_close=lambda c: self._discard(key, c)
+                    )
+                self._connections[key] = h2_conn
+        except BaseException as err:
+            pending.set_exception(err)
+            raise
+        else:
+            pending.set(h2_conn)
+            return h2_conn
+        finally:
+            del self._connecting[key]
+
+    def perform(self, session: 'HTTPSession') -> Optional[Response]:
+        """Perform request over HTTP/2,
+        returns None if server does not support it
+        """
+        url = session.request.url
+        key = (url.scheme, url.host, url.port)
+        if key in self._http1:
+            return None
+        if url.scheme == Scheme.HTTP and not self.cleartext:
+            return None
+
+        conn = self._connections.get(key)
+        if conn is None or not conn.is_usable:
+            conn = self._connect(session, key)
+            if conn is None:
+                return None
+        return conn.request(session)
+
+    def close(self):
+        """Close all HTTP/2 connections
+        """
+        for conn in list(self._connections.values()):
+            conn.close()
+        self._connections.clear()
@@ -1,12 +1,29 @@
-from typing import Optional, Union
+from typing import Optional, Union, List, Iterator, Tuple, TYPE_CHECKING
+from itertools import chain
+from time import monotonic
 
-from gevent import socket, ssl, spawn
+from gevent import socket, ssl, sleep, Timeout as GeventTimeout
 
 from .request_builder import RequestBuilder
-from ..constants import Scheme
+from .connection import Connection
+from .connection_pool import ConnectionPool
+from .redirects import RedirectCache
+from .cache import ResponseCache, CacheEntry
+from .retry import Retry
+from .timeout import Timeout, remaining
+from .timings import Timings, Hooks
+from .resolver import Resolver, connect_addrinfo
+from .tls import TLSSessionCache, default_ssl_context
+from .pipeline import Pipeline
+from .http2 import HTTP2Transport
+from ..constants import Scheme, Method, StatusCode
 from ..response import Response
-from ..headers import Headers
-from ..exceptions import network_exceptions
+from ..parser import ResponseParser, ParserState
+from ..encoding import ContentDecoder, get_decoder, accept_encoding
+from ..exceptions import InvalidResponse, network_exceptions
+
+if TYPE_CHECKING:
+    from ...limiter import RateLimiter  # NOQA
 
 
 class HTTPSession:
@@ -14,137 +31,679 @@ class HTTPSession:
 
     request - Request builder object that
     will supply information for request.\n
-    timeout - seconds till socket.timeout.\n
+    timeout - seconds till socket.timeout or Timeout with separate
+    connect, TLS handshake, read and total request limits.\n
     chunk_size - how many bytes to read at a time.\n
-    follow_redirects - should redirects be followed
+    follow_redirects - should redirects be followed.\n
+    pool - connection pool to take connections from and return them to,
+    if None connection is closed after request.\n
+    stream - return response as soon as headers are received,
+    body is then read with Response.iter_content().\n
+    resolver - resolver that caches hostname lookups,
+    if None host is resolved on every connection.\n
+    ssl_context - gevent.ssl.SSLContext for HTTPS connections,
+    if None context shared by all such requests is used.\n
+    tls_sessions - cache of TLS sessions to resume.\n
+    pipeline - pipeline to send idempotent requests through.\n
+    http2 - transport to send requests over HTTP/2 when server supports it.\n
+    redirects - cache of permanent redirects to follow
+    without asking server again.\n
+    cache - cache to answer GET requests from and store responses in.\n
+    retry - policy of repeating failed requests,
+    if None request is sent only once.\n
+    rate_limiter - limiter to wait for before every request
+    is sent to server.\n
+    hooks - callbacks to call as request progresses.\n
+    decode_content - advertise supported encodings in Accept-Encoding
+    and decompress response body as it is received.\n
+    max_decompressed_size - bytes decompressed body may take,
+    None for no limit
     """
 
     __slots__ = (
         'request',
         'timeout',
+        'deadline',
         'chunk_size',
         'conn',
         'responce',
         'follow_redirects',
-        'redirects_limit'
+        'redirects_limit',
+        'pool',
+        'parser',
+        'stream',
+        'streaming',
+        'resolver',
+        'ssl_context',
+        'tls_sessions',
+        'pipeline',
+        'http2',
+        'redirects',
+        'cache',
+        'retry',
+        'rate_limiter',
+        'hooks',
+        'timings',
+        'decode_content',
+        'max_decompressed_size'
     )
 
     def __init__(self,
                  request: RequestBuilder,
-                 timeout: Optional[float] = 5,
-                 chunk_size: Optional[int] = 1024,
+                 timeout: Union[float, Timeout, None] = 5,
+                 chunk_size: Optional[int] = 65536,
                  follow_redirects: bool = True,
-                 redirects_limit: int = 5
+                 redirects_limit: int = 5,
+                 pool: Optional[ConnectionPool] = None,
+                 stream: bool = False,
+                 resolver: Optional[Resolver] = None,
+                 ssl_context: Optional[ssl.SSLContext] = None,
+                 tls_sessions: Optional[TLSSessionCache] = None,
+                 pipeline: Optional[Pipeline] = None,
+                 http2: Optional[HTTP2Transport] = None,
+                 redirects: Optional[RedirectCache] = None,
+                 cache: Optional[ResponseCache] = None,
+                 retry: Optional[Retry] = None,
+                 rate_limiter: Optional['RateLimiter'] = None,
+                 hooks: Optional[Hooks] = None,
+                 decode_content: bool = True,
+                 max_decompressed_size: Optional[int] = 100 * 1024 * 1024
                  ):
         self.request = request
-        self.timeout = timeout
+        self.timeout = Timeout.of(timeout)
+        self.deadline: Optional[float] = None
         self.chunk_size = chunk_size
         self.follow_redirects = follow_redirects
         self.redirects_limit = redirects_limit
+        self.pool = pool
+        self.stream = stream
+        self.streaming = False
+        self.resolver = resolver
+        self.ssl_context = ssl_context
+        self.tls_sessions = tls_sessions
+        self.pipeline = pipeline
+        self.http2 = http2
+        self.redirects = redirects
+        self.cache = cache
+        self.retry = retry
+        self.rate_limiter = rate_limiter
+        self.hooks = hooks
+        self.timings: Optional[Timings] = None
+        self.decode_content = decode_content
+        self.max_decompressed_size = max_decompressed_size
+
+        if decode_content:
+            request.headers.setdefault('Accept-Encoding', accept_encoding)
 
-        self.conn: Optional[socket.socket] = None
+        self.conn: Optional[Connection] = None
         self.responce: Optional[Response] = None
+        self.parser: Optional[ResponseParser] = None
 
-    def _init_session(self):
-        """Establish TCP connection to server
+    def _connect(self) -> Connection:
+        """Establish new TCP connection to server
         """
-        host, port = self.request.url.host, self.request.url.port
-        self.conn = socket.create_connection(
-            (host, port),
-            timeout=self.timeout
-            )
-        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS)
-        if self.request.url.scheme == Scheme.HTTPS:
-            self.conn = ctx.wrap_socket(self.conn, server_hostname=host)
+        url = self.request.url
+        host, port = url.host, url.port
+        timeout, deadline = self.timeout, self.deadline
+        if self.resolver is not None:
+            addresses = self.resolver.resolve(
+                host, port, remaining(None, deadline))
+        else:
+            with GeventTimeout(remaining(None, deadline), socket.timeout(
+                    f'Lookup of {host} timed out')):
+                addresses = socket.getaddrinfo(
+                    host.strip('[]'), port, 0, socket.SOCK_STREAM)
+        self.timings.mark('dns')
+        sock = connect_addrinfo(addresses, host, timeout.connect, deadline)
+        self.timings.mark('connect')
+        # Request head and body are sent with separate writes,
+        # body must not wait for head to be acknowledged
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        key = (url.scheme, host, port)
+        if url.scheme == Scheme.HTTPS:
+            ctx = self.ssl_context or default_ssl_context()
+            session = None
+            if self.tls_sessions is not None:
+                session = self.tls_sessions.get(key)
+            # Handshake happens on wrap with timeout of socket
+            sock.settimeout(remaining(timeout.tls, deadline))
+            sock = ctx.wrap_socket(
+                sock,
+                server_hostname=host,
+                session=session
+                )
+            self.timings.mark('tls')
+        conn = Connection(sock, key)
+        conn.set_timeout(timeout.read, deadline)
+        self._emit('on_connect', self.request, self.timings)
+        return conn
 
-        return self
+    def _emit(self, event: str, *args):
+        """Call hook for event, if there is one
+        """
+        if self.hooks is not None:
+            callback = getattr(self.hooks, event)
+            if callback is not None:
+                callback(*args)
+
+    def _io_timeout(self) -> Optional[float]:
+        """Read timeout bounded by time left till deadline
+        """
+        return remaining(self.timeout.read, self.deadline)
+
+    def _init_session(self, reuse: bool = True) -> bool:
+        """Take connection to server from pool or establish a new one.
+
+        Returns True if connection was taken from pool
+        """
+        url = self.request.url
+        self.request.keep_alive = self.pool is not None
+        if self.conn is not None:
+            # Connection established during HTTP/2 negotiation
+            return False
+        if reuse and self.pool is not None:
+            self.conn = self.pool.acquire((url.scheme, url.host, url.port))
+            if self.conn is not None:
+                self.conn.set_timeout(self.timeout.read, self.deadline)
+                return True
+        self.conn = self._connect()
+        return False
 
     def _send_data(self):
         """Send request data to server
         """
         assert self.conn is not None
 
-        data = self.request.to_bytes()
+        buffers = self.request.to_buffers()
 
-        self.conn.sendall(data)
+        # Connection is only reusable after response is read completely
+        self.conn.reusable = False
+        self.conn.send_buffers(buffers)
+        if self.request.payload.is_stream:
+            self._send_body_stream()
 
-    def _read_response(self):
-        """Read response from server
+    def _send_body_stream(self):
+        """Send body that is read from file or iterable,
+        only chunk_size bytes of it are in memory at a time
+        """
+        body = self.request.payload
+        conn = self.conn
+        fd = body.fileno()
+        if fd is not None and body.length and conn.can_sendfile:
+            # Regular file over plain connection
+            # is copied to socket by kernel
+            offset = body.source.tell()
+            conn.sendfile(fd, offset, body.length)
+            body.source.seek(offset + body.length)
+            body.mark_consumed()
+            return
+
+        sent = 0
+        chunked = body.is_chunked
+        for chunk in body.iter_chunks(self.chunk_size or 65536):
+            sent += len(chunk)
+            if chunked:
+                conn.send_buffers(
+                    [b'%x\r\n' % len(chunk), chunk, b'\r\n'],
+                    new_request=False
+                    )
+            else:
+                conn.send_buffers([chunk], new_request=False)
+        if chunked:
+            conn.send_buffers([b'0\r\n\r\n'], new_request=False)
+        elif sent != body.length:
+            raise ValueError(
+                f'Body has {sent} bytes, while its length is {body.length}')
+
+    def _read_head(self) -> List[memoryview]:
+        """Read response till the end of headers,
+        returns pieces of body received along with them
         """
         assert self.conn is not None
 
-        responce_bytes = b''
+        parser = ResponseParser(
+            is_head=self.request.method == Method.HEAD
+            )
+        self.parser = parser
+        body = []
 
-        # Read till headers end
-        while True:
-            new_data = self.conn.recv(1)
-            responce_bytes += new_data
-            if responce_bytes.endswith(b'\r\n\r\n'):
+        while not parser.has_head:
+            data = self.conn.recv(self.chunk_size)
+            if not data:
+                parser.feed_eof()
+            body.extend(parser.feed(data))
+        self.timings.mark('headers')
+        if self.hooks is not None:
+            self._emit(
+                'on_headers',
+                self.request,
+                StatusCode(parser.status_code),
+                parser.headers
+                )
+        return body
+
+    def _iter_body(self) -> Iterator[memoryview]:
+        """Yield pieces of body as they are received
+        """
+        parser = self.parser
+        while not parser.is_done:
+            data = self.conn.recv(self.chunk_size)
+            if not data:
+                parser.feed_eof()
                 break
+            yield from parser.feed(data)
+        self._finish_response()
 
-        is_chunked = False
-        body_length = 0
-
-        responce_headers = Headers.from_bytes(responce_bytes)
-        if responce_headers.get('Transfer-Encoding') == 'chunked':
-            is_chunked = True
-        elif (bl := responce_headers.get('Content-Length')) is not None:
-            body_length = bl
-
-        if is_chunked:
-            chunks = []
-            while True:
-                chunk = b''
-                while not chunk.endswith(b'\r\n'):
-                    chunk += self.conn.recv(1)
-                if chunk == b'0\r\n':
-                    break
-                chunks.append(chunk)       
-            responce_bytes += b''.join(
-                [
-                    chunk[:-2] for i, chunk in enumerate(chunks)
-                    if i % 2 != 0
-                ])
-        elif body_length:
-            body_bytes = b''
-            while len(body_bytes) < body_length:
-                body_bytes += self.conn.recv(self.chunk_size)
-            responce_bytes += body_bytes
+    def _get_decoder(self,
+                     content_encoding: str) -> Optional[ContentDecoder]:
+        """Decoder for Content-Encoding of response
+        """
+        if not self.decode_content:
+            return None
+        return get_decoder(content_encoding, self.max_decompressed_size)
+
+    def _read_fixed_body(self,
+                         received: List[memoryview],
+                         decoder: Optional[ContentDecoder] = None
+                         ) -> Tuple[bytearray, Optional[bytes]]:
+        """Read body of known length into preallocated buffer
+        right after response head, returns the buffer along
+        with decoded content if decoder is given
+        """
+        parser = self.parser
+        head = parser.head
+        offset = len(head) + sum(len(i) for i in received)
+        end = offset + parser.remaining
+        buffer = bytearray(end)
+        view = memoryview(buffer)
+        view[:len(head)] = head
+        content = []
 
+        pos = len(head)
+        for piece in received:
+            view[pos:pos + len(piece)] = piece
+            pos += len(piece)
+        if decoder is not None:
+            content.append(decoder.decompress(view[len(head):pos]))
+
+        while pos < end:
+            size = self.conn.recv_into(view[pos:])
+            if not size:
+                parser.feed_eof()
+            if decoder is not None:
+                content.append(decoder.decompress(view[pos:pos + size]))
+            pos += size
+        parser.skip_body(pos - offset)
+
+        self._finish_response()
+        if decoder is None:
+            return buffer, None
+        content.append(decoder.flush())
+        return buffer, b''.join(content)
+
+    def _finish_response(self):
+        """Return unused data to connection
+        and decide if it can be reused
+        """
+        parser = self.parser
+        if self.tls_sessions is not None and self.conn.requests_sent == 1 \
+                and isinstance(self.conn.sock, ssl.SSLSocket):
+            # TLS 1.3 session tickets arrive after handshake,
+            # so session is stored once first response is read
+            self.tls_sessions.store(self.conn.key, self.conn.sock)
+        if parser.unused:
+            self.conn.unread(parser.unused)
+        self.conn.reusable = parser.keep_alive and self._is_keep_alive()
+
+    def _stream_body(self, received: List[memoryview]) -> Iterator[bytes]:
+        """Yield body pieces, connection is released
+        when body is exhausted or generator is closed
+        """
+        try:
+            for piece in received:
+                yield bytes(piece)
+            for piece in self._iter_body():
+                yield bytes(piece)
+        finally:
+            self._release_stream()
+
+    def _release_stream(self):
+        """Release connection held by streamed response
+        """
+        if self.streaming:
+            self.streaming = False
+            self.timings.mark('end')
+            self._end_session()
+
+    def _read_response(self):
+        """Read response from server
+        """
+        body = self._read_head()
+        parser = self.parser
+        decoder = self._get_decoder(parser.header('content-encoding'))
+
+        if self.stream and not parser.is_done:
+            self.streaming = True
+            self.responce = Response(
+                self.request,
+                parser.head,
+                stream=self._stream_body(body),
+                body_start=len(parser.head),
+                on_close=self._release_stream,
+                decoder=decoder
+            )
+            return
+
+        if parser.state == ParserState.BODY_FIXED:
+            buffer, content = self._read_fixed_body(body, decoder)
+            self.responce = Response(
+                self.request,
+                buffer,
+                body_start=len(parser.head),
+                content=content
+            )
+            return
+
+        buffer = bytearray(parser.head)
+        content = [] if decoder is not None else None
+        for piece in chain(body, self._iter_body()):
+            buffer += piece
+            if decoder is not None:
+                content.append(decoder.decompress(piece))
+        if decoder is not None:
+            content.append(decoder.flush())
+            content = b''.join(content)
         self.responce = Response(
             self.request,
-            responce_bytes, headers=responce_headers
+            buffer,
+            body_start=len(parser.head),
+            content=content
         )
 
+    def _is_keep_alive(self) -> bool:
+        """Check if request allows connection to be reused
+        """
+        if not self.request.keep_alive:
+            return False
+        request_conn = str(self.request.headers.get('Connection', ''))
+        return request_conn.lower() != 'close'
+
     def _end_session(self):
-        """Close connection to server
+        """Return connection to pool or close it
+        """
+        if self.conn is not None:
+            if self.pool is not None:
+                self.pool.release(self.conn)
+            else:
+                self.conn.close()
+            self.conn = None
+        return self
+
+    def _abort_session(self):
+        """Close connection without returning it to pool
         """
         if self.conn is not None:
             self.conn.close()
             self.conn = None
         return self
 
-    def perform(self) -> Union[Response, Exception]:
-        """Perfrom HTTP request
+    def _exchange(self):
+        """Send request and read response, recording
+        timings of exchange on response or exception
         """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(
+                self.request.url.host,
+                timeout=remaining(None, self.deadline)
+                )
+
+        timings = self.timings = Timings()
+        self._emit('on_request_start', self.request)
         try:
-            self._init_session()
+            self._transmit()
+        except Exception as err:
+            err.timings = timings
+            raise
+
+        self.responce.timings = timings
+        if not self.streaming:
+            timings.mark('end')
+
+    def _response_received(self):
+        """Call on_headers hook for response
+        that was not read by session itself
+        """
+        if self.hooks is not None:
+            self._emit(
+                'on_headers',
+                self.request,
+                self.responce.status_code,
+                self.responce.headers
+                )
 
+    def _transmit(self):
+        """Send request and read response,
+        retrying once on fresh connection if pooled one
+        turned out to be closed by server
+        """
+        if self.http2 is not None:
+            responce = self.http2.perform(self)
+            if responce is not None:
+                self.responce = responce
+                self._response_received()
+                return
+
+        if self.conn is None and self.pipeline is not None \
+                and self.pipeline.accepts(self):
+            # Response head is read by session itself in pipeline,
+            # on_headers is already called then
+            self.responce = self.pipeline.submit(self)
+            return
+
+        reused = self._init_session()
+        self.parser = None
+        try:
+            self._send_data()
+            self.timings.mark('sent')
+            self._read_response()
+        except network_exceptions:
+            if not reused or (
+                    self.parser is not None and self.parser.bytes_received) \
+                    or not self.request.payload.rewind():
+                raise
+            # Server may close idle connection at any time,
+            # request was not processed, so it is safe to repeat it
+            self._abort_session()
+            self._init_session(reuse=False)
             self._send_data()
+            self.timings.mark('sent')
             self._read_response()
-        except network_exceptions as err:
-            return err
+
+    def _cached_response(self, entry: CacheEntry) -> Response:
+        """Response to request made of stored one
+        """
+        return Response(
+            self.request,
+            entry.raw,
+            body_start=entry.body_start,
+            decoder=self._get_decoder(
+                entry.headers.get('Content-Encoding', '')
+                )
+        )
+
+    def _exchange_cached(self):
+        """Answer request from cache if stored response is fresh,
+        otherwise ask server, revalidating stored response
+        """
+        cache, request = self.cache, self.request
+        if not cache.accepts(request):
+            self._exchange()
+            if request.method not in (Method.GET, Method.HEAD) \
+                    and self.responce.status_code < 400:
+                # Unsafe method might have changed the resource
+                cache.invalidate(cache.key(request))
+            return
+
+        entry = cache.lookup(request)
+        if entry is not None and entry.is_fresh(request):
+            cache.hits += 1
+            self.responce = self._cached_response(entry)
+            self.responce.timings = Timings()
+            self.responce.timings.end = self.responce.timings.start
+            return
+
+        validators = entry.validators() if entry is not None else {}
+        for name, value in validators.items():
+            request.headers[name] = value
+        try:
+            self._exchange()
         finally:
-            self._end_session()
+            for name in validators:
+                request.headers.remove_header(name)
 
-        if self.follow_redirects and 300 < self.responce.status_code < 400:
-            if self.redirects_limit:
-                if len(self.request.redirect_chain) >= self.redirects_limit:
-                    return self.responce
+        if validators \
+                and self.responce.status_code == StatusCode.NOT_MODIFIED:
+            entry = cache.revalidate(request, entry, self.responce)
+            timings = self.responce.timings
+            self.responce = self._cached_response(entry)
+            self.responce.timings = timings
+            return
+        cache.misses += 1
+        cache.store(request, self.responce)
 
-            self.request.redirect_to(
-                self.responce.status_code,
-                self.responce.headers['Location']
-                )
-            return spawn(self.perform).get()
-        return self.responce
+    def _apply_known_redirects(self):
+        """Send request straight to where it was
+        permanently redirected before
+        """
+        if self.redirects is None or not self.follow_redirects:
+            return
+        chain = self.request.redirect_chain
+        visited = set()
+        while not self.redirects_limit or len(chain) < self.redirects_limit:
+            url = self.request.url.string
+            entry = self.redirects.get(url)
+            if entry is None or url in visited:
+                return
+            visited.add(url)
+            self.request.redirect_to(entry[1], entry[0])
+
+    def _next_location(self) -> Optional[str]:
+        """Location to follow redirect response to,
+        None if response is final
+        """
+        responce = self.responce
+        if not self.follow_redirects \
+                or not 300 < responce.status_code < 400:
+            return None
+        location = responce.headers.get('Location')
+        if location is None:
+            return None
+        if self.redirects_limit \
+                and len(self.request.redirect_chain) >= self.redirects_limit:
+            return None
+        if not self.request.payload.rewind():
+            # Body can not be sent once more
+            return None
+        return location
+
+    def _send_request(self):
+        if self.cache is not None:
+            self._exchange_cached()
+        else:
+            self._exchange()
+
+    def _drain(self):
+        """Read body of streamed response that will not be returned,
+        so that connection can be reused
+        """
+        if self.streaming:
+            for _ in self.responce.iter_content():
+                pass
+
+    def _retry_delay(self,
+                     attempt: int,
+                     responce: Optional[Response] = None) -> Optional[float]:
+        """Seconds to wait before sending request once more,
+        None if it should not be retried
+        """
+        retry = self.retry
+        if retry is None or not retry.allows(self.request.method, attempt):
+            return None
+        if responce is not None and responce.status_code not in retry.statuses:
+            return None
+        if not self.request.payload.rewind():
+            return None
+        delay = retry.delay(attempt, responce)
+        if delay is not None and self.deadline is not None \
+                and monotonic() + delay >= self.deadline:
+            # Request would not finish in time anyway
+            return None
+        return delay
+
+    def _perform(self) -> Union[Response, Exception]:
+        self._apply_known_redirects()
+        attempt = 1
+        while True:
+            try:
+                self._send_request()
+            except network_exceptions as err:
+                # Connection is in unknown state
+                self._abort_session()
+                delay = self._retry_delay(attempt)
+                if delay is None:
+                    return err
+                sleep(delay)
+                attempt += 1
+                continue
+            except (InvalidResponse, ssl.SSLError) as err:
+                # Server answered, but the answer is unusable,
+                # repeating request is not going to change that
+                self._abort_session()
+                return err
+            finally:
+                # Streamed body releases connection by itself
+                if not self.streaming:
+                    self._end_session()
+
+            delay = self._retry_delay(attempt, self.responce)
+            if delay is not None:
+                self._drain()
+                sleep(delay)
+                attempt += 1
+                continue
+            self.responce.attempts = attempt
+
+            location = self._next_location()
+            if location is None:
+                return self.responce
+
+            self._drain()
+            attempt = 1
+            source = self.request.url.string
+            status_code = self.responce.status_code
+            self.request.redirect_to(status_code, location)
+            if self.redirects is not None:
+                self.redirects.store(
+                    source,
+                    self.request.url.string,
+                    status_code
+                    )
+
+    def perform(self) -> Union[Response, Exception]:
+        """Perfrom HTTP request
+        """
+        self.deadline = self.timeout.deadline()
+        if self.pool is not None \
+                or not (self.follow_redirects or self.retry is not None):
+            result = self._perform()
+        else:
+            # Keep connection open while following redirects and retrying,
+            # so that requests to the same server do not reconnect
+            self.pool = ConnectionPool(maxsize=1)
+            try:
+                result = self._perform()
+            finally:
+                pool, self.pool = self.pool, None
+                pool.clear()
+        self._emit('on_complete', self.request, result)
+        return result
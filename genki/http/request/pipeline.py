@@ -0,0 +1,280 @@
+from typing import Dict, Deque, List, Optional, Iterable, TYPE_CHECKING
+from collections import deque, namedtuple
+from time import monotonic
+
+from gevent import Greenlet, socket, spawn, sleep, Timeout
+from gevent.event import AsyncResult
+
+from .connection import Connection, ConnectionKey
+from .request_builder import RequestBuilder
+from .timeout import remaining
+from ..constants import Method
+from ..parser import ResponseParser
+from ..response import Response
+from ..exceptions import network_exceptions
+
+if TYPE_CHECKING:
+    from .http_session import HTTPSession  # NOQA
+
+
+pipeline_stats = namedtuple(
+    'PipelineStats',
+    ['batches', 'requests', 'resent', 'queued']
+    )
+
+# Requests that can be safely sent again
+# if server closes connection before answering them
+idempotent_methods = frozenset((
+    Method.GET,
+    Method.HEAD,
+    Method.PUT,
+    Method.DELETE,
+    Method.OPTIONS,
+    Method.TRACE
+))
+
+
+def _latest(values: Iterable[Optional[float]]) -> Optional[float]:
+    """Largest of values, None if any of them is None
+    """
+    values = list(values)
+    if not values or None in values:
+        return None
+    return max(values)
+
+
+def _out_of_time(session: 'HTTPSession') -> bool:
+    """True if deadline of request has passed
+    """
+    return session.deadline is not None and session.deadline <= monotonic()
+
+
+def _discard_response(conn: Connection, request: RequestBuilder) -> bool:
+    """Read response nobody waits for anymore, so that
+    the next one can be read. Returns True if connection
+    can be reused after it
+    """
+    parser = ResponseParser(is_head=request.method == Method.HEAD)
+    while not parser.is_done:
+        data = conn.recv(65536)
+        if not data:
+            parser.feed_eof()
+            return False
+        parser.feed(data)
+    if parser.unused:
+        conn.unread(parser.unused)
+    return parser.keep_alive
+
+
+class Pipeline:
+    """Sends idempotent requests to the same server back to back
+    on one connection, without waiting for responses in between.
+    Responses are matched to requests in order they were sent.
+
+    depth - maximum number of requests sent at once.\n
+    retries - how many times request that got no response,
+    because server closed connection, is resent on a fresh one
+    """
+
+    __slots__ = (
+        'depth',
+        'retries',
+        '_queues',
+        '_workers',
+        'batches',
+        'requests',
+        'resent'
+    )
+
+    def __init__(self, depth: int = 8, retries: int = 2):
+        self.depth = depth
+        self.retries = retries
+        self._queues: Dict[ConnectionKey, Deque[list]] = dict()
+        self._workers: Dict[ConnectionKey, Greenlet] = dict()
+
+        self.batches = 0
+        self.requests = 0
+        self.resent = 0
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.stats})'
+
+    @property
+    def stats(self) -> pipeline_stats:
+        return pipeline_stats(
+            self.batches,
+            self.requests,
+            self.resent,
+            sum(len(i) for i in self._queues.values())
+        )
+
+    @staticmethod
+    def accepts(session: 'HTTPSession') -> bool:
+        """True if request of the session can be pipelined
+        """
+        return session.request.method in idempotent_methods \
+            and not session.stream \
+            and not session.request.payload.is_stream
+
+    def submit(self, session: 'HTTPSession') -> Response:
+        """Queue request of the session and wait for response,
+        raises socket.timeout if deadline of request passes first
+        """
+        url = session.request.url
+        key = (url.scheme, url.host, url.port)
+        timeout = remaining(None, session.deadline)
+        result = AsyncResult()
+        item = [session, result, 0]
+        self._queues.setdefault(key, deque()).append(item)
+        if key not in self._workers:
+            self._workers[key] = spawn(self._work, key)
+        try:
+            return result.get(timeout=timeout)
+        except Timeout:
+            try:
+                self._queues.get(key, deque()).remove(item)
+            except ValueError:
+                if session.conn is not None:
+                    # Worker is reading response to this request,
+                    # no longer than till its deadline, and must be done
+                    # with the session before it can be used again
+                    return result.get()
+                # Request is sent, but its turn has not come yet,
+                # worker throws its response away once it arrives
+                result.set_exception(
+                    socket.timeout('Request deadline exceeded'))
+            raise socket.timeout('Request deadline exceeded')
+
+    def _work(self, key: ConnectionKey):
+        queue = self._queues[key]
+        try:
+            # Let other greenlets queue their requests
+            # before the first batch is sent
+            sleep(0)
+            while queue:
+                batch = [
+                    queue.popleft()
+                    for _ in range(min(self.depth, len(queue)))
+                ]
+                self._send_batch(batch)
+        finally:
+            del self._workers[key]
+            if not queue:
+                del self._queues[key]
+
+    def _requeue(self, items: List[list], error: Exception):
+        """Put requests that got no response back in queue
+        or fail them if they were resent too many times
+        """
+        for item in reversed(items):
+            session, result, attempts = item
+            if result.ready():
+                # Caller gave up waiting for it
+                continue
+            if _out_of_time(session):
+                result.set_exception(
+                    socket.timeout('Request deadline exceeded'))
+                continue
+            if attempts >= self.retries:
+                result.set_exception(error)
+                continue
+            item[2] += 1
+            self.resent += 1
+            url = session.request.url
+            self._queues[(url.scheme, url.host, url.port)].appendleft(item)
+
+    def _send_batch(self, batch: List[list]):
+        first = batch[0][0]
+        conn: Optional[Connection] = None
+        try:
+            first._init_session()
+            conn, first.conn = first.conn, None
+            for session, _, _ in batch:
+                session.request.keep_alive = True
+            conn.reusable = False
+            # Batch is written at once, so it is limited by the most
+            # patient of its requests, others give up on their own
+            conn.set_timeout(
+                _latest(session.timeout.read for session, _, _ in batch),
+                _latest(session.deadline for session, _, _ in batch)
+                )
+            conn.send_buffers([
+                buffer
+                for session, _, _ in batch
+                for buffer in session.request.to_buffers()
+                ])
+        except network_exceptions as err:
+            if conn is not None:
+                conn.close()
+            self._requeue(batch, err)
+            return
+        except Exception as err:
+            if conn is not None:
+                conn.close()
+            for _, result, _ in batch:
+                result.set_exception(err)
+            return
+
+        self.batches += 1
+        self.requests += len(batch)
+
+        answered = 0
+        error: Exception = ConnectionAbortedError(
+            'Server closed connection before answering pipelined request'
+            )
+        for number, (session, result, _) in enumerate(batch):
+            waiting = [i[0] for i in batch[number:] if not i[1].ready()]
+            if not waiting:
+                # Nobody waits for the rest of responses
+                break
+            abandoned = result.ready()
+            try:
+                # Response is read as long as the first request
+                # still waiting for its own one has time left
+                conn.set_timeout(waiting[0].timeout.read, waiting[0].deadline)
+                if not abandoned:
+                    session.conn = conn
+                    session.parser = None
+                    try:
+                        session._read_response()
+                    except socket.timeout as err:
+                        if session.parser is not None \
+                                and session.parser.bytes_received \
+                                or len(waiting) == 1 \
+                                or not _out_of_time(session):
+                            raise
+                        # Response did not even start till deadline,
+                        # it is thrown away for the sake of those after it
+                        session.conn = None
+                        result.set_exception(err)
+                        abandoned = True
+                        waiting.pop(0)
+                        conn.set_timeout(
+                            waiting[0].timeout.read, waiting[0].deadline)
+                    finally:
+                        session.conn = None
+                if abandoned:
+                    conn.reusable = _discard_response(conn, session.request)
+            except Exception as err:
+                error = err
+                received = not abandoned and session.parser is not None \
+                    and session.parser.bytes_received
+                if not abandoned and (
+                        not isinstance(err, network_exceptions) or received):
+                    # Response was broken, not missing
+                    result.set_exception(err)
+                    answered += 1
+                conn.reusable = False
+                break
+            if not abandoned:
+                result.set(session.responce)
+            answered += 1
+            if not conn.reusable:
+                # Server is going to close connection after this response
+                break
+
+        self._requeue(batch[answered:], error)
+        if first.pool is not None and answered == len(batch):
+            first.pool.release(conn)
+        else:
+            conn.close()
@@ -0,0 +1,73 @@
+from typing import Optional, Tuple
+from collections import OrderedDict, namedtuple
+
+from ..constants import StatusCode
+
+
+redirect_cache_stats = namedtuple(
+    'RedirectCacheStats',
+    ['hits', 'misses', 'size']
+    )
+
+# Redirects that may be remembered without asking server again
+permanent_redirects = frozenset((
+    StatusCode.MOVED_PERMAMENTLY,
+    StatusCode.PERMAMENT_REDIRECT
+))
+
+
+class RedirectCache:
+    """Remembers permanent (301 and 308) redirects, so that
+    requests to old URL go straight to its new location.
+
+    maxsize - how many redirects to remember,
+    least recently used ones are forgotten first
+    """
+
+    __slots__ = (
+        'maxsize',
+        '_entries',
+        'hits',
+        'misses'
+    )
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.stats})'
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, url: str) -> Optional[Tuple[str, StatusCode]]:
+        """Location and status code URL was redirected with,
+        None if it is not known to be permanently redirected
+        """
+        entry = self._entries.get(url)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(url)
+        self.hits += 1
+        return entry
+
+    def store(self, url: str, location: str, status_code: StatusCode):
+        """Remember redirect if it is permanent
+        """
+        if status_code not in permanent_redirects or url == location:
+            return
+        self._entries[url] = (location, status_code)
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    @property
+    def stats(self) -> redirect_cache_stats:
+        return redirect_cache_stats(self.hits, self.misses, len(self))
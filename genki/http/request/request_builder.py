@@ -1,9 +1,10 @@
-from typing import Union, Dict, Any
+from typing import Union, Dict, Any, Mapping, List
 from collections import namedtuple
 
 from ..constants import Method, StatusCode
 from ..url import URL
 from ..headers import Headers
+from .body import RequestBody, BodySource
 
 
 redirect = namedtuple(
@@ -21,7 +22,8 @@ class RequestBuilder:
         'scheme',
         'port',
         'http_version',
-        'redirect_chain'
+        'redirect_chain',
+        'keep_alive'
     )
 
     def __init__(self,
@@ -31,16 +33,16 @@ class RequestBuilder:
                      Headers,
                      Dict[str, Union[str, int]],
                      bytes] = Headers(),
-                 body: Union[str, bytes, bytearray] = b'',
+                 body: Union[BodySource, RequestBody] = b'',
                  method: Union[Method, str] = Method.GET,
                  http_version: str = '1.1'):
         self.headers = headers
         self.url = url
-        # TODO MessageBody class to handle different types of content
         self.body = body
         self.method = method
         self.http_version = http_version
         self.redirect_chain = []
+        self.keep_alive = False
 
     @property
     def url(self) -> URL:
@@ -63,8 +65,10 @@ class RequestBuilder:
     def headers(self,
                 value: Union[Headers, Dict[str, Union[str, int]], bytes]):
         if isinstance(value, Headers):
-            self._headers = value
-        elif isinstance(value, Dict):
+            # Copy, so that per request headers like Host or Connection
+            # do not leak into headers object shared between requests
+            self._headers = Headers(value)
+        elif isinstance(value, Mapping):
             self._headers = Headers(value)
         elif isinstance(value, bytes):
             self._headers = Headers.from_bytes(value)
@@ -82,27 +86,47 @@ class RequestBuilder:
         self._method = Method(value)
 
     @property
-    def body(self) -> bytes:
-        return self._body
+    def body(self) -> Union[bytes, bytearray, memoryview, BodySource]:
+        """Body kept in memory, or object streamed body is read from
+        """
+        if self._body.is_stream:
+            return self._body.source
+        return self._body.data
 
     @body.setter
-    def body(self,
-             value: Union[str, bytes, bytearray, None],
-             str_encoding='utf-8'):
-        if not value:
-            self._body = b''
-        elif isinstance(value, bytes):
-            self._body = value
-        elif isinstance(value, bytearray):
-            self._body = bytes(value)
-        elif isinstance(value, str):
-            self._body = value.encode(str_encoding)
-        else:
-            raise TypeError(f'Unsuitable type for body: {type(value)}')
+    def body(self, value: Union[BodySource, RequestBody]):
+        """Body can be str, bytes-like object, binary file object
+        or iterable of bytes. Streamed body of unknown length is sent
+        with chunked transfer encoding, unless Content-Length header
+        was given along with it
+        """
+        if not isinstance(value, RequestBody):
+            length = None
+            if getattr(self, '_body', None) is None \
+                    and 'Content-Length' in self.headers:
+                length = int(self.headers['Content-Length'])
+            value = RequestBody(value)
+            if value.is_stream and value.length is None:
+                value.length = length
+        self._body = value
+        self._set_length_headers()
+
+    @property
+    def payload(self) -> RequestBody:
+        """Request body object
+        """
+        return self._body
 
-        if self.body:
-            self.headers['Content-Length'] = len(self.body)
-        elif self.headers.get('Content-Length') is not None:
+    def _set_length_headers(self):
+        length = self._body.length
+        if length is None:
+            self.headers.remove_header('Content-Length')
+            self.headers['Transfer-Encoding'] = 'chunked'
+            return
+        self.headers.remove_header('Transfer-Encoding')
+        if length:
+            self.headers['Content-Length'] = length
+        else:
             self.headers.remove_header('Content-Length')
 
     def redirect_to(self, code: StatusCode, location: str):
@@ -118,7 +142,8 @@ class RequestBuilder:
         if b:
             if isinstance(b, str):
                 b = b.encode(encoding)
-            self.body = self.body + b
+            self._body.append(b)
+            self._set_length_headers()
 
     def set_header(self, key: str, value: Union[str, int]) -> 'RequestBuilder':
         self.headers[key] = value
@@ -128,15 +153,32 @@ class RequestBuilder:
         self.headers.remove_header(key)
         return self
 
-    def to_bytes(self) -> bytes:
-        s = f'{self.method} {self.url.path} HTTP/{self.http_version}\r\n'\
-            .encode('ascii')
+    def head_bytes(self) -> bytes:
+        """Request line and headers
+        """
         self._headers['Host'] = self.url.host
-        self._headers.setdefault('Connection', 'close')
-        s += self.headers.to_bytes()
-        if self.body:
-            s += self.body
-        return s
+        self._headers.setdefault(
+            'Connection',
+            'keep-alive' if self.keep_alive else 'close'
+            )
+        return b''.join((
+            f'{self.method.value} {self.url.path} '
+            f'HTTP/{self.http_version}\r\n'.encode('ascii'),
+            self._headers.to_bytes()
+            ))
+
+    def to_buffers(self) -> List[Union[bytes, bytearray, memoryview]]:
+        """Request as a list of buffers to be sent one after another,
+        so that body is not copied to be joined with headers.
+
+        Streamed body is not included
+        """
+        if self._body and not self._body.is_stream:
+            return [self.head_bytes(), self._body.data]
+        return [self.head_bytes()]
+
+    def to_bytes(self) -> bytes:
+        return b''.join(self.to_buffers())
 
     def to_str(self) -> str:
         return self.to_bytes().decode('utf-8', errors='replace')
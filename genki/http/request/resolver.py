@@ -0,0 +1,181 @@
+from typing import Optional, Tuple, List, Dict, Union
+from collections import OrderedDict, namedtuple
+from time import monotonic
+
+from gevent import socket, spawn, Timeout
+from gevent.event import AsyncResult
+
+from .timeout import remaining
+
+
+AddrInfo = Tuple[int, int, int, str, tuple]
+
+resolver_stats = namedtuple(
+    'ResolverStats',
+    ['hits', 'misses', 'negative_hits', 'shared_lookups', 'size']
+    )
+
+# Arguments (errno, strerror) of socket.gaierror of failed lookup,
+# every caller gets its own exception made of them
+failed_lookup = namedtuple('FailedLookup', ['args'])
+
+
+class Resolver:
+    """Caches results of hostname resolution
+
+    ttl - seconds resolved addresses are kept.\n
+    negative_ttl - seconds failed lookups are remembered.\n
+    maxsize - maximum number of cached hosts, least recently
+    used ones are dropped first.
+
+    Concurrent lookups of the same host are made only once,
+    all greenlets wait for the same result.
+    One resolver can be shared between several clients.
+    """
+
+    __slots__ = (
+        'ttl',
+        'negative_ttl',
+        'maxsize',
+        '_cache',
+        '_in_flight',
+        'hits',
+        'misses',
+        'negative_hits',
+        'shared_lookups'
+    )
+
+    def __init__(self,
+                 ttl: float = 300.0,
+                 negative_ttl: float = 10.0,
+                 maxsize: int = 1024):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+
+        self._cache: Dict[
+            Tuple[str, int],
+            Tuple[float, Union[List[AddrInfo], failed_lookup]]
+        ] = OrderedDict()
+        self._in_flight: Dict[Tuple[str, int], AsyncResult] = dict()
+
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.shared_lookups = 0
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.stats})'
+
+    @property
+    def stats(self) -> resolver_stats:
+        return resolver_stats(
+            self.hits,
+            self.misses,
+            self.negative_hits,
+            self.shared_lookups,
+            len(self._cache)
+        )
+
+    def clear(self):
+        self._cache.clear()
+
+    def _lookup(self, host: str, port: int) -> List[AddrInfo]:
+        return socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+
+    def _store(self, key: Tuple[str, int], ttl: float, value):
+        self._cache[key] = (monotonic() + ttl, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def resolve(self,
+                host: str,
+                port: int,
+                timeout: Optional[float] = None) -> List[AddrInfo]:
+        """Return getaddrinfo() results for host and port,
+        raises socket.gaierror if host can not be resolved
+        and socket.timeout if it is not resolved in timeout seconds
+        """
+        host = host.strip('[]')
+        key = (host, port)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            expires, value = cached
+            if expires > monotonic():
+                self._cache.move_to_end(key)
+                if isinstance(value, failed_lookup):
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return _result(value)
+            del self._cache[key]
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.shared_lookups += 1
+        else:
+            self.misses += 1
+            pending = self._in_flight[key] = AsyncResult()
+            # Lookup runs in its own greenlet, so that caller that gives
+            # up on it does not fail other callers waiting for it
+            spawn(self._fill, key, pending)
+        try:
+            return _result(pending.get(timeout=timeout))
+        except Timeout:
+            raise socket.timeout(f'Lookup of {host} timed out') from None
+
+    def _fill(self, key: Tuple[str, int], pending: AsyncResult):
+        """Look host up and pass result to everyone waiting for it
+        """
+        try:
+            result = self._lookup(*key)
+        except socket.gaierror as err:
+            failure = failed_lookup(err.args)
+            self._store(key, self.negative_ttl, failure)
+            pending.set(failure)
+        except BaseException as err:
+            pending.set_exception(err)
+        else:
+            self._store(key, self.ttl, result)
+            pending.set(result)
+        finally:
+            del self._in_flight[key]
+
+    def connect(self,
+                address: Tuple[str, int],
+                timeout: Optional[float] = None) -> socket.socket:
+        """Connect to address like socket.create_connection(),
+        but with cached hostname resolution
+        """
+        host, port = address
+        return connect_addrinfo(self.resolve(host, port), host, timeout)
+
+
+def _result(value: Union[List[AddrInfo], failed_lookup]
+            ) -> List[AddrInfo]:
+    if isinstance(value, failed_lookup):
+        raise socket.gaierror(*value.args)
+    return value
+
+
+def connect_addrinfo(addresses: List[AddrInfo],
+                     host: str,
+                     timeout: Optional[float] = None,
+                     deadline: Optional[float] = None) -> socket.socket:
+    """Connect to first of resolved addresses that accepts connection,
+    every attempt is limited to timeout and all of them to deadline
+    """
+    error: Optional[OSError] = None
+    for family, type_, proto, _, sockaddr in addresses:
+        left = remaining(timeout, deadline)
+        sock = socket.socket(family, type_, proto)
+        try:
+            sock.settimeout(left)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as err:
+            error = err
+            sock.close()
+    raise error or socket.gaierror(f'No addresses found for {host}')
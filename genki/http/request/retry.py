@@ -0,0 +1,108 @@
+from typing import Optional, Iterable, Union
+from random import uniform
+from time import time
+
+from .cache import parse_http_date
+from ..constants import Method, StatusCode
+from ..response import Response
+
+
+# Methods that are safe to send more than once, RFC 7231 section 4.2.2
+idempotent_methods = frozenset((
+    Method.GET,
+    Method.HEAD,
+    Method.OPTIONS,
+    Method.TRACE,
+    Method.PUT,
+    Method.DELETE
+))
+
+retry_statuses = frozenset((
+    StatusCode.TOO_MANY_REQUESTS,
+    StatusCode.BAD_GATEWAY,
+    StatusCode.SERVICE_UNAVAILABLE,
+    StatusCode.GATEWAY_TIMEOUT
+))
+
+
+class Retry:
+    """Policy of repeating requests that failed with network error
+    or were answered with one of retry statuses.
+
+    Delay before n-th retry is random between 0 and
+    backoff * 2 ** (n - 1) seconds, so that clients that failed
+    at the same time do not retry at the same time.
+
+    attempts - how many times request is sent at most.\n
+    backoff - base of delay between attempts in seconds.\n
+    max_backoff - longest delay between attempts, request is not
+    retried if server asks to wait longer with Retry-After.\n
+    statuses - response statuses to retry.\n
+    methods - methods of requests that may be retried,
+    by default only idempotent ones.\n
+    respect_retry_after - wait as long as Retry-After header
+    of response says instead of backing off
+    """
+
+    __slots__ = (
+        'attempts',
+        'backoff',
+        'max_backoff',
+        'statuses',
+        'methods',
+        'respect_retry_after'
+    )
+
+    def __init__(self,
+                 attempts: int = 3,
+                 backoff: float = 0.5,
+                 max_backoff: float = 30,
+                 statuses: Iterable[int] = retry_statuses,
+                 methods: Iterable[Union[Method, str]] = idempotent_methods,
+                 respect_retry_after: bool = True):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(Method(i) for i in methods)
+        self.respect_retry_after = respect_retry_after
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(attempts={self.attempts}, ' \
+            f'backoff={self.backoff})'
+
+    def allows(self, method: Method, attempt: int) -> bool:
+        """True if request may be sent once more
+        after given number of attempts
+        """
+        return attempt < self.attempts and method in self.methods
+
+    def retry_after(self, responce: Response) -> Optional[float]:
+        """Seconds server asked to wait before retrying,
+        None if it did not
+        """
+        value = responce.headers.get('Retry-After', '').strip()
+        if not value:
+            return None
+        if value.isdigit():
+            return float(value)
+        date = parse_http_date(value)
+        if date is None:
+            return None
+        return max(0.0, date - time())
+
+    def delay(self,
+              attempt: int,
+              responce: Optional[Response] = None) -> Optional[float]:
+        """Seconds to wait before next attempt,
+        None if request should not be retried
+        """
+        if responce is not None and self.respect_retry_after:
+            wait = self.retry_after(responce)
+            if wait is not None:
+                return wait if wait <= self.max_backoff else None
+        # Full jitter
+        return uniform(
+            0,
+            min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+            )
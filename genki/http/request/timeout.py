@@ -0,0 +1,71 @@
+from typing import Optional, Union
+from time import monotonic
+
+from gevent import socket
+
+
+class Timeout:
+    """Limits in seconds of how long parts of request may take,
+    None means no limit.
+
+    timeout - default for connect, tls and read.\n
+    connect - establishing TCP connection.\n
+    tls - TLS handshake.\n
+    read - any single read from or write to socket, so that
+    server that stopped responding is given up on.\n
+    total - whole request including redirects, retries and
+    download of body, even if it is streamed. Protects from
+    servers trickling data just fast enough to never hit read timeout
+    """
+
+    __slots__ = (
+        'connect',
+        'tls',
+        'read',
+        'total'
+    )
+
+    def __init__(self,
+                 timeout: Optional[float] = None,
+                 connect: Optional[float] = ...,
+                 tls: Optional[float] = ...,
+                 read: Optional[float] = ...,
+                 total: Optional[float] = None):
+        self.connect = timeout if connect is ... else connect
+        self.tls = timeout if tls is ... else tls
+        self.read = timeout if read is ... else read
+        self.total = total
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(connect={self.connect}, ' \
+            f'tls={self.tls}, read={self.read}, total={self.total})'
+
+    @classmethod
+    def of(cls, value: Union['Timeout', float, None]) -> 'Timeout':
+        """Timeout given either as is or as a single number
+        applied to every socket operation
+        """
+        if isinstance(value, cls):
+            return value
+        return cls(value)
+
+    def deadline(self) -> Optional[float]:
+        """Moment request started now has to be finished by,
+        in time.monotonic() terms
+        """
+        if self.total is None:
+            return None
+        return monotonic() + self.total
+
+
+def remaining(timeout: Optional[float],
+              deadline: Optional[float]) -> Optional[float]:
+    """Smaller of timeout and time left till deadline,
+    raises socket.timeout once deadline has passed
+    """
+    if deadline is None:
+        return timeout
+    left = deadline - monotonic()
+    if left <= 0:
+        raise socket.timeout('Request deadline exceeded')
+    return left if timeout is None else min(timeout, left)
@@ -0,0 +1,121 @@
+from typing import Optional, Dict, Callable, Union, Any
+from time import monotonic
+
+
+# Phases of exchange in order they happen
+phases = ('start', 'dns', 'connect', 'tls', 'sent', 'headers', 'end')
+
+
+class Timings:
+    """time.monotonic() timestamps of request phases.
+
+    start - request is about to be sent.\n
+    dns - hostname is resolved.\n
+    connect - TCP connection is established.\n
+    tls - TLS handshake is done.\n
+    sent - request is sent.\n
+    headers - response head is received.\n
+    end - response body is received.
+
+    Phases that did not happen, e.g. connecting when connection
+    was taken from pool, are None. end of streamed response
+    is set once its body is read
+    """
+
+    __slots__ = phases
+
+    def __init__(self, start: Optional[float] = None):
+        self.start = monotonic() if start is None else start
+        self.dns: Optional[float] = None
+        self.connect: Optional[float] = None
+        self.tls: Optional[float] = None
+        self.sent: Optional[float] = None
+        self.headers: Optional[float] = None
+        self.end: Optional[float] = None
+
+    def __repr__(self):
+        durations = ', '.join(
+            f'{name}={value * 1000:.1f}ms'
+            for name, value in self.durations().items()
+            )
+        return f'{self.__class__.__name__}({durations})'
+
+    def mark(self, phase: str):
+        """Record that phase happened now
+        """
+        setattr(self, phase, monotonic())
+
+    def durations(self) -> Dict[str, float]:
+        """Seconds each phase that happened took since previous one
+        """
+        result = dict()
+        previous = self.start
+        for phase in phases[1:]:
+            value = getattr(self, phase)
+            if value is not None:
+                result[phase] = value - previous
+                previous = value
+        return result
+
+    @property
+    def total(self) -> Optional[float]:
+        """Seconds from start till end, None if body is not read yet
+        """
+        return None if self.end is None else self.end - self.start
+
+    @property
+    def ttfb(self) -> Optional[float]:
+        """Seconds from sending request till receiving response head
+        """
+        if self.sent is None or self.headers is None:
+            return None
+        return self.headers - self.sent
+
+
+class Hooks:
+    """Callbacks called as requests progress,
+    None means there is nothing to call.
+
+    on_request_start(request) - request is about to be sent.\n
+    on_connect(request, timings) - new connection is established.\n
+    on_headers(request, status_code, headers) - response head
+    is received.\n
+    on_complete(request, result) - request is finished with
+    Response or exception, both carrying timings attribute.
+
+    Redirects and retries send request several times, so
+    every callback except on_complete may be called more than once
+    """
+
+    __slots__ = (
+        'on_request_start',
+        'on_connect',
+        'on_headers',
+        'on_complete'
+    )
+
+    def __init__(self,
+                 on_request_start: Optional[Callable[..., Any]] = None,
+                 on_connect: Optional[Callable[..., Any]] = None,
+                 on_headers: Optional[Callable[..., Any]] = None,
+                 on_complete: Optional[Callable[..., Any]] = None):
+        self.on_request_start = on_request_start
+        self.on_connect = on_connect
+        self.on_headers = on_headers
+        self.on_complete = on_complete
+
+    def __bool__(self):
+        return any((
+            self.on_request_start,
+            self.on_connect,
+            self.on_headers,
+            self.on_complete
+        ))
+
+    @classmethod
+    def of(cls, **callbacks: Union[Callable[..., Any], None]
+           ) -> Optional['Hooks']:
+        """Hooks with given callbacks, None if none is given
+        """
+        hooks = cls(**callbacks)
+        return hooks if hooks else None
@@ -0,0 +1,96 @@
+from typing import Optional, Dict
+from collections import OrderedDict, namedtuple
+
+from gevent import ssl
+
+from .connection import ConnectionKey
+
+
+tls_stats = namedtuple('TLSStats', ['offered', 'reused', 'size'])
+
+_default_context: Optional[ssl.SSLContext] = None
+
+
+def create_ssl_context(cafile: Optional[str] = None) -> ssl.SSLContext:
+    """Create SSLContext that verifies certificates and hostnames
+    against system CA store or given cafile.
+
+    Note that ssl.create_default_context() returns
+    blocking stdlib context even when imported from gevent.ssl
+    """
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.minimum_version = ssl.TLSVersion.TLSv1_2
+    if cafile is None:
+        ctx.load_default_certs()
+    else:
+        ctx.load_verify_locations(cafile)
+    return ctx
+
+
+def default_ssl_context() -> ssl.SSLContext:
+    """SSLContext shared by requests made without a client.
+
+    Created once on first use, so CA store is loaded only once
+    """
+    global _default_context
+    if _default_context is None:
+        _default_context = create_ssl_context()
+    return _default_context
+
+
+class TLSSessionCache:
+    """Remembers TLS sessions of servers,
+    so that new connections to them can resume the session
+    with abbreviated handshake.
+
+    maxsize - how many servers to remember, least recently
+    used are forgotten first
+    """
+
+    __slots__ = (
+        'maxsize',
+        '_sessions',
+        'offered',
+        'reused'
+    )
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._sessions: Dict[ConnectionKey, ssl.SSLSession] = OrderedDict()
+        self.offered = 0
+        self.reused = 0
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.stats})'
+
+    def __len__(self):
+        return len(self._sessions)
+
+    @property
+    def stats(self) -> tls_stats:
+        return tls_stats(self.offered, self.reused, len(self))
+
+    def get(self, key: ConnectionKey) -> Optional[ssl.SSLSession]:
+        """Session to offer when connecting to server
+        """
+        session = self._sessions.get(key)
+        if session is not None:
+            self._sessions.move_to_end(key)
+            self.offered += 1
+        return session
+
+    def store(self, key: ConnectionKey, sock: ssl.SSLSocket):
+        """Remember session of connected socket
+        """
+        if sock.session_reused:
+            self.reused += 1
+        session = sock.session
+        if session is None:
+            return
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.maxsize:
+            self._sessions.popitem(last=False)
+
+    def clear(self):
+        self._sessions.clear()
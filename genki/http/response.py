@@ -1,84 +1,279 @@
-from typing import Optional, Union
+from typing import Optional, Union, Iterator, Generator, Callable
 from contextlib import suppress
 
-from chardet import detect
-from chardet.universaldetector import UniversalDetector
-
 from .headers import Headers
 from .constants import StatusCode
 from .request import RequestBuilder
+from .encoding import ContentDecoder
+from .charset import normalize, sniff_bom, detect_charset
 
 
 class Response:
-    """Class represents reponse from server
+    """Class represents reponse from server.
+
+    Whole response is kept in a single buffer, body is exposed
+    as a memoryview slice of it and headers are only parsed
+    when they are accessed.
+
+    attempts - how many times request was sent to get this response.\n
+    timings - Timings of request phases, None for responses
+    that were not received by HTTPSession
     """
 
     __slots__ = (
         'status_code',
+        'http_version',
         'request',
-        'raw_bytes',
-        'headers',
-        '_body'
+        'attempts',
+        'timings',
+        '_buffer',
+        '_head_end',
+        '_body_start',
+        '_headers',
+        '_stream',
+        '_on_close',
+        '_consumed',
+        '_content',
+        '_decoder',
+        '_text'
     )
 
     def __init__(self,
                  request: RequestBuilder,
-                 raw_bytes: bytes,
-                 headers: Optional[Headers] = None):
+                 raw_bytes: Union[bytes, bytearray],
+                 headers: Optional[Headers] = None,
+                 stream: Optional[Generator[bytes, None, None]] = None,
+                 body_start: Optional[int] = None,
+                 on_close: Optional[Callable[[], None]] = None,
+                 content: Optional[bytes] = None,
+                 decoder: Optional[ContentDecoder] = None):
+        """raw_bytes - response as received from server,
+        or only its head if body is streamed.\n
+        headers - already parsed headers, by default
+        they are parsed from raw_bytes on first access.\n
+        stream - generator of body pieces, that are yet to be received.\n
+        body_start - offset of body in raw_bytes, if known.\n
+        on_close - called when streamed response is closed
+        before its body was read.\n
+        content - body with Content-Encoding already decoded.\n
+        decoder - decoder for Content-Encoding of the body,
+        if content was not decoded yet
+        """
         self.request = request
-        self.raw_bytes = raw_bytes
-
-        headers_bytes, self._body = raw_bytes.split(b'\r\n\r\n', maxsplit=1)
-        self.status_code = \
-            StatusCode(
-                int(headers_bytes[
-                    :headers_bytes.find(b'\r\n')
-                    ].split(b' ', maxsplit=2)[1].decode())
-                )
-        if headers is None:
-            self.headers = Headers.from_bytes(headers_bytes)
+        self.attempts = 1
+        self.timings = None
+        self._stream = stream
+        self._on_close = on_close
+        self._consumed = False
+        self._content = content
+        self._decoder = decoder
+        self._headers = headers
+        self._text: Optional[str] = None
+
+        if body_start is None:
+            head_end = raw_bytes.find(b'\r\n\r\n')
+            if head_end == -1:
+                head_end = len(raw_bytes)
+            body_start = min(head_end + 4, len(raw_bytes))
         else:
-            self.headers = headers
+            head_end = body_start - 4
+        self._buffer = raw_bytes
+        self._head_end = head_end
+        self._body_start = body_start
+
+        status_end = raw_bytes.find(b'\r\n', 0, head_end)
+        if status_end == -1:
+            status_end = head_end
+        version, status, *_ = bytes(
+            raw_bytes[:status_end]
+            ).split(b' ', maxsplit=2)
+        self.http_version = version.decode()[len('HTTP/'):]
+        self.status_code = StatusCode(int(status))
+
+    @property
+    def headers(self) -> Headers:
+        """Response headers, parsed on first access
+        """
+        if self._headers is None:
+            self._headers = Headers.from_bytes(
+                bytes(self._buffer[:self._head_end])
+                )
+        return self._headers
 
     def __repr__(self):
         return f'{self.__class__.__name__}({self.status_code})'
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    @property
+    def is_streaming(self) -> bool:
+        """True if body is still being received from server
+        """
+        return self._stream is not None
+
+    def close(self):
+        """Stop receiving streamed body and release connection
+        """
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+            if self._on_close is not None:
+                # Generator that was never started
+                # does not run its cleanup on close
+                self._on_close()
+
+    def _decode_stream(self,
+                       stream: Iterator[bytes]
+                       ) -> Iterator[bytes]:
+        """Decode Content-Encoding of body pieces as they arrive
+        """
+        decoder = self._decoder
+        for piece in stream:
+            piece = decoder.decompress(piece)
+            if piece:
+                yield piece
+        piece = decoder.flush()
+        if piece:
+            yield piece
+
+    def iter_content(self,
+                     chunk_size: Optional[int] = None,
+                     decode_content: bool = True
+                     ) -> Iterator[bytes]:
+        """Iterate over body in pieces of chunk_size bytes.
+
+        Streamed body is read from server on demand and
+        is not stored, so it can only be iterated over once.
+        If chunk_size is None, pieces are yielded as they arrive.
+        If decode_content is False, body is yielded
+        as it was received, without decoding Content-Encoding.
+        """
+        if self._stream is None:
+            if self._consumed:
+                raise RuntimeError('Response body was already consumed')
+            body = self.content if decode_content else self.raw_body
+            step = chunk_size or len(body) or 1
+            for i in range(0, len(body), step):
+                yield body[i:i + step]
+            return
+
+        self._consumed = True
+        stream, self._stream = self._stream, None
+        pieces = stream
+        if decode_content and self._decoder is not None:
+            pieces = self._decode_stream(stream)
+        try:
+            if chunk_size is None:
+                yield from pieces
+                return
+
+            buffer = bytearray()
+            for piece in pieces:
+                buffer += piece
+                while len(buffer) >= chunk_size:
+                    yield bytes(buffer[:chunk_size])
+                    del buffer[:chunk_size]
+            if buffer:
+                yield bytes(buffer)
+        finally:
+            stream.close()
+
+    def iter_lines(self,
+                   chunk_size: Optional[int] = None
+                   ) -> Iterator[bytes]:
+        """Iterate over body line by line,
+        line endings are not included
+        """
+        pending = b''
+        for chunk in self.iter_content(chunk_size):
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line[:-1] if line.endswith(b'\r') else line
+        if pending:
+            yield pending
+
+    def _read_stream(self):
+        """Receive the rest of streamed body into response buffer
+        """
+        buffer = bytearray(self._buffer[:self._body_start])
+        for piece in self.iter_content(decode_content=False):
+            buffer += piece
+        self._buffer = buffer
+        self._consumed = False
+
+    @property
+    def raw_bytes(self) -> Union[bytes, bytearray]:
+        """Returns response as recieved from server
+        """
+        if self._stream is not None:
+            self._read_stream()
+        return self._buffer
+
     @property
-    def raw_body(self) -> bytes:
-        """Returns raw bytes of HTTP body as recieved from server
+    def raw_body(self) -> memoryview:
+        """Returns raw bytes of HTTP body as recieved from server,
+        as a view of response buffer without copying
         """
-        return self._body
+        if self._stream is not None:
+            self._read_stream()
+        elif self._consumed:
+            raise RuntimeError('Response body was already consumed')
+        return memoryview(self._buffer)[self._body_start:]
 
     @property
-    def body(self) -> Union[bytes, str]:
-        """Retruns HTTP body, decoded when possibe
+    def content(self) -> Union[bytes, memoryview]:
+        """Returns HTTP body with Content-Encoding decoded.
+
+        raw_body keeps body as it was sent by server,
+        e.g. still gzip compressed
         """
-        if self.content_type.startswith('text/'):
-            charset = self.charset
-            if charset is not None:
-                with suppress(ValueError):
-                    if charset:
-                        return self._body.decode(charset)
-                    else:
-                        return self._body.decode('utf-8')
+        if self._content is None:
+            body = self.raw_body
+            decoder, self._decoder = self._decoder, None
+            if decoder is None:
+                self._content = body
             else:
-                # detect small content
-                if len(self._body) < 1024 * 10:
-                    chardet_result = detect(self._body)
-                    if round(chardet_result['confidence']):
-                        return self._body.decode(chardet_result['encoding'])
-                else:
-                    # detect large content
-                    detector = UniversalDetector()
-                    for i in range(0, len(self._body), 1024):
-                        detector.feed(self._body[i:i+1024])
-                        if detector.done:
-                            break
-
-                    chardet_result = detector.close()
-                    if round(chardet_result['confidence']):
-                        return self._body.decode(chardet_result['encoding'])
-        return self._body
+                self._content = decoder.decompress(body) + decoder.flush()
+        return self._content
+
+    @property
+    def body(self) -> Union[bytes, memoryview, str]:
+        """Retruns HTTP body, decoded when possibe.
+
+        Text is decoded with charset from byte order mark,
+        Content-Type header, <meta charset> of html or,
+        if none of them is present, detected from a sample of body.
+        Decoded text is computed once and then reused,
+        body that is not text is returned as content, without copying
+        """
+        if self._text is not None:
+            return self._text
+        body = self._decode_text()
+        if isinstance(body, str):
+            self._text = body
+        return body
+
+    def _decode_text(self) -> Union[bytes, memoryview, str]:
+        body = self.content
+        if not self.content_type.startswith('text/'):
+            return body
+
+        # Byte order mark takes precedence over Content-Type
+        encoding = sniff_bom(body) or normalize(self.charset)
+        if encoding is not None:
+            with suppress(ValueError):
+                return str(body, encoding)
+
+        encoding = detect_charset(body, self.is_html)
+        if encoding is not None:
+            with suppress(ValueError):
+                return str(body, encoding)
+        return body
 
     @property
     def content_type(self) -> str:
@@ -98,10 +293,8 @@ class Response:
         from Content-Type header and returns it.
         If no charset found in headers, returns None
         """
-        content_type = self.content_type
-        if content_type is None:
-            return None
-        if ';' not in content_type:
-            return None
-        *_, charset = content_type.split(';')
-        return charset.split('=')[-1].lower()
+        for param in self.content_type.split(';')[1:]:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'charset':
+                return value.strip().strip('"\'').lower()
+        return None
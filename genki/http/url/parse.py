@@ -1,4 +1,6 @@
 from collections import namedtuple
+from functools import lru_cache
+import re
 
 from ..constants import Scheme
 from .exceptions import InvalidURL
@@ -15,89 +17,85 @@ default_ports = {
     Scheme.HTTPS: 443
 }
 
+# How many distinct urls to keep parse results for
+CACHE_SIZE = 4096
 
-def parse_url(url: str) -> url_parse_result:
-    """Parses given url, returns namedtuple of
-    (scheme, host, path, port, username, password)
-    """
-    url = str(url).strip()
-
-    # Parse scheme
-    scheme: Scheme = Scheme.HTTP
-    if '://' in url:
-        s = url.split('://', maxsplit=1)
-        scheme = Scheme(s[0].lower())
-        host = s[1]
-    else:
-        host = url
+_schemes = {scheme.value: scheme for scheme in Scheme}
 
-    # Assume port based on scheme
-    port = default_ports[scheme]
 
-    if not host:
-        raise InvalidURL(url)
+# Splits url into its parts in one pass:
+# scheme://userinfo@host:port/path?query#fragment
+_url_pattern = re.compile(
+    r'(?:([^:/?#@]+)://)?'
+    r'(?:([^/?#]*)@)?'
+    r'([^/?#]*)'
+    r'([^?#]*)'
+    r'(?:\?([^#]*))?'
+    r'(?:#(.*))?',
+    re.DOTALL
+)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(url: str) -> url_parse_result:
+    url = url.strip()
+    name, userinfo, host, path, query, fragment = \
+        _url_pattern.fullmatch(url).groups()
+
+    scheme = Scheme.HTTP
+    if name is not None:
+        name = name.lower()
+        scheme = _schemes.get(name) or Scheme(name)
 
     # Parse username and password
     username, password = '', ''
-    if '@' in host:
-        at_pos = host.find('@')
-        user_info = host[:at_pos]
-        host = host[at_pos + 1:]
-        if ':' not in user_info:
-            username = user_info
-            password = ''
-        else:
-            username, password = user_info.split(':')
+    if userinfo is not None:
+        username, _, password = userinfo.partition(':')
         if not username:
             raise InvalidURL(url)
 
-    if password and not username:
-        raise InvalidURL(url)
-
-    # Parse path
-    if '/' not in host:
-        path = '/'
-    else:
-        host, path = host.split('/', maxsplit=1)
-        path = '/' + path
-
-    query = ''
-    if '?' in path:
-        query = path[path.find('?') + 1:]
-        path = path[:path.find('?')]
-
-    if not host:
-        raise InvalidURL(url)
-
     # Parse port
-    if '[' in host and (closing := host.find(']')) != -1:
+    port = default_ports[scheme]
+    if host.startswith('['):
+        closing = host.find(']')
+        if closing == -1:
+            raise InvalidURL(url)
         if closing != len(host) - 1:
-            if host[closing + 1] == ':':
-                port = int(host[closing + 2:])
-                host = host[:closing + 1]
-    elif ':' in host:
-        host, port_str = host.split(':', maxsplit=1)
-        if not all([host, port_str]):
+            if host[closing + 1] != ':':
+                raise InvalidURL(url)
+            port = int(host[closing + 2:])
+            host = host[:closing + 1]
+    else:
+        host, colon, port_str = host.partition(':')
+        if colon and not all([host, port_str]):
             raise InvalidURL(url)
-        port = int(port_str)
+        if port_str:
+            port = int(port_str)
 
-    fragment = ''
-    if query:
-        if (fragment_idx := query.find('#')) != -1:
-            fragment = query[fragment_idx + 1:]
-            query = query[:fragment_idx]
-    else:
-        if (fragment_idx := path.find('#')) != -1:
-            fragment = path[fragment_idx + 1:]
-            path = path[:fragment_idx]
+    if not host:
+        raise InvalidURL(url)
 
     return url_parse_result(
         scheme,
         host,
-        path,
+        path or '/',
         port,
         username,
         password,
-        query,
-        fragment
+        query or '',
+        fragment or ''
         )
+
+
+def parse_url(url: str) -> url_parse_result:
+    """Parses given url, returns namedtuple of
+    (scheme, host, path, port, username, password, query, fragment).
+
+    Results are immutable and kept in LRU cache of CACHE_SIZE
+    entries, so same url is parsed only once
+    """
+    return _parse(url if type(url) is str else str(url))
+
+
+parse_url.cache_info = _parse.cache_info
+parse_url.cache_clear = _parse.cache_clear
@@ -1,23 +1,45 @@
 from typing import AnyStr, Union
-from copy import copy
+from functools import lru_cache
 
 from ..constants import Scheme
-from .parse import parse_url
+from .parse import parse_url, url_parse_result, default_ports, CACHE_SIZE
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def build_url(parts: url_parse_result) -> str:
+    """Url string of parse result
+    """
+    scheme, host, path, port, username, password, query, fragment = parts
+    if username:
+        userinfo_str = username
+        if password:
+            userinfo_str += f':{password}'
+        userinfo_str += '@'
+    else:
+        userinfo_str = ''
+
+    if default_ports.get(scheme) == port:
+        port_str = ''
+    else:
+        port_str = f':{port}'
+
+    url = f'{scheme.value}://{userinfo_str}{host}{port_str}{path}'
+    if query:
+        url += f'?{query}'
+    if fragment:
+        url += f'#{fragment}'
+    return url
 
 
 class URL:
+    """Parts of URL are kept in immutable parse result, shared
+    with parse cache and copies, setters replace it with new one.
+    String is rebuilt only when it is read after a change
+    """
 
     __slots__ = (
-        '_string',
-        '_scheme',
-        '_host',
-        '_path',
-        '_port',
-        '_query',
-        '_username',
-        '_password',
-        '_fragment',
-        '_dirty'
+        '_parts',
+        '_string'
     )
 
     def __init__(self, url: str):
@@ -37,138 +59,100 @@ class URL:
 
     @property
     def string(self) -> str:
-        if self._dirty:
+        if self._string is None:
             self.update()
         return self._string
 
     @property
-    def scheme(self):
-        return self._scheme
+    def scheme(self) -> Scheme:
+        return self._parts.scheme
 
     @property
-    def host(self):
-        return self._host
+    def host(self) -> str:
+        return self._parts.host
 
     @property
-    def path(self):
-        return self._path
+    def path(self) -> str:
+        return self._parts.path
 
     @property
-    def port(self):
-        return self._port
+    def port(self) -> int:
+        return self._parts.port
 
     @property
-    def query(self):
-        return self._query
+    def query(self) -> str:
+        return self._parts.query
 
     @property
-    def username(self):
-        return self._username
+    def username(self) -> str:
+        return self._parts.username
 
     @property
-    def password(self):
-        return self._password
+    def password(self) -> str:
+        return self._parts.password
 
     @property
-    def fragment(self):
-        return self._fragment
+    def fragment(self) -> str:
+        return self._parts.fragment
 
     @string.setter
     def string(self, value: AnyStr):
         if isinstance(value, bytes):
             value = value.decode()
-
-        parse_result = parse_url(value)
-        self._scheme = parse_result.scheme
-        self._host = parse_result.host
-        self._path = parse_result.path
-        self._port = parse_result.port
-        self._query = parse_result.query
-        self._username = parse_result.username
-        self._password = parse_result.password
-        self._fragment = parse_result.fragment
-        self.update()
+        self._parts = parse_url(value)
+        self._string = None
 
     @scheme.setter
     def scheme(self, value):
-        if self._scheme != value:
-            self._dirty = True
-        self._scheme = Scheme(value.lower())
+        self._replace(scheme=Scheme(value.lower()))
 
     @host.setter
     def host(self, value):
-        if self._host != value:
-            self._dirty = True
-        self._host = value
+        self._replace(host=value)
 
     @path.setter
     def path(self, value):
         if not value.startswith('/'):
             value = f'/{value}'
-        if self._path != value:
-            self._dirty = True
-        self._path = value
+        self._replace(path=value)
 
     @port.setter
     def port(self, value):
-        if self._port != value:
-            self._dirty = True
-        self._port = int(value)
+        self._replace(port=int(value))
 
     @query.setter
     def query(self, value):
-        if self._query != value:
-            self._dirty = True
-        self._query = value
+        self._replace(query=value)
 
     @username.setter
     def username(self, value):
-        if self._username != value:
-            self._dirty = True
-        self._username = value
+        self._replace(username=value)
 
     @password.setter
     def password(self, value):
-        if self._password != value:
-            self._dirty = True
-        self._password = value
+        self._replace(password=value)
 
     @fragment.setter
     def fragment(self, value):
-        if self._fragment != value:
-            self._dirty = True
-        self._fragment = value
+        self._replace(fragment=value)
+
+    def _replace(self, **parts):
+        """Copy on write, parse result may be shared
+        """
+        parts = self._parts._replace(**parts)
+        if parts != self._parts:
+            self._parts = parts
+            self._string = None
 
     def update(self):
         """Rebuilds url string
         """
-        url = ''
-        if self.username:
-            userinfo_str = self.username
-            if self.password:
-                userinfo_str += f':{self.password}'
-            userinfo_str += '@'
-        else:
-            userinfo_str = ''
-
-        if any([
-                self.port == 443 and self.scheme == 'https',
-                self.port == 80 and self.scheme == 'http'
-                ]):
-            port_str = ''
-        else:
-            port_str = f':{self.port}'
-
-        url = f'{self.scheme}://{userinfo_str}{self.host}{port_str}' +\
-            f'{self.path}'
-
-        if self.query:
-            url += f'?{self.query}'
-        if self.fragment:
-            url += f'#{self.fragment}'
-
-        self._string = url
-        self._dirty = False
-
-    def copy(self):
-        return copy(self)
+        self._string = build_url(self._parts)
+
+    def copy(self) -> 'URL':
+        """Copy sharing parse result with this URL
+        """
+        url = URL.__new__(URL)
+        url._parts = self._parts
+        url._string = self._string
+        return url
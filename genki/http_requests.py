@@ -1,12 +1,17 @@
-from typing import Union, Optional, Tuple, Mapping
+from typing import Union, Optional, Tuple, Mapping, Iterator
 from json import dumps
 from logging import getLogger
 from functools import wraps
 
-from gevent import spawn
+from gevent import Greenlet, ssl
 
 from .async_request import AsyncRequest
+from .limiter import ConcurrencyLimiter, RateLimiter
 from .http import Headers, Method, HTTPSession, RequestBuilder
+from .http.request import (
+    ConnectionPool, Resolver, TLSSessionCache, Pipeline, HTTP2Transport,
+    RequestBody, RedirectCache, ResponseCache, Retry, Timeout, Hooks
+)
 
 logger = getLogger('genki')
 
@@ -14,14 +19,15 @@ logger = getLogger('genki')
 def prepare_data(data) -> Tuple[Optional[Union[str, bytes]], bool]:
     """Jsonify data when possible
 
+    Files, iterators and RequestBody objects are streamed as is.
     returns new_data and boolean result of successfull encoding
     """
     if data is None:
         return None, False
     success = False
-    if not (isinstance(data, bytes) or
-            isinstance(data, bytearray) or
-            isinstance(data, str)):
+    if not (isinstance(data, (bytes, bytearray, memoryview, str,
+                              Iterator, RequestBody)) or
+            hasattr(data, 'read')):
         try:
             data = dumps(data)
             success = True
@@ -35,6 +41,97 @@ def prepare_data(data) -> Tuple[Optional[Union[str, bytes]], bool]:
     return data, success
 
 
+def request(method: Method,
+            url,
+            data=None,
+            params=None,
+            headers: Union[Headers, Mapping] = Headers(),
+            timeout: Union[float, Timeout, None] = None,
+            follow_redirects: bool = True,
+            redirects_limit: int = 5,
+            stream: bool = False,
+            pool: Optional[ConnectionPool] = None,
+            limiter: Optional[ConcurrencyLimiter] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+            hooks: Optional[Hooks] = None,
+            resolver: Optional[Resolver] = None,
+            ssl_context: Optional[ssl.SSLContext] = None,
+            tls_sessions: Optional[TLSSessionCache] = None,
+            pipeline: Optional[Pipeline] = None,
+            http2: Optional[HTTP2Transport] = None,
+            redirects: Optional[RedirectCache] = None,
+            cache: Optional[ResponseCache] = None,
+            retry: Optional[Retry] = None,
+            decode_content: bool = True,
+            max_decompressed_size: Optional[int] = 100 * 1024 * 1024
+            ) -> AsyncRequest:
+    """Perform HTTP request with given method
+
+    timeout - seconds every socket operation may take or Timeout
+    with separate connect, TLS, read and total request limits.\n
+    stream - do not wait for body, read it with Response.iter_content().\n
+    pool - connection pool to reuse connections from,
+    by default new connection is opened for every request.\n
+    limiter - concurrency limiter to queue request in,
+    by default request starts immediately.\n
+    rate_limiter - limiter delaying request till it may be sent.\n
+    hooks - callbacks to call as request progresses.\n
+    resolver - resolver to cache hostname lookups in.\n
+    ssl_context - context for HTTPS connections.\n
+    tls_sessions - cache of TLS sessions to resume.\n
+    pipeline - pipeline to send idempotent requests through.\n
+    http2 - transport to use HTTP/2 with servers that support it.\n
+    redirects - cache of permanent redirects to remember and follow.\n
+    cache - HTTP cache to answer request from and store response in.\n
+    retry - policy of repeating request if it fails,
+    number of attempts made is kept in Response.attempts.\n
+    decode_content - ask for compressed body and decompress it,
+    compressed bytes remain available as Response.raw_body.\n
+    max_decompressed_size - limit of decompressed body size in bytes
+    """
+    data, is_json = prepare_data(data)
+
+    builder = RequestBuilder(
+                url=url,
+                headers=headers,
+                body=data,
+                method=method)
+
+    if is_json:
+        builder.headers.setdefault(
+            'Content-Type',
+            'application/json; charset=UTF-8'
+        )
+
+    session = HTTPSession(
+        builder,
+        timeout=timeout,
+        follow_redirects=follow_redirects,
+        redirects_limit=redirects_limit,
+        stream=stream,
+        pool=pool,
+        resolver=resolver,
+        ssl_context=ssl_context,
+        tls_sessions=tls_sessions,
+        pipeline=pipeline,
+        http2=http2,
+        redirects=redirects,
+        cache=cache,
+        retry=retry,
+        rate_limiter=rate_limiter,
+        hooks=hooks,
+        decode_content=decode_content,
+        max_decompressed_size=max_decompressed_size
+    )
+    greenlet = Greenlet(session.perform)
+    if limiter is None:
+        greenlet.start()
+    else:
+        url = builder.url
+        limiter.submit((url.scheme, url.host, url.port), greenlet)
+    return AsyncRequest(greenlet)
+
+
 def request_method(method: Method):
     def decorator(func):
         @wraps(func)
@@ -42,35 +139,24 @@ def request_method(method: Method):
                     data=None,
                     params=None,
                     headers: Union[Headers, Mapping] = Headers(),
-                    timeout: Optional[float] = None,
+                    timeout: Union[float, Timeout, None] = None,
                     follow_redirects: bool = True,
-                    redirects_limit: int = 5
+                    redirects_limit: int = 5,
+                    stream: bool = False
                     ):
             """A generic http request function reused for every method
             """
-            data, is_json = prepare_data(data)
-
-            builder = RequestBuilder(
-                        url=url,
-                        headers=headers,
-                        body=data,
-                        method=method)
-
-            if is_json:
-                builder.headers.setdefault(
-                    'Content-Type',
-                    'application/json; charset=UTF-8'
-                )
-
-            session = HTTPSession(
-                builder,
+            return request(
+                method,
+                url=url,
+                data=data,
+                params=params,
+                headers=headers,
                 timeout=timeout,
                 follow_redirects=follow_redirects,
-                redirects_limit=redirects_limit
+                redirects_limit=redirects_limit,
+                stream=stream
             )
-            return AsyncRequest(
-                spawn(session.perform)
-                )
         return wrapper
     return decorator
 
@@ -80,9 +166,10 @@ def get(url,
         data=None,
         params=None,
         headers: Union[Headers, Mapping] = Headers(),
-        timeout: Optional[float] = None,
+        timeout: Union[float, Timeout, None] = None,
         follow_redirects: bool = True,
-        redirects_limit: int = 5
+        redirects_limit: int = 5,
+        stream: bool = False
         ) -> AsyncRequest:
     pass
 
@@ -92,9 +179,10 @@ def post(url,
          data=None,
          params=None,
          headers: Union[Headers, Mapping] = Headers(),
-         timeout: Optional[float] = None,
+         timeout: Union[float, Timeout, None] = None,
          follow_redirects: bool = True,
-         redirects_limit: int = 5
+         redirects_limit: int = 5,
+         stream: bool = False
          ) -> AsyncRequest:
     pass
 
@@ -104,9 +192,10 @@ def patch(url,
           data=None,
           params=None,
           headers: Union[Headers, Mapping] = Headers(),
-          timeout: Optional[float] = None,
+          timeout: Union[float, Timeout, None] = None,
           follow_redirects: bool = True,
-          redirects_limit: int = 5
+          redirects_limit: int = 5,
+          stream: bool = False
           ) -> AsyncRequest:
     pass
 
@@ -116,9 +205,10 @@ def put(url,
         data=None,
         params=None,
         headers: Union[Headers, Mapping] = Headers(),
-        timeout: Optional[float] = None,
+        timeout: Union[float, Timeout, None] = None,
         follow_redirects: bool = True,
-        redirects_limit: int = 5
+        redirects_limit: int = 5,
+        stream: bool = False
         ) -> AsyncRequest:
     pass
 
@@ -128,8 +218,9 @@ def delete(url,
            data=None,
            params=None,
            headers: Union[Headers, Mapping] = Headers(),
-           timeout: Optional[float] = None,
+           timeout: Union[float, Timeout, None] = None,
            follow_redirects: bool = True,
-           redirects_limit: int = 5
+           redirects_limit: int = 5,
+           stream: bool = False
            ) -> AsyncRequest:
     pass
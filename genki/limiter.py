@@ -0,0 +1,331 @@
+from typing import Optional, Dict, Deque, Hashable, Set, Mapping, Tuple
+from collections import OrderedDict, deque, namedtuple
+from fnmatch import fnmatchcase
+from time import monotonic
+
+from gevent import Greenlet, sleep, socket
+
+
+limiter_stats = namedtuple('LimiterStats', ['in_flight', 'queued'])
+rate_limiter_stats = namedtuple(
+    'RateLimiterStats',
+    ['queued', 'delayed', 'wait_time', 'max_wait']
+    )
+# Requests per second and how many may be sent at once after idling
+RateLimit = Tuple[float, int]
+
+
+class ConcurrencyLimiter:
+    """Starts greenlets so that no more than max_concurrency
+    of them run at once and no more than max_per_host
+    run for the same host. Greenlets over the limit
+    wait in queue and are started as others finish.
+
+    Hosts take turns, so one busy host does not
+    hold back requests to the others.
+    None means no limit.
+    """
+
+    __slots__ = (
+        'max_concurrency',
+        'max_per_host',
+        'in_flight',
+        'queued',
+        '_running',
+        '_waiting',
+        '_started',
+        '_ready',
+        '_ready_set'
+    )
+
+    def __init__(self,
+                 max_concurrency: Optional[int] = None,
+                 max_per_host: Optional[int] = None):
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+
+        self.in_flight = 0
+        self.queued = 0
+        self._running: Dict[Hashable, int] = dict()
+        self._waiting: Dict[Hashable, Deque[Greenlet]] = dict()
+        # Greenlets started by limiter that are still running
+        self._started: Set[Greenlet] = set()
+        # Hosts that have queued greenlets and are below per host limit
+        self._ready: Deque[Hashable] = deque()
+        self._ready_set: Set[Hashable] = set()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.stats})'
+
+    @property
+    def stats(self) -> limiter_stats:
+        return limiter_stats(self.in_flight, self.queued)
+
+    def in_flight_for(self, host: Hashable) -> int:
+        """Number of running greenlets for host
+        """
+        return self._running.get(host, 0)
+
+    def queued_for(self, host: Hashable) -> int:
+        """Number of greenlets waiting to be started for host
+        """
+        return len(self._waiting.get(host, ()))
+
+    def _host_is_free(self, host: Hashable) -> bool:
+        return self.max_per_host is None or \
+            self._running.get(host, 0) < self.max_per_host
+
+    def _mark_ready(self, host: Hashable):
+        if host not in self._ready_set and self._waiting.get(host) \
+                and self._host_is_free(host):
+            self._ready.append(host)
+            self._ready_set.add(host)
+
+    def submit(self, host: Hashable, greenlet: Greenlet) -> Greenlet:
+        """Start greenlet now or once limits allow it,
+        greenlet killed while waiting is never started
+        """
+        greenlet.link(lambda _: self._on_finished(host, greenlet))
+        self._waiting.setdefault(host, deque()).append(greenlet)
+        self.queued += 1
+        self._mark_ready(host)
+        self._dispatch()
+        return greenlet
+
+    def _dispatch(self):
+        while self._ready and (
+                self.max_concurrency is None
+                or self.in_flight < self.max_concurrency):
+            host = self._ready.popleft()
+            self._ready_set.discard(host)
+
+            waiting = self._waiting[host]
+            greenlet = waiting.popleft()
+            if not waiting:
+                del self._waiting[host]
+            self.queued -= 1
+            if not greenlet.dead:
+                self.in_flight += 1
+                self._running[host] = self._running.get(host, 0) + 1
+                self._started.add(greenlet)
+                greenlet.start()
+
+            self._mark_ready(host)
+
+    def _on_finished(self, host: Hashable, greenlet: Greenlet):
+        if greenlet in self._started:
+            self._started.discard(greenlet)
+            self._on_done(host)
+            return
+        # Killed before it was started
+        waiting = self._waiting.get(host)
+        if waiting and greenlet in waiting:
+            waiting.remove(greenlet)
+            self.queued -= 1
+            if not waiting:
+                del self._waiting[host]
+
+    def _on_done(self, host: Hashable):
+        self.in_flight -= 1
+        running = self._running[host] - 1
+        if running:
+            self._running[host] = running
+        else:
+            del self._running[host]
+        self._mark_ready(host)
+        self._dispatch()
+
+
+class TokenBucket:
+    """Bucket of up to burst tokens refilled at rate tokens per second,
+    every request takes one token
+    """
+
+    __slots__ = (
+        'rate',
+        'burst',
+        'tokens',
+        'updated',
+        'waiting'
+    )
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = monotonic()
+        self.waiting = 0
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(rate={self.rate}, ' \
+            f'burst={self.burst}, tokens={self.tokens:.2f})'
+
+    def reserve(self) -> float:
+        """Take a token, returns seconds till it is available.
+
+        Tokens are taken in advance, so requests waiting
+        for them are sent in order they came in
+        """
+        now = monotonic()
+        self.tokens = min(
+            self.burst,
+            self.tokens + (now - self.updated) * self.rate
+            )
+        self.updated = now
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def refund(self):
+        """Return token that was not used
+        """
+        self.tokens += 1
+
+    @property
+    def is_idle(self) -> bool:
+        """True if bucket is full and nobody waits for it,
+        so it is no different from a new one
+        """
+        return not self.waiting and self.tokens + \
+            (monotonic() - self.updated) * self.rate >= self.burst
+
+
+class RateLimiter:
+    """Delays requests so that they are sent to hosts
+    no faster than allowed, instead of being sent and rejected.
+
+    limits - mapping of host or glob pattern like "*.example.com"
+    to (requests per second, burst). Hosts matching a pattern
+    share its limit, first matching pattern applies.\n
+    default - (requests per second, burst) for every other host,
+    each host is limited separately. If None they are not limited.\n
+    max_hosts - how many hosts to remember patterns they matched for,
+    and how many buckets of default limit to keep before
+    idle ones are dropped
+    """
+
+    __slots__ = (
+        'limits',
+        'default',
+        'max_hosts',
+        'queued',
+        'delayed',
+        'wait_time',
+        'max_wait',
+        '_buckets',
+        '_hosts',
+        '_default_buckets',
+        '_prune_at'
+    )
+
+    def __init__(self,
+                 limits: Optional[Mapping[str, RateLimit]] = None,
+                 default: Optional[RateLimit] = None,
+                 max_hosts: int = 1024):
+        self.limits = dict(limits or {})
+        self.default = default
+        self.max_hosts = max_hosts
+
+        self.queued = 0
+        self.delayed = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self._buckets: Dict[str, TokenBucket] = {
+            pattern: TokenBucket(*limit)
+            for pattern, limit in self.limits.items()
+        }
+        # Pattern bucket each host was matched to, least recently
+        # used first, None if host matches no pattern
+        self._hosts: Dict[str, Optional[TokenBucket]] = OrderedDict()
+        # Buckets of default limit
+        self._default_buckets: Dict[str, TokenBucket] = dict()
+        self._prune_at = max_hosts
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.stats})'
+
+    @property
+    def stats(self) -> rate_limiter_stats:
+        """Requests waiting now, requests that had to wait,
+        total and longest wait in seconds
+        """
+        return rate_limiter_stats(
+            self.queued,
+            self.delayed,
+            self.wait_time,
+            self.max_wait
+        )
+
+    def queued_for(self, host: str) -> int:
+        """Number of requests to host waiting for their turn
+        """
+        bucket = self.bucket(host)
+        return bucket.waiting if bucket is not None else 0
+
+    def bucket(self, host: str) -> Optional[TokenBucket]:
+        """Bucket limiting requests to host, None if there is no limit
+        """
+        try:
+            bucket = self._hosts[host]
+            self._hosts.move_to_end(host)
+        except KeyError:
+            bucket = self._match(host)
+            self._hosts[host] = bucket
+            if len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+        if bucket is not None or self.default is None:
+            return bucket
+
+        bucket = self._default_buckets.get(host)
+        if bucket is None:
+            if len(self._default_buckets) >= self._prune_at:
+                self._prune()
+            bucket = self._default_buckets[host] = \
+                TokenBucket(*self.default)
+        return bucket
+
+    def _match(self, host: str) -> Optional[TokenBucket]:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            for pattern, pattern_bucket in self._buckets.items():
+                if fnmatchcase(host, pattern):
+                    return pattern_bucket
+        return bucket
+
+    def _prune(self):
+        """Drop idle buckets of default limit
+        """
+        self._default_buckets = {
+            host: bucket
+            for host, bucket in self._default_buckets.items()
+            if not bucket.is_idle
+        }
+        # Buckets still in use are not scanned again on every new host
+        self._prune_at = max(
+            self.max_hosts, 2 * len(self._default_buckets))
+
+    def acquire(self, host: str, timeout: Optional[float] = None):
+        """Wait till request to host may be sent.
+
+        Raises socket.timeout without waiting if it would
+        take longer than timeout seconds
+        """
+        bucket = self.bucket(host)
+        if bucket is None:
+            return
+        delay = bucket.reserve()
+        if not delay:
+            return
+        if timeout is not None and delay > timeout:
+            bucket.refund()
+            raise socket.timeout(f'Rate limit of {host} would delay '
+                                 f'request for {delay:.2f}s')
+        self.delayed += 1
+        self.wait_time += delay
+        self.max_wait = max(self.max_wait, delay)
+        bucket.waiting += 1
+        self.queued += 1
+        try:
+            sleep(delay)
+        finally:
+            bucket.waiting -= 1
+            self.queued -= 1
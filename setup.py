@@ -21,6 +21,12 @@ requires = [
     'chardet==3.0.4'
 ]
 
+extras = {
+    'http2': ['h2>=4.0.0'],
+    'brotli': ['brotli>=1.0.0'],
+    'zstd': ['zstandard>=0.15.0']
+}
+
 setuptools.setup(
     name='genki',
     version='0.0.1',
@@ -30,6 +36,7 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type='text/markdown',
     install_requires=requires,
+    extras_require=extras,
     url='https://github.com/cmd410/genki',
     packages=packages,
     classifiers=[
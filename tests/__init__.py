@@ -1,2 +1,18 @@
 from .request_prep import RequestPreparations
-from .test_transmit import TestTransmit
\ No newline at end of file
+from .headers import HeadersTest
+from .request_body import RequestBodyTest
+from .connection_pool import ConnectionPoolTest
+from .response_parser import ResponseParserTest
+from .response import ResponseTest
+from .limiter import ConcurrencyLimiterTest, RateLimiterTest
+from .client import ClientTest
+from .resolver import ResolverTest
+from .tls import TLSTest
+from .pipeline import PipelineTest
+from .http2 import HTTP2Test, HTTP2NegotiationTest
+from .encoding import EncodingTest
+from .cache import CacheTest
+from .retry import RetryTest
+from .timeout import TimeoutTest
+from .timings import TimingsTest
+from .test_transmit import TestTransmit
@@ -0,0 +1,200 @@
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from email.utils import formatdate
+from time import time
+import os
+
+from genki import Client
+from genki.http.request import ResponseCache, RequestBuilder
+from genki.http.request.cache import (
+    CacheEntry, DiskStorage, parse_cache_control
+)
+
+from .test_server import Request, start_http_server
+
+
+class CachingServer:
+    """Server answering with cache headers depending on path,
+    counting requests per path
+    """
+
+    def __init__(self):
+        self.hits = dict()
+        self.server = start_http_server(self.respond)
+        self.addr = f'127.0.0.1:{self.server.server_port}'
+
+    def respond(self, sock, request: Request, _):
+        path, headers = request.path, request.headers
+        self.hits[path] = self.hits.get(path, 0) + 1
+        count = self.hits[path]
+
+        extra = ''
+        body = f'{path} {count}'
+        if request.method == 'POST':
+            extra = 'Cache-Control: no-store\r\n'
+        elif path == '/fresh':
+            extra = 'Cache-Control: max-age=60\r\n'
+        elif path == '/etag':
+            extra = 'Cache-Control: no-cache\r\nETag: "v1"\r\n'
+            if headers.get('if-none-match') == '"v1"':
+                sock.sendall(
+                    b'HTTP/1.1 304 Not Modified\r\nETag: "v1"\r\n'
+                    b'X-Revalidated: yes\r\n\r\n')
+                return
+        elif path == '/vary':
+            extra = 'Cache-Control: max-age=60\r\nVary: X-Lang\r\n'
+            body = headers.get('x-lang', '')
+        elif path == '/large':
+            extra = 'Cache-Control: max-age=60\r\n'
+            body = 'x' * 200000
+        elif path == '/nostore':
+            extra = 'Cache-Control: no-store\r\n'
+        sock.sendall(
+            f'HTTP/1.1 200 OK\r\nContent-Length: {len(body)}\r\n'
+            'Content-Type: text/plain; charset=utf-8\r\n'
+            f'{extra}\r\n{body}'.encode())
+
+    def stop(self):
+        self.server.stop()
+
+
+class CacheTest(TestCase):
+    def setUp(self):
+        self.server = CachingServer()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def fetch(self, client, path, method='GET', **kwargs):
+        return client._request(
+            method, f'{self.server.addr}{path}', **kwargs
+            ).result(exc_raise=True)
+
+    def test_parse(self):
+        """Cache-Control directives and freshness
+        """
+        self.assertEqual(
+            parse_cache_control('No-Cache, max-age="10", private'),
+            {'no-cache': None, 'max-age': '10', 'private': None})
+
+        now = time()
+        head = (
+            'HTTP/1.1 200 OK\r\n'
+            f'Date: {formatdate(now - 30, usegmt=True)}\r\n'
+            f'Expires: {formatdate(now + 30, usegmt=True)}\r\n'
+            'Age: 50\r\n\r\n'
+        ).encode()
+        entry = CacheEntry(head + b'body', len(head), {}, now)
+        self.assertAlmostEqual(entry.lifetime, 60, delta=1)
+        self.assertAlmostEqual(entry.age(now), 50, delta=1)
+        request = RequestBuilder('example.com')
+        self.assertTrue(entry.is_fresh(request))
+        request.headers['Cache-Control'] = 'max-age=40'
+        self.assertFalse(entry.is_fresh(request))
+
+        restored = CacheEntry.from_bytes(entry.to_bytes())
+        self.assertEqual(restored.raw, entry.raw)
+        self.assertEqual(restored.lifetime, entry.lifetime)
+
+    def test_fresh(self):
+        """Fresh response is served without asking server,
+        no-store one is never stored
+        """
+        with Client(timeout=5, cache=ResponseCache()) as c:
+            for _ in range(3):
+                res = self.fetch(c, '/fresh')
+                self.assertEqual(res.body, '/fresh 1')
+                res = self.fetch(c, '/nostore')
+            self.assertEqual(res.body, '/nostore 3')
+            self.assertEqual(c.cache.stats.hits, 2)
+            self.assertEqual(c.cache.stats.stored, 1)
+
+            self.fetch(c, '/fresh', headers={'Cache-Control': 'no-cache'})
+            self.assertEqual(self.server.hits['/fresh'], 2)
+
+    def test_revalidation(self):
+        """Stale response is revalidated and 304 answer
+        turned into stored response with updated headers
+        """
+        with Client(timeout=5, cache=ResponseCache()) as c:
+            first = self.fetch(c, '/etag')
+            second = self.fetch(c, '/etag')
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(bytes(second.raw_body), b'/etag 1')
+            self.assertEqual(second.headers['X-Revalidated'], 'yes')
+            self.assertNotIn('X-Revalidated', first.headers)
+            self.assertNotIn('If-None-Match', second.request.headers)
+            self.assertEqual(c.cache.stats.revalidated, 1)
+        self.assertEqual(self.server.hits['/etag'], 2)
+
+    def test_vary(self):
+        """Response is only reused for same values of Vary headers
+        """
+        with Client(timeout=5, cache=ResponseCache()) as c:
+            for lang in ('en', 'fr', 'fr'):
+                res = self.fetch(c, '/vary', headers={'X-Lang': lang})
+                self.assertEqual(res.body, lang)
+        self.assertEqual(self.server.hits['/vary'], 2)
+
+    def test_invalidation(self):
+        """Unsafe request drops stored response
+        """
+        with Client(timeout=5, cache=ResponseCache()) as c:
+            self.fetch(c, '/fresh')
+            self.fetch(c, '/fresh', method='POST', data=b'x')
+            self.assertEqual(self.fetch(c, '/fresh').body, '/fresh 3')
+
+    def test_streamed(self):
+        """Streamed response is not stored and
+        does not drop the one stored before
+        """
+        with Client(timeout=5, cache=ResponseCache()) as c:
+            self.fetch(c, '/large')
+            res = self.fetch(c, '/large', stream=True,
+                             headers={'Cache-Control': 'no-cache'})
+            self.assertTrue(res.is_streaming)
+            b''.join(res.iter_content())
+            self.fetch(c, '/large')
+            self.assertEqual(c.cache.stats.hits, 1)
+        self.assertEqual(self.server.hits['/large'], 2)
+
+    def test_disk_limit(self):
+        """Least recently used files are removed
+        once they take more than disk_maxsize
+        """
+        with TemporaryDirectory() as path:
+            cache = ResponseCache(path=path, disk_maxsize=1000)
+            with Client(timeout=5, cache=cache) as c:
+                for i in range(10):
+                    self.fetch(c, f'/fresh?{i}')
+            self.assertLessEqual(cache.disk.size, 1000)
+            self.assertLess(len(os.listdir(path)), 10)
+            self.assertEqual(len(os.listdir(path)), len(cache.disk))
+            self.assertEqual(
+                len(DiskStorage(path, 1000)), len(cache.disk))
+
+    def test_disk_foreign_files(self):
+        """Files that are not cache entries are neither
+        counted, evicted nor removed by clear()
+        """
+        with TemporaryDirectory() as path:
+            with open(os.path.join(path, 'notes.txt'), 'wb') as file:
+                file.write(b'x' * 2000)
+            storage = DiskStorage(path, 1000)
+            self.assertEqual((len(storage), storage.size), (0, 0))
+            head = b'HTTP/1.1 200 OK\r\n\r\n'
+            storage.set('key', CacheEntry(head + b'body', len(head), {}, 0))
+            self.assertEqual(len(storage), 1)
+            storage.clear()
+            self.assertEqual(os.listdir(path), ['notes.txt'])
+
+    def test_disk(self):
+        """Responses stored on disk are available to another cache
+        """
+        with TemporaryDirectory() as path:
+            with Client(timeout=5, cache=ResponseCache(path=path)) as c:
+                self.fetch(c, '/fresh')
+            cache = ResponseCache(path=path)
+            with Client(timeout=5, cache=cache) as c:
+                self.assertEqual(self.fetch(c, '/fresh').body, '/fresh 1')
+            self.assertEqual(cache.stats.hits, 1)
@@ -0,0 +1,135 @@
+from unittest import TestCase
+
+from gevent import sleep
+from genki import Client, get
+
+from .test_server import Request, start_http_server
+
+
+class CountingServer:
+    """Server that answers with request path after a delay,
+    counting how many requests it handles at once
+    """
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.server = start_http_server(self.respond)
+        self.addr = f'127.0.0.1:{self.server.server_port}'
+
+    def respond(self, sock, request: Request, _) -> bool:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        path = request.path
+        if path[1:].isdigit():
+            sleep(self.delay * (int(path[1:]) % 3))
+        self.active -= 1
+        sock.sendall(
+            f'HTTP/1.1 200 OK\r\nContent-Length: {len(path)}\r\n'
+            f'Connection: close\r\n\r\n{path}'.encode())
+        return False
+
+    def stop(self):
+        self.server.stop()
+
+
+class RedirectServer:
+    """Keep-alive server redirecting /old permanently and /temp
+    temporarily to /new, counting connections and requests per path
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.hits = dict()
+        self.server = start_http_server(self.respond)
+        self.addr = f'127.0.0.1:{self.server.server_port}'
+
+    def respond(self, sock, request: Request, number: int):
+        if not number:
+            self.connections += 1
+        path = request.path
+        self.hits[path] = self.hits.get(path, 0) + 1
+        if path == '/new':
+            sock.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 3\r\n'
+                         b'\r\nnew')
+        else:
+            status = b'301 Moved Permanently' if path == '/old' \
+                else b'302 Found'
+            sock.sendall(b'HTTP/1.1 %s\r\nLocation: /new\r\n'
+                         b'Content-Length: 0\r\n\r\n' % status)
+
+    def stop(self):
+        self.server.stop()
+
+
+class ClientTest(TestCase):
+    def setUp(self):
+        self.server = CountingServer()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_map(self):
+        """Results are in order of items, window bounds concurrency
+        """
+        urls = (f'{self.server.addr}/{i}' for i in range(30))
+        with Client(timeout=5) as c:
+            results = list(c.map('GET', urls, window=4))
+            self.assertFalse(c._requests)
+        self.assertEqual(
+            [bytes(r.raw_body) for r in results],
+            [f'/{i}'.encode() for i in range(30)])
+        self.assertLessEqual(self.server.max_active, 4)
+
+    def test_imap_unordered(self):
+        """Every item gets its result, dicts give request arguments
+        """
+        items = [f'{self.server.addr}/{i}' for i in range(20)]
+        items.append({'url': f'{self.server.addr}/post', 'data': b'x'})
+        with Client(timeout=5) as c:
+            results = list(c.imap_unordered('GET', iter(items), window=5))
+        self.assertEqual(
+            sorted(bytes(r.raw_body) for r in results),
+            sorted([f'/{i}'.encode() for i in range(20)] + [b'/post']))
+        self.assertLessEqual(self.server.max_active, 5)
+
+    def test_finished_requests_pruned(self):
+        """Client only keeps track of requests in flight
+        """
+        c = Client(timeout=5)
+        first = c.get(f'{self.server.addr}/1')
+        first.result()
+        sleep(0)
+        self.assertFalse(c._requests)
+
+        requests = [c.get(f'{self.server.addr}/{i}') for i in range(5)]
+        self.assertEqual(len(c._requests), 5)
+        c.collect()
+        self.assertTrue(all(i.is_done for i in requests))
+        sleep(0)
+        self.assertFalse(c._requests)
+        c.close()
+
+    def test_redirects(self):
+        """Same server is not reconnected to while following redirects,
+        permanent redirects are remembered
+        """
+        server = RedirectServer()
+        try:
+            res = get(f'{server.addr}/temp', timeout=5).result(exc_raise=True)
+            self.assertEqual(bytes(res.raw_body), b'new')
+            self.assertEqual(len(res.request.redirect_chain), 1)
+            self.assertEqual(server.connections, 1)
+
+            with Client(timeout=5) as c:
+                for _ in range(3):
+                    res = c.get(f'{server.addr}/old').result(exc_raise=True)
+                    self.assertEqual(bytes(res.raw_body), b'new')
+                    self.assertEqual(res.request.redirect_chain[0].source,
+                                     f'http://{server.addr}/old')
+            self.assertEqual(server.hits['/old'], 1)
+            self.assertEqual(server.hits['/new'], 4)
+            self.assertEqual(c.redirects.stats.hits, 2)
+        finally:
+            server.stop()
@@ -0,0 +1,158 @@
+from unittest import TestCase
+import os
+import resource
+
+from gevent import socket, spawn
+
+from genki.http.constants import Scheme
+from genki.http.request import Connection, ConnectionPool
+
+
+KEY = (Scheme.HTTP, 'example.com', 80)
+
+
+def make_connection():
+    """Connection with server end of socket pair
+    """
+    client, server = socket.socketpair()
+    return Connection(client, KEY), server
+
+
+class ConnectionPoolTest(TestCase):
+    def test_reuse(self):
+        """Released connection is given back on acquire
+        """
+        pool = ConnectionPool()
+        self.assertIsNone(pool.acquire(KEY))
+
+        conn, server = make_connection()
+        pool.release(conn)
+        self.assertIs(pool.acquire(KEY), conn)
+        self.assertEqual((pool.hits, pool.misses), (1, 1))
+        server.close()
+
+    def test_stale(self):
+        """Connection closed by server is not reused
+        """
+        pool = ConnectionPool()
+        conn, server = make_connection()
+        pool.release(conn)
+        server.close()
+
+        self.assertIsNone(pool.acquire(KEY))
+        self.assertEqual(pool.stale, 1)
+        self.assertTrue(conn.is_closed)
+
+    def test_high_descriptor(self):
+        """Idle connection with descriptor above FD_SETSIZE
+        is not taken for stale
+        """
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if max(soft, hard) <= 2048 and hard != resource.RLIM_INFINITY:
+            self.skipTest('descriptor limit is too low')
+        if soft <= 2048:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (4096, hard))
+            self.addCleanup(
+                resource.setrlimit, resource.RLIMIT_NOFILE, (soft, hard))
+
+        client, server = socket.socketpair()
+        fd = os.dup2(client.fileno(), 2048)
+        client.close()
+        conn = Connection(socket.socket(fileno=fd), KEY)
+        self.assertFalse(conn.is_stale())
+        server.close()
+        self.assertTrue(conn.is_stale())
+        conn.close()
+
+    def test_idle_timeout(self):
+        """Connections idle for too long are evicted
+        """
+        pool = ConnectionPool(idle_timeout=0)
+        conn, server = make_connection()
+        pool.release(conn)
+        conn.last_used -= 1
+
+        self.assertIsNone(pool.acquire(KEY))
+        self.assertEqual(pool.expired, 1)
+        server.close()
+
+    def test_maxsize(self):
+        """Pool does not keep more idle connections than allowed
+        """
+        pool = ConnectionPool(maxsize=1)
+        pairs = [make_connection() for _ in range(2)]
+        for conn, _ in pairs:
+            pool.release(conn)
+
+        self.assertEqual(len(pool), 1)
+        self.assertEqual(pool.discarded, 1)
+        self.assertTrue(pairs[1][0].is_closed)
+        for _, server in pairs:
+            server.close()
+
+    def test_other_hosts(self):
+        """Expired connections to other servers are evicted too,
+        servers with no idle connections left are forgotten
+        """
+        pool = ConnectionPool(idle_timeout=10)
+        conn, server = make_connection()
+        pool.release(conn)
+        conn.last_used -= 20
+
+        other, other_server = make_connection()
+        other.key = (Scheme.HTTP, 'example.org', 80)
+        pool.release(other)
+        self.assertEqual(pool.expired, 1)
+        self.assertTrue(conn.is_closed)
+        self.assertEqual(list(pool._idle), [other.key])
+
+        self.assertIs(pool.acquire(other.key), other)
+        self.assertEqual(pool._idle, {})
+        for i in (other, server, other_server):
+            i.close()
+
+    def test_max_idle(self):
+        """Total number of idle connections is limited,
+        least recently used ones are closed first
+        """
+        pool = ConnectionPool(max_idle=10)
+        pairs = [make_connection() for _ in range(100)]
+        for number, (conn, _) in enumerate(pairs):
+            conn.key = (Scheme.HTTP, f'{number}.example.com', 80)
+            pool.release(conn)
+
+        self.assertEqual(len(pool), 10)
+        self.assertEqual(len(pool._idle), 10)
+        self.assertEqual(pool.discarded, 90)
+        self.assertTrue(all(conn.is_closed for conn, _ in pairs[:90]))
+        self.assertIs(pool.acquire(pairs[-1][0].key), pairs[-1][0])
+        pool.clear()
+        for conn, server in pairs:
+            conn.close()
+            server.close()
+
+    def test_not_reusable(self):
+        """Connections marked as not reusable are closed on release
+        """
+        pool = ConnectionPool()
+        conn, server = make_connection()
+        conn.reusable = False
+        pool.release(conn)
+
+        self.assertEqual(len(pool), 0)
+        self.assertTrue(conn.is_closed)
+        server.close()
+
+    def test_send_buffers(self):
+        """Buffers are sent in order, even when socket
+        accepts only part of them at once
+        """
+        conn, server = make_connection()
+        buffers = [b'head\r\n\r\n', memoryview(b'x' * 3000000), b'', b'end']
+        reader = spawn(
+            lambda: b''.join(iter(lambda: server.recv(65536), b'')))
+        conn.send_buffers(buffers)
+        conn.close()
+        self.assertEqual(reader.get(), b''.join(buffers))
+        self.assertEqual(conn.requests_sent, 1)
+        server.close()
@@ -0,0 +1,139 @@
+from unittest import TestCase, skipIf
+import gzip
+import zlib
+import tracemalloc
+
+from gevent.server import StreamServer
+
+from genki import Client
+from genki.http.encoding import get_decoder, brotli, zstandard
+from genki.http.exceptions import ContentTooLarge
+
+from .test_server import Request, start_http_server
+
+
+BODY = b'genki compresses well ' * 4096
+
+
+def encoding_server(content_encoding: str, body: bytes) -> StreamServer:
+    """Server that answers every request with given encoded body,
+    echoing Accept-Encoding of request in a header
+    """
+    def respond(sock, request: Request, _) -> bool:
+        accept = request.headers.get('accept-encoding', '')
+        sock.sendall(
+            b'HTTP/1.1 200 OK\r\nContent-Encoding: %s\r\n'
+            b'X-Accept-Encoding: %s\r\nContent-Length: %d\r\n'
+            b'Connection: close\r\n\r\n'
+            % (content_encoding.encode(), accept.encode(), len(body)))
+        for i in range(0, len(body), 1000):
+            sock.sendall(body[i:i + 1000])
+        return False
+
+    return start_http_server(respond)
+
+
+class EncodingTest(TestCase):
+    def decode(self, encoding: str, data: bytes, step: int = 7) -> bytes:
+        decoder = get_decoder(encoding)
+        out = [
+            decoder.decompress(data[i:i + step])
+            for i in range(0, len(data), step)
+        ]
+        return b''.join(out) + decoder.flush()
+
+    def test_gzip_deflate(self):
+        """Body is decoded piece by piece
+        """
+        self.assertEqual(self.decode('gzip', gzip.compress(BODY)), BODY)
+        self.assertEqual(self.decode('deflate', zlib.compress(BODY)), BODY)
+        raw = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        raw = raw.compress(BODY) + raw.flush()
+        self.assertEqual(self.decode('deflate', raw), BODY)
+
+    def test_chained(self):
+        """Encodings are undone in reverse order
+        """
+        data = gzip.compress(zlib.compress(BODY))
+        self.assertEqual(self.decode('deflate, gzip', data), BODY)
+
+    @skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        self.assertEqual(self.decode('br', brotli.compress(BODY)), BODY)
+
+    @skipIf(zstandard is None, 'zstandard is not installed')
+    def test_zstd(self):
+        data = zstandard.ZstdCompressor().compress(BODY)
+        self.assertEqual(self.decode('zstd', data), BODY)
+
+    def test_unsupported(self):
+        self.assertIsNone(get_decoder(''))
+        self.assertIsNone(get_decoder('identity'))
+        self.assertIsNone(get_decoder('compress'))
+
+    def test_size_limit(self):
+        """Decompression stops as soon as limit is exceeded
+        """
+        decoder = get_decoder('gzip', 1000)
+        self.assertRaises(
+            ContentTooLarge, decoder.decompress, gzip.compress(BODY))
+        self.assertLessEqual(decoder.size, 1001)
+
+    def test_chained_size_limit(self):
+        """Every one of stacked encodings is limited,
+        not only the final output
+        """
+        data = gzip.compress(gzip.compress(b'\0' * 20_000_000))
+        decoder = get_decoder('gzip, gzip', 1024)
+        tracemalloc.start()
+        try:
+            with self.assertRaises(ContentTooLarge):
+                decoder.decompress(data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 2 ** 20)
+
+    @skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli_size_limit(self):
+        """Highly compressed br body is not expanded past the limit
+        """
+        decoder = get_decoder('br', 1024)
+        with self.assertRaises(ContentTooLarge):
+            decoder.decompress(brotli.compress(b'\0' * 20_000_000))
+        self.assertLessEqual(decoder.size, 65536)
+
+    @skipIf(zstandard is None, 'zstandard is not installed')
+    def test_zstd_size_limit(self):
+        """Highly compressed zstd body is not expanded past the limit
+        """
+        data = zstandard.ZstdCompressor().compress(b'\0' * 20_000_000)
+        decoder = get_decoder('zstd', 1024)
+        with self.assertRaises(ContentTooLarge):
+            decoder.decompress(data)
+        self.assertLessEqual(decoder.size, 65536)
+
+    def test_client(self):
+        """Response is decoded while raw_body stays compressed
+        """
+        data = gzip.compress(BODY)
+        server = encoding_server('gzip', data)
+        addr = f'127.0.0.1:{server.server_port}'
+        try:
+            with Client(timeout=5) as c:
+                resp = c.get(addr).result(exc_raise=True)
+                streamed = c.get(addr, stream=True).result(exc_raise=True)
+                self.assertEqual(
+                    b''.join(streamed.iter_content(4096)), BODY)
+            completed = []
+            with Client(timeout=5, max_decompressed_size=1000,
+                        on_complete=lambda req, res: completed.append(res)
+                        ) as c:
+                err = c.get(addr).result()
+            self.assertIsInstance(err, ContentTooLarge)
+            self.assertEqual(completed, [err])
+        finally:
+            server.stop()
+        self.assertIn('gzip', resp.headers['X-Accept-Encoding'])
+        self.assertEqual(resp.raw_body, data)
+        self.assertEqual(resp.content, BODY)
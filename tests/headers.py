@@ -0,0 +1,86 @@
+from unittest import TestCase
+
+from genki.http import Headers
+
+
+RAW = (
+    b'HTTP/1.1 200 OK\r\n'
+    b'Content-Type: text/html\r\n'
+    b'Content-Length: 42\r\n'
+    b'Set-Cookie: a=1\r\n'
+    b'set-cookie: b=2\r\n'
+    b'X-Empty:\r\n'
+    b'\r\n'
+)
+
+
+class HeadersTest(TestCase):
+    def test_from_bytes(self):
+        """Lookup ignores case, repeated headers keep every value
+        """
+        headers = Headers.from_bytes(RAW)
+        self.assertEqual(len(headers), 4)
+        self.assertEqual(headers['content-type'], 'text/html')
+        self.assertEqual(headers['CONTENT-LENGTH'], '42')
+        self.assertEqual(headers.get_all('Set-Cookie'), ['a=1', 'b=2'])
+        self.assertEqual(headers['Set-Cookie'], 'a=1, b=2')
+        self.assertEqual(headers['X-Empty'], '')
+        self.assertIn('x-empty', headers)
+        self.assertIsNone(headers.get('Location'))
+
+    def test_modify(self):
+        """Setting replaces all values and keeps original name case
+        """
+        headers = Headers({'Accept': '*/*'})
+        headers['accept'] = 'text/html'
+        headers.add('Set-Cookie', 'a=1')
+        headers.add('Set-Cookie', 'b=2')
+        headers['Content-Length'] = 10
+        self.assertEqual(list(headers), ['Accept', 'Set-Cookie',
+                                         'Content-Length'])
+        self.assertEqual(
+            headers.to_bytes(),
+            b'Accept: text/html\r\nSet-Cookie: a=1\r\nSet-Cookie: b=2\r\n'
+            b'Content-Length: 10\r\n\r\n')
+        headers.remove_header('set-cookie')
+        headers.remove_header('Missing')
+        self.assertEqual(
+            headers.to_bytes(),
+            b'Accept: text/html\r\nContent-Length: 10\r\n\r\n')
+
+    def test_copy(self):
+        """Copy does not share values with original
+        """
+        headers = Headers.from_bytes(RAW)
+        copy = Headers(headers)
+        copy.add('Set-Cookie', 'c=3')
+        self.assertEqual(len(headers.get_all('Set-Cookie')), 2)
+        self.assertTrue(headers)
+        self.assertFalse(Headers())
+        self.assertEqual(repr(Headers({'A': 1})), "Headers({'A': '1'})")
+
+    def test_serialize_changes(self):
+        """Headers changed after they were serialized or copied
+        are serialized the same way as new ones
+        """
+        headers = Headers.from_bytes(RAW)
+        # Undecodable byte of parsed header
+        headers['X-Raw'] = 'caf\udcc3'
+        copy = headers.copy()
+        copy['Host'] = 'example.com'
+        copy['content-length'] = 7
+        copy.add('Set-Cookie', 'c=3')
+        del copy['X-Empty']
+        headers.to_bytes()
+        headers['Content-Type'] = 'text/plain'
+
+        for changed in (headers, copy):
+            self.assertEqual(
+                changed.to_bytes(),
+                changed.to_str().encode('utf-8', 'surrogateescape'))
+        self.assertEqual(
+            copy.to_bytes(),
+            b'Content-Type: text/html\r\nContent-Length: 7\r\n'
+            b'Set-Cookie: a=1\r\nSet-Cookie: b=2\r\nSet-Cookie: c=3\r\n'
+            b'X-Raw: caf\xc3\r\nHost: example.com\r\n\r\n')
+        self.assertIn(b'Content-Type: text/plain\r\n', headers.to_bytes())
@@ -0,0 +1,134 @@
+from unittest import TestCase, skipIf
+from tempfile import TemporaryDirectory
+from time import monotonic
+
+from gevent import socket
+
+from .test_server import h2, start_h2_server, handle_h2, handle_http1, \
+    start_tls_server, create_certificate
+from genki import Client
+from genki.http.request import Connection, Timeout, create_ssl_context
+from genki.http.request.http2 import HTTP2Connection
+from genki.http.constants import Scheme
+
+
+require_h2 = skipIf(h2 is None, 'h2 is not installed')
+
+
+@require_h2
+class HTTP2Test(TestCase):
+    def setUp(self):
+        self.server = start_h2_server()
+        self.addr = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_multiplexing(self):
+        """Concurrent requests share one connection
+        """
+        with Client(timeout=5, http2_cleartext=True) as client:
+            requests = [
+                client.get(f'{self.addr}/{i}') for i in range(20)
+            ] + [client.post(f'{self.addr}/post', data=b'x' * 100000)]
+            client.collect()
+            connections = list(client.http2._connections.values())
+
+        self.assertEqual(len(connections), 1)
+        for i, req in enumerate(requests[:-1]):
+            resp = req.result(exc_raise=True)
+            self.assertEqual(resp.http_version, '2')
+            self.assertEqual(resp.raw_body, f'GET /{i} 0'.encode())
+        self.assertEqual(
+            requests[-1].result(exc_raise=True).raw_body,
+            b'POST /post 100000')
+
+    def test_flow_control(self):
+        """Response bigger than flow control window is received,
+        both whole and streamed
+        """
+        with Client(timeout=5, http2_cleartext=True) as client:
+            whole = client.get(f'{self.addr}/large').result(exc_raise=True)
+            self.assertEqual(len(whole.raw_body), 200000)
+
+            streamed = client.get(
+                f'{self.addr}/large', stream=True).result(exc_raise=True)
+            self.assertEqual(
+                sum(len(i) for i in streamed.iter_content()), 200000)
+
+    def test_timeout(self):
+        """Stalled stream times out by read timeout and deadline,
+        connection stays usable for other requests
+        """
+        with Client(timeout=Timeout(5, read=0.2),
+                    http2_cleartext=True) as client:
+            start = monotonic()
+            err = client.get(f'{self.addr}/stall').result()
+            self.assertIsInstance(err, socket.timeout)
+            self.assertLess(monotonic() - start, 2)
+            resp = client.get(f'{self.addr}/a').result(exc_raise=True)
+            self.assertEqual(resp.raw_body, b'GET /a 0')
+
+        with Client(timeout=Timeout(None, total=0.2),
+                    http2_cleartext=True) as client:
+            err = client.get(f'{self.addr}/stall', stream=True).result()
+            self.assertIsInstance(err, socket.timeout)
+
+    def test_write_timeout(self):
+        """Connection to peer that stopped reading
+        is closed once writing times out
+        """
+        client, server = socket.socketpair()
+        conn = Connection(client, (Scheme.HTTP, '127.0.0.1', 80))
+        conn.set_timeout(0.2)
+        h2_conn = HTTP2Connection(conn)
+        for _ in range(100000):
+            h2_conn.h2.ping(b'01234567')
+        with self.assertRaises(socket.timeout):
+            h2_conn._flush()
+        self.assertTrue(h2_conn.closed)
+        self.assertTrue(conn.is_closed)
+        server.close()
+
+
+@require_h2
+class HTTP2NegotiationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = TemporaryDirectory()
+        cls.certfile, cls.keyfile = create_certificate(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def fetch(self, handle, alpn):
+        server = start_tls_server(handle, self.certfile, self.keyfile, alpn)
+        try:
+            with Client(timeout=5, http2=True,
+                        ssl_context=create_ssl_context(self.certfile)) as c:
+                url = f'https://127.0.0.1:{server.server_port}/a'
+                return c, [c.get(url).result(exc_raise=True)
+                           for _ in range(2)]
+        finally:
+            server.stop()
+
+    def test_h2(self):
+        """Server that selects h2 with ALPN is spoken to over HTTP/2
+        """
+        client, responses = self.fetch(handle_h2, ['h2', 'http/1.1'])
+        for resp in responses:
+            self.assertEqual(resp.http_version, '2')
+            self.assertEqual(resp.raw_body, b'GET /a 0')
+        self.assertFalse(client.http2._http1)
+
+    def test_fallback(self):
+        """Server that offers only http/1.1 gets requests over HTTP/1.1
+        on connection established during negotiation
+        """
+        client, responses = self.fetch(handle_http1, ['http/1.1'])
+        for resp in responses:
+            self.assertEqual(resp.http_version, '1.1')
+            self.assertEqual(resp.raw_body, b'GET /a')
+        self.assertEqual(len(client.http2._http1), 1)
+        self.assertFalse(client.http2._connections)
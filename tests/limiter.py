@@ -0,0 +1,115 @@
+from unittest import TestCase
+from time import monotonic
+
+from gevent import Greenlet, joinall, spawn, sleep, socket
+from gevent.event import Event
+
+from genki.limiter import ConcurrencyLimiter, RateLimiter
+
+
+class ConcurrencyLimiterTest(TestCase):
+    def test_limits(self):
+        """Greenlets over the limits wait in queue
+        """
+        limiter = ConcurrencyLimiter(max_concurrency=3, max_per_host=2)
+        release = Event()
+        greenlets = [
+            limiter.submit(host, Greenlet(release.wait))
+            for host in ('a', 'a', 'a', 'b', 'b', 'c')
+        ]
+
+        self.assertEqual(limiter.in_flight, 3)
+        self.assertEqual(limiter.queued, 3)
+        self.assertLessEqual(limiter.in_flight_for('a'), 2)
+        self.assertEqual(
+            limiter.queued_for('a') + limiter.in_flight_for('a'), 3)
+
+        release.set()
+        joinall(greenlets)
+        self.assertTrue(all(i.successful() for i in greenlets))
+        self.assertEqual(limiter.stats, (0, 0))
+
+    def test_killed_while_queued(self):
+        """Greenlet killed in queue leaves it
+        and does not count as finished
+        """
+        limiter = ConcurrencyLimiter(max_concurrency=1)
+        release = Event()
+        running = limiter.submit('a', Greenlet(release.wait))
+        killed = limiter.submit('a', Greenlet(release.wait))
+        last = limiter.submit('a', Greenlet(release.wait))
+        killed.kill()
+        sleep(0)
+        self.assertEqual(limiter.stats, (1, 1))
+        self.assertEqual(limiter.queued_for('a'), 1)
+
+        release.set()
+        joinall([running, last])
+        sleep(0)
+        self.assertTrue(last.successful())
+        self.assertFalse(killed.started)
+        self.assertEqual(limiter.stats, (0, 0))
+        self.assertEqual(limiter.in_flight_for('a'), 0)
+
+    def test_unlimited(self):
+        """Without limits greenlets start immediately
+        """
+        limiter = ConcurrencyLimiter()
+        greenlets = [limiter.submit('a', Greenlet(int)) for _ in range(5)]
+        self.assertEqual(limiter.queued, 0)
+        joinall(greenlets)
+        self.assertEqual(limiter.in_flight, 0)
+
+
+class RateLimiterTest(TestCase):
+    def test_burst_and_rate(self):
+        """Burst is sent at once, the rest at given rate in order
+        """
+        limiter = RateLimiter({'*.example.com': (50, 3)})
+        sent = []
+
+        def send(i):
+            limiter.acquire('api.example.com')
+            sent.append((i, monotonic()))
+
+        start = monotonic()
+        greenlets = [spawn(send, i) for i in range(8)]
+        sleep(0.01)
+        self.assertEqual(len(sent), 3)
+        self.assertEqual(limiter.queued, 5)
+        self.assertEqual(limiter.queued_for('www.example.com'), 5)
+        joinall(greenlets)
+
+        self.assertEqual([i for i, _ in sent], list(range(8)))
+        # 5 requests over the burst at 50 per second
+        self.assertGreaterEqual(sent[-1][1] - start, 0.09)
+        stats = limiter.stats
+        self.assertEqual((stats.queued, stats.delayed), (0, 5))
+        self.assertAlmostEqual(stats.max_wait, 0.1, delta=0.02)
+
+    def test_hosts(self):
+        """Hosts without limits are not delayed, default limit
+        applies to each host separately, long wait is refused
+        """
+        limiter = RateLimiter({'limited': (1, 1)}, default=(1, 2))
+        limiter.acquire('limited')
+        with self.assertRaises(socket.timeout):
+            limiter.acquire('limited', timeout=0.1)
+        for host in ('a', 'a', 'b', 'b'):
+            limiter.acquire(host, timeout=0)
+        self.assertEqual(limiter.delayed, 0)
+        self.assertIsNone(RateLimiter().bucket('a'))
+
+    def test_idle_buckets(self):
+        """Buckets of default limit that are full again are dropped,
+        so that limiter does not grow with every new host
+        """
+        limiter = RateLimiter({'limited': (1, 1)},
+                              default=(1000, 1), max_hosts=10)
+        limited = limiter.bucket('limited')
+        for i in range(100):
+            limiter.acquire(f'host-{i}')
+            sleep(0.002)
+        self.assertLessEqual(len(limiter._default_buckets), 10)
+        self.assertLessEqual(len(limiter._hosts), 10)
+        self.assertIs(limiter.bucket('limited'), limited)
@@ -0,0 +1,148 @@
+from unittest import TestCase
+from time import monotonic
+
+from gevent import socket, sleep
+from gevent.server import StreamServer
+
+from genki import Client
+from genki.http.request import Timeout
+
+from .test_server import Request, start_http_server
+
+
+def answer_path(sock, request: Request):
+    """Answer request with its path
+    """
+    path = request.path.encode()
+    sock.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s'
+                 % (len(path), path))
+
+
+def limited_server(responses_per_connection: int) -> StreamServer:
+    """Server that closes connection after answering
+    given number of requests, even if more were received
+    """
+    def respond(sock, request: Request, number: int) -> bool:
+        answer_path(sock, request)
+        return number + 1 < responses_per_connection
+
+    return start_http_server(respond)
+
+
+def breaking_server() -> StreamServer:
+    """Server that answers the first request on connection,
+    sends only part of response to the second one and closes connection
+    """
+    def respond(sock, request: Request, number: int) -> bool:
+        if number:
+            sock.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 10'
+                         b'\r\n\r\nbroken')
+            return False
+        answer_path(sock, request)
+
+    return start_http_server(respond)
+
+
+def silent_server() -> StreamServer:
+    """Server that reads requests and never answers them
+    """
+    return start_http_server(lambda *_: None)
+
+
+def slow_server(delay: float, paths: list) -> StreamServer:
+    """Server that answers every request after delay,
+    recording paths of requests it received
+    """
+    def respond(sock, request: Request, _):
+        paths.append(request.path)
+        sleep(delay)
+        answer_path(sock, request)
+
+    return start_http_server(respond)
+
+
+class PipelineTest(TestCase):
+    def test_server_closes(self):
+        """Requests left without response are resent on new connection
+        """
+        server = limited_server(3)
+        addr = f'127.0.0.1:{server.server_port}'
+        try:
+            with Client(timeout=5, pipelining=True, pipeline_depth=5) as c:
+                requests = [c.get(f'{addr}/{i}') for i in range(10)]
+            for i, req in enumerate(requests):
+                self.assertEqual(req.result(exc_raise=True).raw_body,
+                                 f'/{i}'.encode())
+            self.assertGreater(c.pipeline.resent, 0)
+        finally:
+            server.stop()
+
+    def test_server_closes_mid_response(self):
+        """Request which response was cut short fails,
+        requests after it are resent on new connection
+        """
+        server = breaking_server()
+        addr = f'127.0.0.1:{server.server_port}'
+        try:
+            with Client(timeout=5, pipelining=True, pipeline_depth=4) as c:
+                requests = [c.get(f'{addr}/{i}') for i in range(4)]
+            results = [req.result() for req in requests]
+            self.assertEqual(results[0].raw_body, b'/0')
+            self.assertEqual(results[2].raw_body, b'/2')
+            self.assertIsInstance(results[1], Exception)
+            self.assertIsInstance(results[3], Exception)
+            self.assertEqual(c.pipeline.resent, 2)
+        finally:
+            server.stop()
+
+    def test_timeout(self):
+        """Requests sent and queued behind them
+        fail once total timeout passes
+        """
+        server = silent_server()
+        addr = f'127.0.0.1:{server.server_port}'
+        try:
+            with Client(pipelining=True, pipeline_depth=2) as c:
+                start = monotonic()
+                requests = [
+                    # Reading response to this one is limited
+                    # by deadline of the next one in the same batch
+                    c.get(f'{addr}/0', timeout=Timeout(None, total=1)),
+                    c.get(f'{addr}/1', timeout=Timeout(None, total=0.3)),
+                    c.get(f'{addr}/2', timeout=Timeout(None, total=0.3)),
+                    ]
+                results = [req.result() for req in requests[1:]]
+                elapsed = monotonic() - start
+                for result in results:
+                    self.assertIsInstance(result, socket.timeout)
+                self.assertLess(elapsed, 0.8)
+                self.assertEqual(c.pipeline.stats.queued, 0)
+                self.assertIsInstance(requests[0].result(), socket.timeout)
+        finally:
+            server.stop()
+
+    def test_own_deadline(self):
+        """Request that ran out of time does not cut short
+        reading of response to request sent before it,
+        its own response is thrown away
+        """
+        paths = []
+        server = slow_server(0.25, paths)
+        addr = f'127.0.0.1:{server.server_port}'
+        try:
+            with Client(pipelining=True, pipeline_depth=3) as c:
+                requests = [
+                    c.get(f'{addr}/{i}', timeout=Timeout(None, total=total))
+                    for i, total in enumerate((2, 0.3, 2))
+                    ]
+                start = monotonic()
+                self.assertIsInstance(requests[1].result(), socket.timeout)
+                self.assertLess(monotonic() - start, 0.45)
+                for i in (0, 2):
+                    self.assertEqual(
+                        requests[i].result(exc_raise=True).raw_body,
+                        f'/{i}'.encode())
+            self.assertEqual(paths, ['/0', '/1', '/2'])
+            self.assertEqual(c.pipeline.resent, 0)
+        finally:
+            server.stop()
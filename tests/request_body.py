@@ -0,0 +1,72 @@
+from unittest import TestCase
+from tempfile import TemporaryFile
+from io import BytesIO
+
+from gevent.server import StreamServer
+
+from genki import Client
+from genki.http.request import RequestBuilder
+
+from .test_server import Request, start_http_server
+
+
+def echo_server() -> StreamServer:
+    """Server that answers with body of request,
+    decoding chunked transfer encoding
+    """
+    def respond(sock, request: Request, _) -> bool:
+        sock.sendall(
+            b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n'
+            b'Connection: close\r\n\r\n%s'
+            % (len(request.body), request.body))
+        return False
+
+    return start_http_server(respond)
+
+
+class RequestBodyTest(TestCase):
+    def test_length_headers(self):
+        """Body of unknown length is sent chunked
+        """
+        req = RequestBuilder('example.com', body=BytesIO(b'abc'))
+        self.assertEqual(req.headers['Content-Length'], '3')
+        self.assertNotIn('Transfer-Encoding', req.headers)
+
+        req = RequestBuilder('example.com', body=(i for i in [b'a']))
+        self.assertEqual(req.headers['Transfer-Encoding'], 'chunked')
+        self.assertNotIn('Content-Length', req.headers)
+
+        req = RequestBuilder(
+            'example.com',
+            headers={'Content-Length': 2},
+            body=iter([b'a', b'b']))
+        self.assertTrue(req.payload.is_stream)
+        self.assertEqual(req.payload.length, 2)
+
+        req.body = b'abcd'
+        self.assertEqual(req.headers['Content-Length'], '4')
+        req.append_body('ef')
+        self.assertEqual(req.body, b'abcdef')
+        self.assertEqual(req.headers['Content-Length'], '6')
+
+    def test_upload(self):
+        """File, generator and file-like bodies reach server intact
+        """
+        data = bytes(range(256)) * 1000
+        server = echo_server()
+        addr = f'127.0.0.1:{server.server_port}'
+        try:
+            with TemporaryFile() as file, Client(timeout=5) as c:
+                file.write(b'skipped' + data)
+                file.seek(len(b'skipped'))
+                sent = [
+                    c.post(addr, data=file),
+                    c.put(addr, data=(data[i:i + 1000]
+                                      for i in range(0, len(data), 1000))),
+                    c.post(addr, data=BytesIO(data)),
+                ]
+                c.collect()
+            for req in sent:
+                self.assertEqual(req.result(exc_raise=True).raw_body, data)
+        finally:
+            server.stop()
@@ -1,6 +1,7 @@
 from unittest import TestCase
 from itertools import product
 
+from genki.http.url import URL
 from genki.http.url.parse import parse_url, url_parse_result
 from genki.http.request import RequestBuilder
 from genki.http.constants import Scheme
@@ -68,6 +69,26 @@ class RequestPreparations(TestCase):
                 r = parse_url(url)
                 self.assertEqual(r, result)
 
+    def test_url_cache(self):
+        """Same url is parsed once, URL copies share parse result
+        until one of them is changed
+        """
+        url = 'https://example.com:443/some/path?param=value'
+        self.assertIs(parse_url(url), parse_url(url))
+        self.assertGreater(parse_url.cache_info().hits, 0)
+
+        original = URL(url)
+        copy = original.copy()
+        copy.path = 'other'
+        copy.port = 8080
+        self.assertEqual(original.string,
+                         'https://example.com/some/path?param=value')
+        self.assertEqual(copy.string,
+                         'https://example.com:8080/other?param=value')
+        copy.port = 8080
+        self.assertIs(copy.string, copy.string)
+        self.assertEqual(URL(url), original)
+
     def test_invalid_urls(self):
         """Make sure invalid urls will raise an error
         """
@@ -120,3 +141,15 @@ class RequestPreparations(TestCase):
                             '\r\n',
                         ]
                     ).encode()))
+
+    def test_to_buffers(self):
+        """Body is not joined with head
+        """
+        body = b'x' * 100
+        req = RequestBuilder('example.com/upload', body=body, method='POST')
+        head, sent_body = req.to_buffers()
+        self.assertIs(sent_body, body)
+        self.assertTrue(head.startswith(b'POST /upload HTTP/1.1\r\n'))
+        self.assertIn(b'Content-Length: 100\r\n', head)
+        self.assertTrue(head.endswith(b'\r\n\r\n'))
+        self.assertEqual(req.to_bytes(), head + body)
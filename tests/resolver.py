@@ -0,0 +1,112 @@
+from unittest import TestCase
+from time import monotonic
+
+from gevent import socket, spawn, sleep, joinall
+
+from genki.http.request import Resolver
+from genki.http.request.resolver import connect_addrinfo
+
+
+class CountingResolver(Resolver):
+    """Resolver that does not touch network
+    """
+    __slots__ = ('lookups',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookups = 0
+
+    def _lookup(self, host, port):
+        self.lookups += 1
+        sleep(0.3 if host == 'slow' else 0.01)
+        if host == 'invalid':
+            raise socket.gaierror('Name or service not known')
+        return [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', port))
+        ]
+
+
+class ResolverTest(TestCase):
+    def test_cache(self):
+        """Concurrent and repeated lookups hit resolver once
+        """
+        resolver = CountingResolver()
+        joinall([spawn(resolver.resolve, 'example.com', 80)
+                 for _ in range(5)])
+        resolver.resolve('example.com', 80)
+
+        self.assertEqual(resolver.lookups, 1)
+        self.assertEqual(resolver.shared_lookups, 4)
+        self.assertEqual(resolver.hits, 1)
+
+    def test_ttl(self):
+        """Expired entries are looked up again
+        """
+        resolver = CountingResolver(ttl=0)
+        resolver.resolve('example.com', 80)
+        resolver.resolve('example.com', 80)
+        self.assertEqual(resolver.lookups, 2)
+
+    def test_negative(self):
+        """Failed lookups are cached too, every caller
+        gets its own exception
+        """
+        resolver = CountingResolver()
+
+        def resolve():
+            with self.assertRaises(socket.gaierror) as ctx:
+                resolver.resolve('invalid', 80)
+            return ctx.exception
+
+        waiters = [spawn(resolve) for _ in range(2)]
+        joinall(waiters)
+        errors = [i.value for i in waiters] + [resolve(), resolve()]
+
+        self.assertEqual(resolver.lookups, 1)
+        self.assertEqual(resolver.negative_hits, 2)
+        self.assertEqual(len({id(i) for i in errors}), 4)
+        self.assertTrue(all(isinstance(i, socket.gaierror) for i in errors))
+        self.assertEqual(errors[-1].args, ('Name or service not known',))
+
+    def test_maxsize(self):
+        """Least recently used hosts are dropped
+        """
+        resolver = CountingResolver(maxsize=2)
+        for host in ('a', 'b', 'a', 'c', 'a'):
+            resolver.resolve(host, 80)
+        self.assertEqual(resolver.lookups, 3)
+        self.assertEqual(resolver.stats.size, 2)
+
+    def test_timeout(self):
+        """Caller that runs out of time gives up on lookup,
+        others waiting for it still get the result
+        """
+        resolver = CountingResolver()
+        waiter = spawn(resolver.resolve, 'slow', 80)
+        sleep(0)
+        start = monotonic()
+        with self.assertRaises(socket.timeout):
+            resolver.resolve('slow', 80, timeout=0.05)
+        self.assertLess(monotonic() - start, 0.2)
+        self.assertEqual(waiter.get()[0][4], ('127.0.0.1', 80))
+        self.assertEqual(resolver.lookups, 1)
+
+    def test_connect_deadline(self):
+        """Deadline limits attempts to all addresses together
+        """
+        # Server with full accept queue does not answer new connections
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(0)
+        filler = socket.create_connection(server.getsockname())
+        address = (socket.AF_INET, socket.SOCK_STREAM, 6, '',
+                   server.getsockname())
+        start = monotonic()
+        try:
+            with self.assertRaises(socket.timeout):
+                connect_addrinfo([address] * 4, '127.0.0.1',
+                                 timeout=0.3, deadline=start + 0.5)
+            self.assertLess(monotonic() - start, 0.8)
+        finally:
+            filler.close()
+            server.close()
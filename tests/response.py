@@ -0,0 +1,100 @@
+from unittest import TestCase
+
+from genki.http import Response, RequestBuilder, charset
+
+
+HEAD = b'HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n\r\n'
+
+
+class ResponseTest(TestCase):
+    def setUp(self):
+        self.request = RequestBuilder('example.com')
+
+    def streamed(self, *pieces: bytes) -> Response:
+        return Response(self.request, HEAD, stream=(i for i in pieces))
+
+    def test_iter_content(self):
+        """Streamed body is rechunked and can be read only once
+        """
+        resp = self.streamed(b'ab', b'cde', b'f')
+        self.assertTrue(resp.is_streaming)
+        self.assertEqual(list(resp.iter_content(4)), [b'abcd', b'ef'])
+        self.assertFalse(resp.is_streaming)
+        self.assertRaises(RuntimeError, lambda: resp.raw_body)
+
+    def test_iter_lines(self):
+        """Lines split between pieces are joined back
+        """
+        resp = self.streamed(b'first\r\nsec', b'ond\nthi', b'rd')
+        self.assertEqual(
+            list(resp.iter_lines()),
+            [b'first', b'second', b'third'])
+
+    def test_raw_body(self):
+        """Accessing body reads the rest of stream
+        """
+        resp = self.streamed(b'some ', b'body')
+        self.assertEqual(resp.raw_body, b'some body')
+        self.assertEqual(b''.join(resp.iter_content(3)), b'some body')
+
+    def test_single_buffer(self):
+        """Body is a view of response buffer, headers are parsed lazily
+        """
+        raw = bytearray(HEAD + b'body')
+        resp = Response(self.request, raw, body_start=len(HEAD))
+        self.assertIsNone(resp._headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers['Content-Type'], 'text/plain')
+        self.assertIs(resp.raw_body.obj, raw)
+        self.assertEqual(resp.raw_body, b'body')
+        self.assertEqual(resp.body, 'body')
+        self.assertIs(resp.raw_bytes, raw)
+
+    def response(self, content_type: str, body: bytes) -> Response:
+        head = b'HTTP/1.1 200 OK\r\nContent-Type: %s\r\n\r\n' \
+            % content_type.encode()
+        return Response(self.request, head + body)
+
+    def test_charset_sniffing(self):
+        """BOM and <meta charset> are used before statistical detection
+        """
+        text = 'Привет, мир'
+        resp = self.response('text/plain', b'\xef\xbb\xbf' + text.encode())
+        self.assertEqual(resp.body, text)
+        resp = self.response('text/plain; charset=latin-1',
+                             '\ufeff'.encode('utf-16-le') +
+                             text.encode('utf-16-le'))
+        self.assertEqual(resp.body, text)
+        resp = self.response(
+            'text/html',
+            b'<html><head><meta charset="windows-1251"></head>'
+            + text.encode('cp1251'))
+        self.assertTrue(resp.body.endswith(text))
+
+    def test_binary_body(self):
+        """Body that is not text is a view of response buffer
+        """
+        resp = self.response('application/octet-stream', b'\x00' * 1000)
+        self.assertIsInstance(resp.body, memoryview)
+        self.assertIs(resp.body.obj, resp.raw_bytes)
+        self.assertEqual(resp.body, b'\x00' * 1000)
+        self.assertIsNone(resp._text)
+
+    def test_body_memoized(self):
+        """Detection runs once, on a sample of body
+        """
+        samples = []
+
+        def detector(sample):
+            samples.append(len(sample))
+            return 'utf-8'
+
+        previous = charset.detector
+        charset.set_detector(detector)
+        try:
+            resp = self.response('text/plain', 'ж'.encode() * 100000)
+            self.assertIs(resp.body, resp.body)
+        finally:
+            charset.set_detector(previous)
+        self.assertEqual(samples, [charset.sample_size])
+        self.assertEqual(resp.charset, None)
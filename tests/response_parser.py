@@ -0,0 +1,157 @@
+from unittest import TestCase
+
+from genki.http.parser import ResponseParser
+from genki.http.exceptions import InvalidResponse, IncompleteResponse
+
+
+def feed_by(parser: ResponseParser, data: bytes, size: int) -> bytes:
+    """Feed data to parser in pieces of given size, return body
+    """
+    body = b''
+    for i in range(0, len(data), size):
+        body += b''.join(parser.feed(data[i:i + size]))
+    return body
+
+
+CHUNKED = (
+    b'HTTP/1.1 200 OK\r\n'
+    b'Transfer-Encoding: chunked\r\n'
+    b'\r\n'
+    b'5;name=value\r\nhello\r\n'
+    b'9\r\n, world\r\n\r\n'
+    b'0\r\n'
+    b'Expires: never\r\n'
+    b'\r\n'
+)
+
+
+class ResponseParserTest(TestCase):
+    def test_fixed_length(self):
+        """Body is read according to Content-Length,
+        data after it is left unused
+        """
+        data = b'HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\nhelloHTTP'
+        for size in (1, 3, len(data)):
+            with self.subTest(size=size):
+                parser = ResponseParser()
+                self.assertEqual(feed_by(parser, data, size), b'hello')
+                self.assertTrue(parser.is_done)
+                self.assertTrue(parser.keep_alive)
+                self.assertEqual(parser.status_code, 200)
+                self.assertEqual(parser.unused, b'HTTP')
+
+    def test_skip_body(self):
+        """Fixed length body may be read bypassing parser
+        """
+        parser = ResponseParser()
+        body = parser.feed(b'HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\nhe')
+        self.assertEqual(b''.join(body), b'he')
+        self.assertEqual(parser.remaining, 3)
+        self.assertRaises(ValueError, parser.skip_body, 4)
+        parser.skip_body(3)
+        self.assertTrue(parser.is_done)
+
+    def test_chunked(self):
+        """Chunk extensions are ignored, trailers are parsed
+        and CRLF inside chunk data is kept
+        """
+        for size in (1, 2, 7, len(CHUNKED)):
+            with self.subTest(size=size):
+                parser = ResponseParser()
+                body = feed_by(parser, CHUNKED, size)
+                self.assertEqual(body, b'hello, world\r\n')
+                self.assertTrue(parser.is_done)
+                self.assertEqual(parser.trailers['Expires'], 'never')
+
+    def test_until_close(self):
+        """Body without length ends when connection is closed
+        """
+        parser = ResponseParser()
+        body = feed_by(parser, b'HTTP/1.1 200 OK\r\n\r\nsome body', 4)
+        self.assertFalse(parser.is_done)
+        self.assertFalse(parser.keep_alive)
+        parser.feed_eof()
+        self.assertTrue(parser.is_done)
+        self.assertEqual(body, b'some body')
+
+    def test_no_body(self):
+        """HEAD responses, 204 and 304 have no body
+        """
+        head = b'HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\n'
+        parser = ResponseParser(is_head=True)
+        self.assertEqual(parser.feed(head), [])
+        self.assertTrue(parser.is_done)
+
+        for code in (b'204', b'304'):
+            parser = ResponseParser()
+            parser.feed(b'HTTP/1.1 ' + code + b' Whatever\r\n\r\n')
+            self.assertTrue(parser.is_done)
+
+    def test_interim_response(self):
+        """1xx responses are skipped
+        """
+        parser = ResponseParser()
+        body = feed_by(
+            parser,
+            b'HTTP/1.1 100 Continue\r\n\r\n'
+            b'HTTP/1.1 201 Created\r\nContent-Length: 2\r\n\r\nok',
+            5)
+        self.assertEqual(parser.status_code, 201)
+        self.assertEqual(body, b'ok')
+
+    def test_errors(self):
+        """Malformed and incomplete responses raise errors
+        """
+        parser = ResponseParser()
+        self.assertRaises(InvalidResponse, parser.feed, b'garbage\r\n\r\n')
+
+        parser = ResponseParser()
+        parser.feed(b'HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\nabc')
+        self.assertRaises(IncompleteResponse, parser.feed_eof)
+
+    def test_invalid_lengths(self):
+        """Content-Length and chunk size
+        int() would accept, but HTTP does not, are rejected
+        """
+        for value in (b'-1', b'+5', b'1_0', b'0x5', b'1 0', b'\xb2'):
+            parser = ResponseParser()
+            self.assertRaises(
+                InvalidResponse,
+                parser.feed,
+                b'HTTP/1.1 200 OK\r\nContent-Length: %s\r\n\r\n' % value
+                )
+
+        for value in (b'-1', b'+5', b'1_0', b'0x5', b''):
+            parser = ResponseParser()
+            parser.feed(b'HTTP/1.1 200 OK\r\n'
+                        b'Transfer-Encoding: chunked\r\n\r\n')
+            self.assertRaises(
+                InvalidResponse,
+                parser.feed,
+                b'%s\r\nhello\r\n' % value
+                )
+
+        parser = ResponseParser()
+        body = parser.feed(b'HTTP/1.1 200 OK\r\nContent-Length: 2, 2'
+                           b'\r\n\r\nok')
+        self.assertEqual(b''.join(body), b'ok')
+
+        for head in (b'Content-Length: 2, 5\r\n',
+                     b'Content-Length: 2\r\nContent-Length: 5\r\n'):
+            parser = ResponseParser()
+            self.assertRaises(
+                InvalidResponse,
+                parser.feed,
+                b'HTTP/1.1 200 OK\r\n%s\r\nok' % head
+                )
+
+    def test_chunked_with_length(self):
+        """Connection is not reused after response
+        that has both Transfer-Encoding and Content-Length
+        """
+        parser = ResponseParser()
+        body = feed_by(parser, CHUNKED.replace(
+            b'\r\n\r\n', b'\r\nContent-Length: 3\r\n\r\n', 1), 5)
+        self.assertEqual(body, b'hello, world\r\n')
+        self.assertTrue(parser.is_done)
+        self.assertFalse(parser.keep_alive)
@@ -0,0 +1,103 @@
+from unittest import TestCase
+from email.utils import formatdate
+from time import time
+
+from genki import Client, Response
+from genki.http.request import Retry, RequestBuilder
+
+from .test_server import start_http_server
+
+
+class FlakyServer:
+    """Keep-alive server that fails first requests,
+    either by closing connection or with given status
+    """
+
+    def __init__(self, failures: int, status: bytes = b'503',
+                 retry_after: bytes = b'0'):
+        self.failures = failures
+        self.status = status
+        self.retry_after = retry_after
+        self.requests = 0
+        self.connections = 0
+        self.server = start_http_server(self.respond)
+        self.addr = f'127.0.0.1:{self.server.server_port}'
+
+    def respond(self, sock, _, number: int):
+        if not number:
+            self.connections += 1
+        self.requests += 1
+        if self.requests > self.failures:
+            sock.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n'
+                         b'\r\nok')
+        elif self.status is None:
+            return False
+        else:
+            sock.sendall(b'HTTP/1.1 %s Unavailable\r\nRetry-After: %s\r\n'
+                         b'Content-Length: 0\r\n\r\n'
+                         % (self.status, self.retry_after))
+
+    def stop(self):
+        self.server.stop()
+
+
+class RetryTest(TestCase):
+    def test_delay(self):
+        """Backoff grows with attempts and is randomized,
+        Retry-After is respected unless it is too long
+        """
+        retry = Retry(backoff=1, max_backoff=5)
+        delays = [retry.delay(3) for _ in range(50)]
+        self.assertTrue(all(0 <= i <= 4 for i in delays))
+        self.assertGreater(len(set(delays)), 1)
+        self.assertLessEqual(retry.delay(10), 5)
+
+        req = RequestBuilder('example.com')
+        res = Response(req, b'HTTP/1.1 503 Unavailable\r\n'
+                       b'Retry-After: 2\r\n\r\n')
+        self.assertEqual(retry.delay(1, res), 2)
+        date = formatdate(time() + 60, usegmt=True).encode()
+        res = Response(req, b'HTTP/1.1 503 Unavailable\r\n'
+                       b'Retry-After: %s\r\n\r\n' % date)
+        self.assertIsNone(retry.delay(1, res))
+
+        self.assertTrue(retry.allows('GET', 2))
+        self.assertFalse(retry.allows('GET', 3))
+        self.assertFalse(retry.allows('POST', 1))
+
+    def test_retry_status(self):
+        """Request answered with retryable status is repeated
+        on the same connection, attempts are counted
+        """
+        server = FlakyServer(2)
+        try:
+            with Client(timeout=5, retry=Retry(backoff=0.01)) as c:
+                res = c.get(server.addr).result(exc_raise=True)
+                self.assertEqual(res.status_code, 200)
+                self.assertEqual(res.attempts, 3)
+                self.assertEqual(server.connections, 1)
+
+                server.requests = 0
+                res = c.post(server.addr, data=b'x').result()
+                self.assertEqual(res.status_code, 503)
+                self.assertEqual(res.attempts, 1)
+        finally:
+            server.stop()
+
+    def test_retry_error(self):
+        """Network errors are retried until attempts run out
+        """
+        server = FlakyServer(1, status=None)
+        try:
+            with Client(timeout=5, retry=Retry(backoff=0.01)) as c:
+                res = c.get(server.addr).result(exc_raise=True)
+            self.assertEqual(res.attempts, 2)
+
+            server.requests = 0
+            server.failures = 5
+            with Client(timeout=5, retry=Retry(backoff=0.01)) as c:
+                res = c.get(server.addr).result()
+            self.assertIsInstance(res, ConnectionError)
+            self.assertEqual(server.requests, 3)
+        finally:
+            server.stop()
@@ -1,3 +1,13 @@
+from typing import (
+    Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+)
+from unittest import SkipTest
+import os
+import subprocess
+
+from gevent import ssl
+from gevent.server import StreamServer
+
 try:
     from flask import Flask, request
     app = Flask(__name__)
@@ -13,3 +23,200 @@ try:
 
 except ImportError:
     app = None
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+except ImportError:
+    h2 = None
+
+
+def handle_h2(sock, _):
+    """Answer every HTTP/2 request with its method, path and body size.
+
+    Path /large gets response bigger than default flow control window,
+    /stall is never answered
+    """
+    conn = h2.connection.H2Connection(
+        config=h2.config.H2Configuration(
+            client_side=False, header_encoding=None))
+    conn.initiate_connection()
+    sock.sendall(conn.data_to_send())
+
+    requests = dict()
+    pending = dict()
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            return
+        for event in conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                requests[event.stream_id] = [dict(event.headers), 0]
+            elif isinstance(event, h2.events.DataReceived):
+                requests[event.stream_id][1] += len(event.data)
+                conn.acknowledge_received_data(
+                    event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, h2.events.StreamEnded):
+                headers, size = requests.pop(event.stream_id)
+                path = headers[b':path']
+                if path == b'/stall':
+                    continue
+                body = b'%s %s %d' % (headers[b':method'], path, size)
+                if path == b'/large':
+                    body = b'x' * 200000
+                conn.send_headers(event.stream_id, [
+                    (b':status', b'200'),
+                    (b'content-length', str(len(body)).encode()),
+                    (b'content-type', b'text/plain; charset=utf-8')
+                ])
+                pending[event.stream_id] = body
+
+        for stream_id, body in list(pending.items()):
+            while True:
+                size = min(conn.local_flow_control_window(stream_id),
+                           conn.max_outbound_frame_size, len(body))
+                if size <= 0 and body:
+                    break
+                conn.send_data(stream_id, body[:size],
+                               end_stream=size == len(body))
+                body = pending[stream_id] = body[size:]
+                if not body:
+                    del pending[stream_id]
+                    break
+        sock.sendall(conn.data_to_send())
+
+
+def start_h2_server() -> StreamServer:
+    """Start HTTP/2 server without TLS (h2c with prior knowledge)
+    """
+    server = StreamServer(('127.0.0.1', 0), handle_h2)
+    server.start()
+    return server
+
+
+def create_certificate(directory: str) -> Tuple[str, str]:
+    """Self-signed certificate for 127.0.0.1 made with openssl,
+    tests are skipped if it is not available
+    """
+    certfile = os.path.join(directory, 'cert.pem')
+    keyfile = os.path.join(directory, 'key.pem')
+    try:
+        subprocess.run(
+            ['openssl', 'req', '-x509', '-newkey', 'ec',
+             '-pkeyopt', 'ec_paramgen_curve:prime256v1', '-nodes',
+             '-days', '1', '-subj', '/CN=127.0.0.1',
+             '-addext', 'subjectAltName=IP:127.0.0.1',
+             '-keyout', keyfile, '-out', certfile],
+            check=True,
+            capture_output=True
+        )
+    except (OSError, subprocess.CalledProcessError) as err:
+        raise SkipTest(f'Can not create certificate: {err}')
+    return certfile, keyfile
+
+
+class Request(NamedTuple):
+    """HTTP/1.1 request read by test server,
+    header names are lowercase
+    """
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+
+
+def read_request(rfile) -> Optional[Request]:
+    """Read one request from file of connection,
+    decoding chunked transfer encoding of body.
+
+    Returns None if connection was closed before request head ended
+    """
+    head = b''
+    while not head.endswith(b'\r\n\r\n'):
+        line = rfile.readline()
+        if not line:
+            return None
+        head += line
+    lines = head[:-4].decode().split('\r\n')
+    method, path, _ = lines[0].split(' ', 2)
+    headers = dict()
+    for line in lines[1:]:
+        name, value = line.split(':', 1)
+        headers[name.lower()] = value.strip()
+
+    body = b''
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int(rfile.readline().strip(), 16)
+            body += rfile.read(size)
+            rfile.readline()
+            if not size:
+                break
+    elif 'content-length' in headers:
+        body = rfile.read(int(headers['content-length']))
+    return Request(method, path, headers, body)
+
+
+def http1_handler(respond: Callable[[Any, Request, int], Optional[bool]]):
+    """Connection handler of HTTP/1.1 server, reading requests
+    until connection is closed and passing each of them to respond.
+
+    respond - called with socket, request and number of requests
+    answered before on this connection, sends response itself
+    and returns False to close connection.
+    """
+    def handle(sock, _):
+        rfile = sock.makefile('rb')
+        try:
+            number = 0
+            while True:
+                request = read_request(rfile)
+                if request is None or respond(sock, request, number) is False:
+                    return
+                number += 1
+        finally:
+            rfile.close()
+
+    return handle
+
+
+def start_http_server(
+        respond: Callable[[Any, Request, int], Optional[bool]]
+) -> StreamServer:
+    """Start HTTP/1.1 server without TLS,
+    see http1_handler for respond
+    """
+    server = StreamServer(('127.0.0.1', 0), http1_handler(respond))
+    server.start()
+    return server
+
+
+def answer_method(sock, request: Request, _) -> bool:
+    """Answer request with its method and path,
+    closing connection after it
+    """
+    body = f'{request.method} {request.path}'.encode()
+    sock.sendall(
+        b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n'
+        b'Connection: close\r\n\r\n%s' % (len(body), body))
+    return False
+
+
+handle_http1 = http1_handler(answer_method)
+
+
+def start_tls_server(handle,
+                     certfile: str,
+                     keyfile: str,
+                     alpn: Optional[List[str]] = None) -> StreamServer:
+    """Start TLS server with one context shared by all connections,
+    so that sessions can be resumed
+    """
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(certfile, keyfile)
+    if alpn is not None:
+        ctx.set_alpn_protocols(alpn)
+    server = StreamServer(('127.0.0.1', 0), handle, ssl_context=ctx)
+    server.start()
+    return server
@@ -0,0 +1,79 @@
+from unittest import TestCase
+from time import monotonic
+
+from gevent import sleep, socket
+from gevent.server import StreamServer
+
+from genki import Client
+from genki.http.request import Timeout
+
+from .test_server import start_http_server
+
+
+def trickle_server(size: int, interval: float = 0.05) -> StreamServer:
+    """Server sending body of size bytes one byte at a time
+    """
+    def respond(sock, *_) -> bool:
+        sock.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n'
+                     % size)
+        try:
+            for _ in range(size):
+                sleep(interval)
+                sock.sendall(b'x')
+        except OSError:
+            # Client gave up
+            pass
+        return False
+
+    return start_http_server(respond)
+
+
+class TimeoutTest(TestCase):
+    def setUp(self):
+        self.server = trickle_server(100)
+        self.addr = f'127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_timeout_of(self):
+        """Single number applies to every socket operation
+        """
+        t = Timeout.of(3)
+        self.assertEqual((t.connect, t.tls, t.read, t.total),
+                         (3, 3, 3, None))
+        t = Timeout(3, connect=1, total=10)
+        self.assertEqual((t.connect, t.tls, t.read, t.total),
+                         (1, 3, 3, 10))
+        self.assertIs(Timeout.of(t), t)
+
+    def test_total(self):
+        """Trickling server does not hit read timeout,
+        but request is given up on at deadline
+        """
+        with Client(timeout=Timeout(1, total=0.3)) as c:
+            start = monotonic()
+            res = c.get(self.addr).result()
+            self.assertIsInstance(res, socket.timeout)
+            self.assertLess(monotonic() - start, 1)
+
+            res = c.get(self.addr, stream=True).result(exc_raise=True)
+            with self.assertRaises(socket.timeout):
+                for _ in res.iter_content():
+                    pass
+            self.assertLess(monotonic() - start, 2)
+
+    def test_collect(self):
+        """Client.collect() gives up waiting after timeout
+        """
+        server = trickle_server(10)
+        c = Client(timeout=5)
+        req = c.get(f'127.0.0.1:{server.server_port}')
+        start = monotonic()
+        self.assertFalse(c.collect(timeout=0.2))
+        self.assertLess(monotonic() - start, 1)
+        self.assertFalse(req.is_done)
+        self.assertTrue(c.collect())
+        self.assertEqual(len(req.result(exc_raise=True).raw_body), 10)
+        c.close()
+        server.stop()
@@ -0,0 +1,79 @@
+from unittest import TestCase
+
+from gevent import socket
+
+from genki import Client
+from genki.http.constants import StatusCode
+from genki.http.request import Timings
+from .client import CountingServer
+
+
+class TimingsTest(TestCase):
+    def setUp(self):
+        self.server = CountingServer(delay=0)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_timings(self):
+        """Phases are recorded in order, streamed response
+        gets its end once body is read
+        """
+        with Client(timeout=5) as c:
+            res = c.get(f'{self.server.addr}/a').result(exc_raise=True)
+            t = res.timings
+            stamps = [t.start, t.dns, t.connect, t.sent, t.headers, t.end]
+            self.assertEqual(stamps, sorted(stamps))
+            self.assertIsNone(t.tls)
+            self.assertEqual(list(t.durations()),
+                             ['dns', 'connect', 'sent', 'headers', 'end'])
+            self.assertGreaterEqual(t.ttfb, 0)
+
+            path = '/' + 'b' * 200000
+            res = c.get(f'{self.server.addr}{path}',
+                        stream=True).result(exc_raise=True)
+            self.assertTrue(res.is_streaming)
+            self.assertIsNone(res.timings.total)
+            b''.join(res.iter_content())
+            self.assertGreaterEqual(res.timings.total, 0)
+
+    def test_hooks(self):
+        """Hooks are called as request progresses,
+        exceptions carry timings too
+        """
+        events = []
+        with Client(
+                timeout=5,
+                on_request_start=lambda req: events.append('start'),
+                on_connect=lambda req, t: events.append('connect'),
+                on_headers=lambda req, code, headers: events.append(
+                    (code, headers['Content-Length'])),
+                on_complete=lambda req, res: events.append(res)) as c:
+            res = c.get(f'{self.server.addr}/a').result()
+            self.assertEqual(events, ['start', 'connect', (200, '2'), res])
+
+            sock = socket.socket()
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+            sock.close()
+            err = c.get(f'127.0.0.1:{port}').result()
+            self.assertIsInstance(err, ConnectionRefusedError)
+            self.assertIsInstance(err.timings, Timings)
+            self.assertIsNotNone(err.timings.dns)
+            self.assertIsNone(err.timings.connect)
+            self.assertIs(events[-1], err)
+        self.assertIsNone(Client().hooks)
+
+    def test_pipelined_hooks(self):
+        """on_headers is called once for every pipelined response
+        """
+        codes = []
+        with Client(timeout=5, pipelining=True,
+                    on_headers=lambda req, code, headers: codes.append(code)
+                    ) as c:
+            requests = [c.get(f'{self.server.addr}/{i}') for i in range(3)]
+            for req in requests:
+                req.result(exc_raise=True)
+        self.assertEqual(codes, [200] * 3)
+        for code in codes:
+            self.assertIsInstance(code, StatusCode)
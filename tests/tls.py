@@ -0,0 +1,76 @@
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+
+from gevent import socket, ssl
+
+from genki import Client
+from genki.http.constants import Scheme
+from genki.http.request import TLSSessionCache, create_ssl_context
+from .test_server import create_certificate, handle_http1, start_tls_server
+
+
+def key(host):
+    return (Scheme.HTTPS, host, 443)
+
+
+class TLSTest(TestCase):
+    def test_context(self):
+        """Default context is cooperative and verifies certificates
+        """
+        ctx = create_ssl_context()
+        self.assertIsInstance(ctx, ssl.SSLContext)
+        self.assertEqual(ctx.verify_mode, ssl.CERT_REQUIRED)
+        self.assertTrue(ctx.check_hostname)
+
+    def test_session_cache(self):
+        """Sessions are stored per server and counted when reused
+        """
+        cache = TLSSessionCache(maxsize=1)
+        self.assertIsNone(cache.get(key('a')))
+
+        cache.store(key('a'), SimpleNamespace(
+            session='session a', session_reused=False))
+        self.assertEqual(cache.get(key('a')), 'session a')
+
+        cache.store(key('a'), SimpleNamespace(
+            session='session a', session_reused=True))
+        cache.store(key('b'), SimpleNamespace(
+            session='session b', session_reused=False))
+        self.assertIsNone(cache.get(key('a')))
+        self.assertEqual(cache.stats, (1, 1, 1))
+
+    def test_resumption(self):
+        """Second connection to server resumes session
+        of the first one
+        """
+        with TemporaryDirectory() as directory:
+            certfile, keyfile = create_certificate(directory)
+            server = start_tls_server(handle_http1, certfile, keyfile)
+            ctx = create_ssl_context(certfile)
+        port = server.server_port
+        cache = TLSSessionCache()
+        try:
+            reused = []
+            for _ in range(2):
+                sock = ctx.wrap_socket(
+                    socket.create_connection(('127.0.0.1', port), 5),
+                    server_hostname='127.0.0.1',
+                    session=cache.get(key('127.0.0.1'))
+                    )
+                sock.sendall(b'GET / HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n')
+                # TLS 1.3 tickets arrive along with response
+                self.assertTrue(sock.recv(65536))
+                reused.append(sock.session_reused)
+                cache.store(key('127.0.0.1'), sock)
+                sock.close()
+            self.assertEqual(reused, [False, True])
+            self.assertEqual(cache.stats, (1, 1, 1))
+
+            with Client(timeout=5, ssl_context=ctx) as c:
+                for _ in range(3):
+                    c.get(f'https://127.0.0.1:{port}/').result(
+                        exc_raise=True)
+                self.assertEqual(c.tls_sessions.reused, 2)
+        finally:
+            server.stop()